@@ -0,0 +1,230 @@
+"""
+Microbenchmarks of the hot paths with stored baselines: load search and
+lookup by id at inventory sizes up to a million loads, the per-call analytics rules on realistic call data,
+the dashboard analytics summary at 10k/100k/1M stored calls and each store_*
+write. Results are compared with benchmarks/baselines.json and the run exits
+1 when a benchmark is slower than its baseline by more than the threshold.
+
+Baselines are machine-specific: record them with --update-baseline on the
+machine (or CI runner) that checks them.
+
+Usage: python -m benchmarks.bench_hot_paths [--only TEXT] [--summary-rows 10000,100000]
+                                            [--data-dir DIR] [--update-baseline] [--json]
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import platform
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.synthetic import generate_calls, generate_loads, generate_negotiations, populate_database
+from src.database import (
+    storage,
+    init_database,
+    loads_db,
+    get_analytics_summary,
+    store_call_analytics,
+    store_call_event,
+    store_dead_letter,
+    store_negotiation
+)
+from src.services.analytics import (
+    classify_call_outcome,
+    classify_carrier_sentiment,
+    extract_call_analytics,
+    extract_offer_data
+)
+from src.services.lanes import lane_key
+from src.services.load_service import search_loads_by_criteria, get_load_by_id
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baselines.json"
+
+SEARCH_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+SUMMARY_ROWS = (10_000, 100_000, 1_000_000)
+
+# Criteria of the search benchmarks: a broad city match, a full lane, the unfiltered inventory
+# and a city match ranked by rate per mile
+SEARCH_CRITERIA = {
+    "origin": {"origin": "chicago"},
+    "lane": {"origin": "Chicago", "destination": "Dallas", "equipment_type": "dry van"},
+    "all": {},
+    "origin_by_rate_per_mile": {"origin": "chicago", "sort_by": "rate_per_mile"}
+}
+
+Benchmark = Tuple[str, Callable[[], Any], int]
+
+
+def _measure(fn: Callable[[], Any], per_call: int = 1, min_time: float = 0.2) -> float:
+    """Best-of-N microseconds per operation; fn performs per_call operations"""
+    single = timeit.timeit(fn, number=1)
+    number = max(1, int(min_time / max(single, 1e-9)))
+    repeat = 5 if single < 1.0 else 3
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / (number * per_call) * 1e6
+
+
+def _search(criteria: Dict[str, str]) -> Any:
+    """A search as the voice agent route runs it: the match count and the first three loads"""
+    loads = search_loads_by_criteria(**criteria)
+    return len(loads), loads[:3]
+
+
+def search_benchmarks(only: str) -> Iterator[Benchmark]:
+    for size in SEARCH_SIZES:
+        names = [f"search_loads_by_criteria[loads={size},{label}]" for label in SEARCH_CRITERIA]
+        if only and not any(only in name for name in names + [f"get_load_by_id[loads={size}]"]):
+            continue  # Don't generate an inventory nobody searches
+        # Generated in chunks so a million loads never exist as models all at once
+        loads_db.replace(itertools.chain.from_iterable(
+            generate_loads(min(100_000, size - start), seed=42 + start, start=start)
+            for start in range(0, size, 100_000)
+        ))
+        for name, criteria in zip(names, SEARCH_CRITERIA.values()):
+            yield name, lambda criteria=criteria: _search(criteria), 1
+        load_ids = [f"SYN{i:06d}" for i in range(0, size, max(1, size // 100))]
+        yield f"get_load_by_id[loads={size}]", lambda: [get_load_by_id(load_id) for load_id in load_ids], len(load_ids)
+    loads_db.clear()
+
+
+def analytics_benchmarks() -> Iterator[Benchmark]:
+    calls = generate_calls(500, generate_loads(200))
+    for fn in (classify_call_outcome, classify_carrier_sentiment, extract_offer_data):
+        yield fn.__name__, lambda fn=fn: [fn(call) for call in calls], len(calls)
+
+
+def summary_benchmarks(rows: List[int], data_dir: Path, only: str) -> Iterator[Benchmark]:
+    for count in rows:
+        name = f"get_analytics_summary[rows={count}]"
+        if only and only not in name:
+            continue  # Don't build a database nobody reads
+        path = data_dir / f"summary-{count}.db"
+        if path.exists():
+            storage.DB_PATH = path
+            init_database()
+        else:
+            populate_database(path, count)
+        yield name, get_analytics_summary, 1
+
+
+def store_benchmarks(data_dir: Path) -> Iterator[Benchmark]:
+    storage.DB_PATH = data_dir / "store.db"
+    storage.DB_PATH.unlink(missing_ok=True)
+    init_database()
+
+    loads = generate_loads(200)
+    calls = generate_calls(200, loads)
+    analytics = []
+    for call in calls:
+        record = extract_call_analytics(call)
+        load = call["load_info"]
+        record.update(event_id=f"evt-{call['call_id']}", posted_rate=load["loadboard_rate"],
+                      lane=lane_key(load["origin"], load["destination"], load["equipment_type"]))
+        analytics.append(record)
+    negotiations = generate_negotiations(200, loads)
+    events = [{
+        "event_id": f"evt-{call['call_id']}",
+        "event_type": "call_ended",
+        "call_id": call["call_id"],
+        "carrier_mc": call["carrier_info"]["mc_number"],
+        "load_id": call["load_id"],
+        "received_at": datetime.utcnow().isoformat(),
+        "call_data": call
+    } for call in calls]
+    payload = json.dumps(events[0])
+
+    yield "store_call_analytics", lambda: [store_call_analytics(record) for record in analytics], len(analytics)
+    yield "store_negotiation", lambda: [store_negotiation(negotiation) for negotiation in negotiations], len(negotiations)
+    yield "store_call_event", lambda: [store_call_event(event) for event in events], len(events)
+    yield "store_dead_letter", lambda: [
+        store_dead_letter(event["event_id"], "call_ended", payload, "bench", 3) for event in events
+    ], len(events)
+
+
+def run(only: str, summary_rows: List[int], data_dir: Path) -> Dict[str, float]:
+    groups = [search_benchmarks(only), analytics_benchmarks(), summary_benchmarks(summary_rows, data_dir, only),
+              store_benchmarks(data_dir)]
+    results = {}
+    for group in groups:
+        for name, fn, per_call in group:
+            if only and only not in name:
+                continue
+            results[name] = round(_measure(fn, per_call), 2)
+    return results
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Each result with its baseline, relative change and whether it exceeds the threshold"""
+    rows = []
+    for name, us in results.items():
+        entry = baseline.get("results", {}).get(name)
+        row = {"benchmark": name, "us": us, "baseline_us": None, "change": None, "regression": False}
+        if entry:
+            threshold = entry.get("threshold", baseline.get("threshold", 0.25))
+            limit = max(entry["us"] * (1 + threshold), entry["us"] + baseline.get("noise_floor_us", 1.0))
+            row.update(baseline_us=entry["us"], change=round(us / entry["us"] - 1, 3), regression=us > limit)
+        rows.append(row)
+    return rows
+
+
+def update_baseline(path: Path, baseline: Dict[str, Any], results: Dict[str, float]) -> None:
+    """Store results as the new baseline, keeping per-benchmark thresholds"""
+    stored = baseline.get("results", {})
+    for name, us in results.items():
+        stored[name] = {**stored.get(name, {}), "us": us}
+    baseline.update(
+        threshold=baseline.get("threshold", 0.25),
+        noise_floor_us=baseline.get("noise_floor_us", 1.0),
+        recorded={"python": sys.version.split()[0], "machine": platform.machine(),
+                  "date": datetime.utcnow().date().isoformat()},
+        results=dict(sorted(stored.items()))
+    )
+    path.write_text(json.dumps(baseline, indent=2) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default="", help="run the benchmarks whose name contains this text")
+    parser.add_argument("--summary-rows", default=",".join(map(str, SUMMARY_ROWS)),
+                        help="stored calls of the get_analytics_summary databases (comma-separated)")
+    parser.add_argument("--data-dir", type=Path, help="keep the generated databases here between runs")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="record the results as the baseline")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    logging.getLogger("src").setLevel(logging.ERROR)
+    summary_rows = [int(rows) for rows in args.summary_rows.split(",") if rows.strip()]
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or Path(tmp)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        results = run(args.only, summary_rows, data_dir)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    rows = compare(results, baseline)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{'benchmark':<52} {'us/op':>12} {'baseline':>12} {'change':>8}")
+        for row in rows:
+            baseline_us = f"{row['baseline_us']:>12}" if row["baseline_us"] is not None else f"{'-':>12}"
+            change = f"{row['change']:>+8.1%}" if row["change"] is not None else f"{'new':>8}"
+            print(f"{row['benchmark']:<52} {row['us']:>12} {baseline_us} {change}"
+                  f"{'  REGRESSION' if row['regression'] else ''}")
+
+    if args.update_baseline:
+        update_baseline(args.baseline, baseline, results)
+    elif any(row["regression"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
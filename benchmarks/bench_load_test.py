@@ -0,0 +1,344 @@
+"""
+End-to-end load test: drives the ASGI app in-process through whole carrier
+calls (verify -> search -> details -> negotiation rounds -> call_ended) with
+a configurable traffic mix, against a local stub FMCSA server with
+configurable latency and error rates.
+
+Reports throughput and p50/p95/p99 latency per endpoint (webhooks per event
+type). --output writes the report as a JSON baseline; --baseline compares a
+run with one and exits with status 1 when an endpoint's p95 or the overall
+throughput regressed by more than --max-regression.
+
+Usage: python -m benchmarks.bench_load_test [--calls N] [--concurrency N] [--mix standard]
+       [--loads N] [--fmcsa-latency-ms MS] [--fmcsa-error-rate P]
+       [--output baseline.json] [--baseline baseline.json] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+API_KEY = os.environ.setdefault("HAPPYROBOT_API_KEY", "load-test-api-key-0123456789abcdef")
+HEADERS = {"Authorization": f"Bearer {API_KEY}"}
+WEBHOOK = "/webhook/carrier-engagement"
+
+# Scenario weights per traffic mix
+MIXES = {
+    "standard": {"booked": 0.35, "declined": 0.2, "not_interested": 0.25, "ineligible": 0.1, "dashboard": 0.1},
+    "negotiation_heavy": {"booked": 0.5, "declined": 0.4, "not_interested": 0.05, "ineligible": 0.05},
+    "read_heavy": {"booked": 0.15, "not_interested": 0.15, "search_only": 0.4, "dashboard": 0.3},
+}
+
+
+class StubFMCSA:
+    """Local FMCSA carriers API answering after latency_ms (+- jitter) with the given error rates"""
+
+    def __init__(self, latency_ms: float = 80.0, jitter_ms: float = 20.0, error_rate: float = 0.0,
+                 not_found_rate: float = 0.05, seed: int = 7):
+        stub = self
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.not_found_rate = not_found_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._rng_lock:
+                    delay = max(0.0, stub._rng.gauss(stub.latency_ms, stub.jitter_ms)) / 1000
+                    draw = stub._rng.random()
+                time.sleep(delay)
+                mc_number = self.path.rstrip("/").rsplit("/", 1)[-1]
+                if draw < stub.error_rate:
+                    self._reply(503, {"error": "Service unavailable"})
+                elif draw < stub.error_rate + stub.not_found_rate:
+                    self._reply(404, {"error": "Not found"})
+                else:
+                    self._reply(200, {"legal_name": f"Carrier {mc_number} LLC", "status": "ACTIVE",
+                                      "out_of_service": False, "mc_number": mc_number})
+
+            def _reply(self, status: int, body: Dict[str, Any]) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self) -> "StubFMCSA":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class LatencyRecorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.enabled = True
+
+    def record(self, endpoint: str, seconds: float, status: int) -> None:
+        if not self.enabled:
+            return
+        self.samples[endpoint].append(seconds)
+        if status >= 500:
+            self.errors[endpoint] += 1
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        endpoints = {}
+        for endpoint in sorted(self.samples):
+            latencies = np.array(self.samples[endpoint]) * 1000
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            endpoints[endpoint] = {
+                "count": len(latencies),
+                "errors": self.errors[endpoint],
+                "mean_ms": round(float(latencies.mean()), 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(latencies.max()), 3)
+            }
+        return endpoints
+
+
+class VirtualCaller:
+    """Plays carrier calls against the app the way the voice agent and the platform webhooks do"""
+
+    def __init__(self, client, recorder: LatencyRecorder, rng: random.Random, loads: List[Any]):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.loads = loads
+
+    async def _request(self, method: str, endpoint: str, url: str, **kwargs) -> Any:
+        started = time.perf_counter()
+        response = await self.client.request(method, url, headers=HEADERS, **kwargs)
+        self.recorder.record(endpoint, time.perf_counter() - started, response.status_code)
+        return response
+
+    async def _event(self, event_type: str, call_data: Dict[str, Any], carrier: Dict[str, Any],
+                     load: Optional[Any] = None) -> None:
+        payload = {"event_type": event_type, "carrier_info": carrier, "call_data": call_data}
+        if load is not None:
+            payload["load_info"] = load.model_dump(mode="json")
+        await self._request("POST", f"POST {WEBHOOK} [{event_type}]", WEBHOOK, json=payload)
+
+    def _carrier(self, eligible: bool = True) -> Dict[str, Any]:
+        mc_number = "999999" if not eligible and self.rng.random() < 0.5 else str(self.rng.randint(100000, 899999))
+        return {"mc_number": mc_number, "company_name": f"Carrier {mc_number}",
+                "phone_number": f"+1555{self.rng.randint(0, 9999999):07d}"}
+
+    async def _verify_and_search(self, carrier: Dict[str, Any]) -> Any:
+        await self._request("GET", "GET /verify-carrier/{mc_number}", f"/verify-carrier/{carrier['mc_number']}")
+        load = self.rng.choice(self.loads)
+        params = {"origin": load.origin.split(",")[0], "equipment_type": load.equipment_type}
+        if self.rng.random() < 0.5:
+            params["destination"] = load.destination.split(",")[0]
+        await self._request("GET", "GET /loads/for-voice-agent", "/loads/for-voice-agent", params=params)
+        return load
+
+    async def run(self, scenario: str) -> None:
+        if scenario == "dashboard":
+            await self._request("GET", "GET /dashboard/analytics", "/dashboard/analytics")
+            return
+
+        carrier = self._carrier(eligible=scenario != "ineligible")
+        call_id = f"lt-{self.rng.getrandbits(48):012x}"
+        if scenario == "ineligible":
+            await self._request("GET", "GET /verify-carrier/{mc_number}", f"/verify-carrier/{carrier['mc_number']}")
+            await self._event("call_ended", {"call_id": call_id, "outcome": "carrier_ineligible"}, carrier)
+            return
+
+        load = await self._verify_and_search(carrier)
+        if scenario == "search_only":
+            return
+        await self._request("GET", "GET /loads/{load_id}/for-voice-agent", f"/loads/{load.load_id}/for-voice-agent")
+        base = {"call_id": call_id, "load_id": load.load_id}
+        await self._event("carrier_call_initiated", base, carrier)
+
+        if scenario == "not_interested":
+            await self._event("carrier_not_interested", base, carrier, load)
+            await self._event("call_ended", {**base, "outcome": "no_interest", "call_duration_seconds": 95}, carrier, load)
+            return
+
+        await self._event("load_interest_expressed", base, carrier, load)
+        rounds = self.rng.randint(1, 3)
+        rate = load.loadboard_rate
+        offered = rate
+        for previous_rounds in range(rounds):
+            offered = round(rate * (1 + self.rng.uniform(0.02, 0.15)), -1)
+            await self._event("negotiation_offer", {**base, "offered_rate": offered, "original_rate": rate,
+                                                    "counter_offer_count": previous_rounds}, carrier, load)
+        outcome = {**base, "original_rate": rate, "final_rate": offered, "total_rounds": rounds}
+        if scenario == "booked":
+            await self._event("agreement_reached", outcome, carrier, load)
+            ended = "deal_closed"
+        else:
+            await self._event("negotiation_declined", outcome, carrier, load)
+            ended = "no_agreement"
+        await self._event("call_ended", {
+            **base, "outcome": ended, "original_rate": rate, "final_rate": offered, "negotiation_rounds": rounds,
+            "negotiation_occurred": True, "call_duration_seconds": self.rng.randint(180, 900)
+        }, carrier, load)
+
+
+async def run_load_test(calls: int, concurrency: int, mix: Dict[str, float], loads: int,
+                        warmup: int, seed: int) -> Dict[str, Any]:
+    import httpx
+    import main
+    from src.database import loads_db
+    from benchmarks.synthetic import generate_loads
+
+    recorder = LatencyRecorder()
+    async with main.lifespan(main.app):
+        loads_db.extend(generate_loads(loads, seed=seed))
+        inventory = list(loads_db)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60.0) as client:
+            scenarios, weights = list(mix), list(mix.values())
+
+            async def drive(total: int) -> None:
+                remaining = iter(range(total))
+
+                async def worker(worker_id: int) -> None:
+                    rng = random.Random(seed * 1000 + worker_id)
+                    caller = VirtualCaller(client, recorder, rng, inventory)
+                    for _ in remaining:
+                        await caller.run(rng.choices(scenarios, weights)[0])
+
+                await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+            recorder.enabled = False
+            await drive(warmup)
+            recorder.enabled = True
+            started = time.perf_counter()
+            await drive(calls)
+            elapsed = time.perf_counter() - started
+
+    endpoints = recorder.report()
+    requests = sum(endpoint["count"] for endpoint in endpoints.values())
+    return {
+        "duration_seconds": round(elapsed, 3),
+        "calls": calls,
+        "requests": requests,
+        "errors": sum(endpoint["errors"] for endpoint in endpoints.values()),
+        "throughput_rps": round(requests / elapsed, 1),
+        "calls_per_second": round(calls / elapsed, 1),
+        "endpoints": endpoints
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: float,
+            noise_floor_ms: float = 1.0) -> List[str]:
+    """Regressions of report against baseline: p95 per endpoint and overall throughput"""
+    regressions = []
+    for endpoint, stats in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(endpoint)
+        if before is None:
+            continue
+        limit = max(before["p95_ms"] * (1 + max_regression), before["p95_ms"] + noise_floor_ms)
+        if stats["p95_ms"] > limit:
+            regressions.append(f"{endpoint}: p95 {before['p95_ms']} -> {stats['p95_ms']} ms")
+    if report["throughput_rps"] < baseline["throughput_rps"] * (1 - max_regression):
+        regressions.append(f"throughput: {baseline['throughput_rps']} -> {report['throughput_rps']} req/s")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500, help="calls (scenarios) to run")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent virtual callers")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="standard", help="traffic mix")
+    parser.add_argument("--loads", type=int, default=2000, help="synthetic loads added to the inventory")
+    parser.add_argument("--warmup", type=int, default=20, help="calls run before measuring")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fmcsa-latency-ms", type=float, default=80.0)
+    parser.add_argument("--fmcsa-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--fmcsa-error-rate", type=float, default=0.02, help="fraction of 503 answers")
+    parser.add_argument("--fmcsa-not-found-rate", type=float, default=0.05, help="fraction of 404 answers")
+    parser.add_argument("--output", type=Path, help="write the report as a JSON baseline")
+    parser.add_argument("--baseline", type=Path, help="compare with a baseline written by --output")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="tolerated relative slowdown")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    # Run from the repository root (static files) with throwaway storage
+    os.chdir(ROOT)
+    with tempfile.TemporaryDirectory() as tmp, StubFMCSA(
+        args.fmcsa_latency_ms, args.fmcsa_jitter_ms, args.fmcsa_error_rate, args.fmcsa_not_found_rate, args.seed
+    ) as fmcsa:
+        os.environ.update({
+            "FMCSA_BASE_URL": fmcsa.base_url,
+            "FMCSA_API_KEY": "stub",
+            "EVENT_LOG_DIR": str(Path(tmp) / "event_log"),
+            "PROFILER_DIR": str(Path(tmp) / "profiles"),
+            "MEMORY_SAMPLE_INTERVAL": "0"
+        })
+        from src.database import storage
+        storage.DB_PATH = Path(tmp) / "loadtest.db"
+        report = asyncio.run(run_load_test(
+            args.calls, args.concurrency, MIXES[args.mix], args.loads, args.warmup, args.seed
+        ))
+
+    report["config"] = {
+        "calls": args.calls, "concurrency": args.concurrency, "mix": args.mix, "loads": args.loads,
+        "fmcsa_latency_ms": args.fmcsa_latency_ms, "fmcsa_error_rate": args.fmcsa_error_rate,
+        "python": sys.version.split()[0]
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['calls']} calls, {report['requests']} requests in {report['duration_seconds']}s: "
+              f"{report['throughput_rps']} req/s, {report['calls_per_second']} calls/s, {report['errors']} errors")
+        print(f"{'endpoint':<62} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+        for endpoint, stats in report["endpoints"].items():
+            print(f"{endpoint:<62} {stats['count']:>6} {stats['p50_ms']:>8} {stats['p95_ms']:>8} "
+                  f"{stats['p99_ms']:>8} {stats['errors']:>6}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("config", {}).get("mix") != args.mix:
+            print(f"Note: baseline was recorded with mix {baseline.get('config', {}).get('mix')}", file=sys.stderr)
+        regressions = compare(report, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Rescoring cost: per-call classify_call_outcome / classify_carrier_sentiment
+versus the vectorized reclassification engine, on synthetic call features.
+Also checks that both produce the same outcomes and sentiments, and times an
+end-to-end reclassify_calls run against a temporary database.
+
+Usage: python -m benchmarks.bench_reclassify [--rows N] [--workers N] [--json]
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.database import storage, init_database, batch_transaction, store_call_analytics
+from src.services.analytics import (
+    ANALYSIS_VERSION,
+    CALL_FEATURE_FIELDS,
+    classify_call_outcome,
+    classify_carrier_sentiment
+)
+from src.services.reclassify import OUTCOME_BRANCHES, SENTIMENTS, score_chunk, reclassify_calls
+
+OUTCOMES = [
+    "deal_closed", "load_assigned", "agreement_reached", "agreement_transfer_failed", "transferred_to_sales",
+    "verification_failed", "no_interest", "carrier_not_interested", "unknown", ""
+]
+
+
+def synthetic_calls(rows: int, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    calls = []
+    for _ in range(rows):
+        call = {
+            "outcome": rng.choice(OUTCOMES),
+            "call_duration_seconds": rng.randint(5, 900),
+            "questions_asked": rng.randint(0, 8),
+            "negotiation_rounds": rng.randint(0, 7),
+        }
+        for field in ("carrier_interested", "agreement_reached", "negotiation_occurred",
+                      "multiple_loads_discussed", "carrier_requested_callback"):
+            if rng.random() < 0.5:
+                call[field] = rng.random() < 0.5
+        if rng.random() < 0.3:
+            call["carrier_sentiment"] = rng.choice(["Positive", "neutral", "frustrated", "excited"])
+        if rng.random() < 0.1:
+            call["duration"] = rng.randint(5, 120)
+        calls.append(call)
+    return calls
+
+
+def _columns(calls: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    return {field: [call.get(field) for call in calls] for field in CALL_FEATURE_FIELDS}
+
+
+def run(rows: int, workers: int) -> Dict[str, Any]:
+    calls = synthetic_calls(rows)
+    columns = _columns(calls)
+    ids = list(range(1, rows + 1))
+
+    started = time.perf_counter()
+    per_call = []
+    for call in calls:
+        outcome, sentiment = classify_call_outcome(call), classify_carrier_sentiment(call)
+        # The per-call path serializes its results for the write back too
+        json.dumps(outcome), json.dumps(sentiment)
+        per_call.append((outcome, sentiment))
+    per_call_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vectorized = score_chunk(ids, columns, "bench", "now")
+    vectorized_seconds = time.perf_counter() - started
+
+    mismatches = sum(
+        1 for (outcome, sentiment), row in zip(per_call, vectorized)
+        if outcome["primary_outcome"] != json.loads(row[0])["primary_outcome"]
+        or sentiment["overall_sentiment"] != row[2]
+        or abs(sentiment["sentiment_confidence"] - row[3]) > 1e-9
+        or sentiment["sentiment_details"]["engagement_level"] != json.loads(row[4])["engagement_level"]
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.DB_PATH = Path(tmp) / "bench.db"
+        init_database()
+        with batch_transaction():
+            for i, call in enumerate(calls):
+                store_call_analytics({"call_id": f"bench-{i}", "call_features": call,
+                                      "analysis_version": ANALYSIS_VERSION})
+        end_to_end = reclassify_calls("bench", workers=workers, chunk_size=max(1, rows // 4))
+
+    return {
+        "rows": rows,
+        "per_call_seconds": round(per_call_seconds, 3),
+        "vectorized_seconds": round(vectorized_seconds, 3),
+        "speedup": round(per_call_seconds / vectorized_seconds, 2),
+        "mismatches": mismatches,
+        "end_to_end": end_to_end,
+        "branches": len(OUTCOME_BRANCHES),
+        "sentiments": len(SENTIMENTS)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200000, help="synthetic calls to score")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for the end-to-end run")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    result = run(args.rows, args.workers)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"rows:            {result['rows']}")
+    print(f"per-call rules:  {result['per_call_seconds']}s")
+    print(f"vectorized:      {result['vectorized_seconds']}s ({result['speedup']}x)")
+    print(f"mismatches:      {result['mismatches']}")
+    e2e = result["end_to_end"]
+    print(f"end-to-end:      {e2e['rescored']} rows in {e2e['seconds']}s over {e2e['chunks']} chunks")
+
+
+if __name__ == "__main__":
+    main()
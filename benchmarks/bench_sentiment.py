@@ -0,0 +1,85 @@
+"""
+Sentiment progression cost by call length: the full per-event progression
+list versus the incremental SentimentTracker summary. Reports time, peak
+memory while tracking, and stored JSON bytes per call.
+
+Usage: python -m benchmarks.bench_sentiment [--json]
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.services.analytics import track_sentiment_progression
+
+EVENT_TYPES = ["question_asked", "rate_discussed", "objection_raised", "interest_expressed", "silence"]
+
+
+def full_progression(call_events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The progression list stored before incremental tracking"""
+    progression = []
+    for event in call_events:
+        event_sentiment = "neutral"
+        if event.get("type") in ["question_asked", "interest_expressed"]:
+            event_sentiment = "positive"
+        elif event.get("type") in ["objection_raised", "call_terminated_early"]:
+            event_sentiment = "negative"
+        progression.append({
+            "timestamp": event.get("timestamp"),
+            "event_type": event.get("type"),
+            "sentiment": event_sentiment
+        })
+    return progression
+
+
+def _measure(fn: Callable[[], Any]) -> Dict[str, Any]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": round(seconds * 1000, 2), "peak_kb": round(peak / 1024, 1), "stored_bytes": len(json.dumps(result))}
+
+
+def run() -> List[Dict[str, Any]]:
+    results = []
+    for length in (10, 1_000, 100_000):
+        events = [
+            {"type": EVENT_TYPES[i % len(EVENT_TYPES)], "timestamp": f"2024-12-19T10:00:{i % 60:02d}Z"}
+            for i in range(length)
+        ]
+        results.append({
+            "events": length,
+            "list": _measure(lambda: full_progression(events)),
+            "tracker": _measure(lambda: track_sentiment_progression(events))
+        })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = run()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'events':>8} {'list ms':>9} {'list KB':>9} {'list bytes':>11} {'tracker ms':>11} {'tracker KB':>11} {'tracker bytes':>14}")
+    for result in results:
+        full, tracker = result["list"], result["tracker"]
+        print(f"{result['events']:>8} {full['ms']:>9} {full['peak_kb']:>9} {full['stored_bytes']:>11} "
+              f"{tracker['ms']:>11} {tracker['peak_kb']:>11} {tracker['stored_bytes']:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Serialization cost per route: FastAPI's default path (jsonable_encoder +
+stdlib json) versus FastJSONResponse with precompiled TypeAdapters.
+
+Usage: python -m benchmarks.bench_serialization [--number N] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.database import storage
+from src.models import webhook_event_adapter
+from src.routes.responses import (
+    FastJSONResponse,
+    WEBHOOK_RESPONSE_ADAPTER,
+    VOICE_LOADS_RESPONSE_ADAPTER
+)
+
+
+def _webhook_body(payload: Dict[str, Any]) -> Dict[str, Any]:
+    from src.handlers import process_webhook_event, build_processed_response
+    event = webhook_event_adapter.validate_python(payload)
+    result = asyncio.run(process_webhook_event(event))
+    return build_processed_response(result["event_id"], event, result)
+
+
+def build_route_bodies() -> List[Tuple[str, Dict[str, Any], Any]]:
+    """Realistic response bodies for the hot routes, produced by the real handlers"""
+    from src.database import loads_db, get_analytics_summary
+    from src.models import LoadData
+    from src.services import initialize_sample_data
+
+    asyncio.run(initialize_sample_data())
+    template = loads_db[0]
+    loads_db.extend(
+        LoadData(**{**template.model_dump(), "load_id": f"BENCH{i:03d}"}) for i in range(20)
+    )
+
+    initiated = _webhook_body({
+        "event_type": "carrier_call_initiated",
+        "carrier_info": {"mc_number": "123456", "company_name": "Test Carrier LLC"},
+        "call_data": {"call_id": "bench-1"}
+    })
+    ended = _webhook_body({
+        "event_type": "call_ended",
+        "carrier_info": {"mc_number": "123456", "company_name": "Test Carrier LLC"},
+        "load_info": template.model_dump(),
+        "call_data": {
+            "call_id": "bench-1",
+            "load_id": template.load_id,
+            "outcome": "deal_closed",
+            "negotiation_occurred": True,
+            "negotiation_rounds": 2,
+            "original_rate": 2500.0,
+            "final_rate": 2650.0,
+            "call_duration_seconds": 420,
+            "questions_asked": 5,
+            "call_events": [
+                {"type": "question_asked", "timestamp": f"2024-12-19T10:{i:02d}:00Z"} for i in range(30)
+            ]
+        }
+    })
+    voice_loads = {
+        "available": True,
+        "count": len(loads_db),
+        "showing": 3,
+        "voice_message": "I have loads available",
+        "loads": [
+            {
+                "load_id": load.load_id,
+                "route": f"{load.origin} to {load.destination}",
+                "rate": load.loadboard_rate,
+                "equipment": load.equipment_type,
+                "miles": load.miles,
+                "voice_summary": f"Load {load.load_id}: {load.origin} to {load.destination}"
+            }
+            for load in loads_db[:3]
+        ],
+        "next_action": "carrier_response"
+    }
+    dashboard = {"summary": get_analytics_summary(), "visualizations": {}}
+
+    return [
+        ("POST /webhook/carrier-engagement (carrier_call_initiated)", initiated, WEBHOOK_RESPONSE_ADAPTER),
+        ("POST /webhook/carrier-engagement (call_ended)", ended, WEBHOOK_RESPONSE_ADAPTER),
+        ("GET /loads/for-voice-agent", voice_loads, VOICE_LOADS_RESPONSE_ADAPTER),
+        ("GET /dashboard/analytics", dashboard, None),
+    ]
+
+
+def _time(fn: Callable[[], Any], number: int) -> float:
+    """Best-of-5 microseconds per call"""
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def run(number: int) -> List[Dict[str, Any]]:
+    results = []
+    for route, body, adapter in build_route_bodies():
+        before = _time(lambda: JSONResponse(jsonable_encoder(body)).body, number)
+        after = _time(lambda: FastJSONResponse(body, adapter=adapter).body, number)
+        results.append({
+            "route": route,
+            "bytes": len(FastJSONResponse(body, adapter=adapter).body),
+            "before_us": round(before, 2),
+            "after_us": round(after, 2),
+            "speedup": round(before / after, 2)
+        })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000, help="iterations per measurement")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.DB_PATH = Path(tmp) / "bench.db"
+        results = run(args.number)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'route':<60} {'bytes':>7} {'before µs':>10} {'after µs':>10} {'speedup':>8}")
+    for result in results:
+        print(f"{result['route']:<60} {result['bytes']:>7} {result['before_us']:>10} {result['after_us']:>10} {result['speedup']:>7}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Webhook validation and dispatch cost per event type: the untyped payload
+(call_data as Dict[str, Any], if/elif chain on event_type) versus the typed
+WebhookEvent union validated in pydantic-core and the EVENT_HANDLERS table.
+
+Usage: python -m benchmarks.bench_webhook_validation [--number N] [--json]
+"""
+
+import argparse
+import json
+import sys
+import timeit
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pydantic import BaseModel, Field
+
+from src.models import CarrierInfo, LoadData, webhook_event_adapter
+from src.handlers.webhook_handler import EVENT_HANDLERS
+
+
+class LegacyWebhookPayload(BaseModel):
+    """The payload model before per-event typing"""
+    event_type: str
+    carrier_info: Optional[CarrierInfo] = None
+    load_info: Optional[LoadData] = None
+    call_data: Optional[Dict[str, Any]] = None
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+
+CARRIER = {"mc_number": "123456", "company_name": "Test Carrier LLC"}
+LOAD = {
+    "load_id": "LOAD001",
+    "origin": "Chicago, IL",
+    "destination": "Atlanta, GA",
+    "pickup_datetime": "2024-12-20T08:00:00",
+    "delivery_datetime": "2024-12-21T18:00:00",
+    "equipment_type": "Dry Van",
+    "loadboard_rate": 2500.0,
+    "weight": 45000,
+    "commodity_type": "Electronics",
+    "miles": 716
+}
+
+EVENTS: Dict[str, Dict[str, Any]] = {
+    "carrier_call_initiated": {"carrier_info": CARRIER, "call_data": {"call_id": "bench-1"}},
+    "load_interest_expressed": {"carrier_info": CARRIER, "call_data": {"call_id": "bench-1", "load_id": "LOAD001"}},
+    "negotiation_offer": {
+        "carrier_info": CARRIER,
+        "load_info": LOAD,
+        "call_data": {"call_id": "bench-1", "load_id": "LOAD001", "offered_rate": 2700.0,
+                      "original_rate": 2500.0, "counter_offer_count": 1}
+    },
+    "agreement_reached": {
+        "carrier_info": CARRIER,
+        "call_data": {"call_id": "bench-1", "load_id": "LOAD001", "original_rate": 2500.0,
+                      "final_rate": 2650.0, "total_rounds": 2}
+    },
+    "negotiation_declined": {
+        "carrier_info": CARRIER,
+        "call_data": {"call_id": "bench-1", "load_id": "LOAD001", "original_rate": 2500.0, "total_rounds": 3}
+    },
+    "carrier_not_interested": {"carrier_info": CARRIER, "call_data": {"call_id": "bench-1"}},
+    "transfer_failed": {
+        "carrier_info": CARRIER,
+        "call_data": {"call_id": "bench-1", "load_id": "LOAD001", "original_rate": 2500.0,
+                      "final_rate": 2650.0, "total_rounds": 2, "transfer_failure_reason": "sales_rep_unavailable"}
+    },
+    "call_ended": {
+        "carrier_info": CARRIER,
+        "load_info": LOAD,
+        "call_data": {
+            "call_id": "bench-1",
+            "load_id": "LOAD001",
+            "outcome": "deal_closed",
+            "negotiation_occurred": True,
+            "negotiation_rounds": 2,
+            "original_rate": 2500.0,
+            "final_rate": 2650.0,
+            "call_duration_seconds": 420,
+            "questions_asked": 5
+        }
+    },
+}
+
+
+def _legacy_dispatch(event_type: str) -> int:
+    """The if/elif chain the handler used before the dispatch table"""
+    if event_type == "carrier_call_initiated":
+        return 1
+    elif event_type == "load_interest_expressed":
+        return 2
+    elif event_type == "negotiation_offer":
+        return 3
+    elif event_type == "agreement_reached":
+        return 4
+    elif event_type == "negotiation_declined":
+        return 5
+    elif event_type == "carrier_not_interested":
+        return 6
+    elif event_type == "transfer_failed":
+        return 7
+    elif event_type == "call_ended":
+        return 8
+    return 0
+
+
+def _time(fn: Callable[[], Any], number: int) -> float:
+    """Best-of-5 microseconds per call"""
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def run(number: int) -> List[Dict[str, Any]]:
+    results = []
+    for event_type, body in EVENTS.items():
+        raw = {"event_type": event_type, **body}
+        raw_json = json.dumps(raw).encode()
+        event = webhook_event_adapter.validate_python(raw)
+
+        legacy = _time(lambda: LegacyWebhookPayload.model_validate(json.loads(raw_json)), number)
+        typed_python = _time(lambda: webhook_event_adapter.validate_python(json.loads(raw_json)), number)
+        typed_json = _time(lambda: webhook_event_adapter.validate_json(raw_json), number)
+        chain = _time(lambda: _legacy_dispatch(event.event_type), number * 10)
+        table = _time(lambda: EVENT_HANDLERS.get(event.event_type), number * 10)
+        results.append({
+            "event_type": event_type,
+            "model": type(event).__name__,
+            "legacy_validate_us": round(legacy, 2),
+            "typed_validate_us": round(typed_python, 2),
+            "typed_validate_json_us": round(typed_json, 2),
+            "speedup": round(legacy / typed_json, 2),
+            "chain_dispatch_ns": round(chain * 1000, 1),
+            "table_dispatch_ns": round(table * 1000, 1)
+        })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=5000, help="iterations per measurement")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.number)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'event type':<26} {'legacy µs':>10} {'typed µs':>9} {'json µs':>8} {'speedup':>8} {'chain ns':>9} {'table ns':>9}")
+    for result in results:
+        print(
+            f"{result['event_type']:<26} {result['legacy_validate_us']:>10} {result['typed_validate_us']:>9} "
+            f"{result['typed_validate_json_us']:>8} {result['speedup']:>7}x "
+            f"{result['chain_dispatch_ns']:>9} {result['table_dispatch_ns']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Synthetic freight data for benchmarks and load tests.
+
+Loads are spread over real city pairs with lane-dependent rates, so searches
+by origin, destination and equipment return realistic result counts. Calls
+are call_ended call data as the platform sends it (carrier, load, outcome,
+negotiation and call events), and populate_database() bulk-loads analytics
+and negotiation history built from them by the real analytics rules.
+Everything is derived from a seeded random.Random and is reproducible.
+"""
+
+import json
+import math
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+from src.models import LoadData, NegotiationOffer
+
+CITIES = [
+    ("Chicago, IL", 41.88, -87.63), ("Atlanta, GA", 33.75, -84.39), ("Los Angeles, CA", 34.05, -118.24),
+    ("Denver, CO", 39.74, -104.99), ("Dallas, TX", 32.78, -96.80), ("Houston, TX", 29.76, -95.37),
+    ("Phoenix, AZ", 33.45, -112.07), ("Memphis, TN", 35.15, -90.05), ("Columbus, OH", 39.96, -83.00),
+    ("Newark, NJ", 40.74, -74.17), ("Seattle, WA", 47.61, -122.33), ("Kansas City, MO", 39.10, -94.58),
+    ("Charlotte, NC", 35.23, -80.84), ("Indianapolis, IN", 39.77, -86.16), ("Salt Lake City, UT", 40.76, -111.89),
+    ("Jacksonville, FL", 30.33, -81.66), ("Nashville, TN", 36.16, -86.78), ("Minneapolis, MN", 44.98, -93.27),
+    ("Reno, NV", 39.53, -119.81), ("Laredo, TX", 27.53, -99.49)
+]
+
+# Equipment type, share of loads, rate per mile
+EQUIPMENT = [("Dry Van", 0.6, 2.3), ("Reefer", 0.25, 2.8), ("Flatbed", 0.15, 3.0)]
+
+COMMODITIES = {
+    "Dry Van": ["Electronics", "Paper Products", "Consumer Goods", "Auto Parts"],
+    "Reefer": ["Fresh Produce", "Frozen Foods", "Dairy", "Pharmaceuticals"],
+    "Flatbed": ["Steel Coils", "Lumber", "Machinery", "Building Materials"]
+}
+
+
+def _miles(origin, destination) -> float:
+    """Great-circle distance times a road factor"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (origin[1], origin[2], destination[1], destination[2]))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return round(3959 * 2 * math.asin(math.sqrt(a)) * 1.18)
+
+
+def generate_loads(count: int, seed: int = 42, start: int = 0) -> List[LoadData]:
+    """count loads with IDs SYN000000.. (offset by start)"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    names = [equipment for equipment, _, _ in EQUIPMENT]
+    weights = [share for _, share, _ in EQUIPMENT]
+    rate_per_mile = {equipment: rate for equipment, _, rate in EQUIPMENT}
+
+    loads = []
+    for i in range(start, start + count):
+        origin, destination = rng.sample(CITIES, 2)
+        equipment = rng.choices(names, weights)[0]
+        miles = _miles(origin, destination)
+        pickup = now + timedelta(hours=rng.randint(6, 24 * 7))
+        loads.append(LoadData(
+            load_id=f"SYN{i:06d}",
+            origin=origin[0],
+            destination=destination[0],
+            pickup_datetime=pickup,
+            delivery_datetime=pickup + timedelta(hours=max(8, miles / 50)),
+            equipment_type=equipment,
+            loadboard_rate=round(miles * rate_per_mile[equipment] * rng.uniform(0.85, 1.2) + 150, -1),
+            notes=rng.choice([None, "Dock high", "Driver assist", "Tarps required", "Team preferred"]),
+            weight=float(rng.randrange(8000, 44000, 500)),
+            commodity_type=rng.choice(COMMODITIES[equipment]),
+            num_of_pieces=rng.randint(1, 26),
+            miles=float(miles),
+            dimensions="53ft trailer" if equipment != "Flatbed" else "48ft flatbed"
+        ))
+    return loads
+
+
+# Call outcome sent by the platform, share of calls
+CALL_OUTCOMES = [
+    ("deal_closed", 0.25), ("agreement_transfer_failed", 0.05), ("transferred_to_sales", 0.05),
+    ("no_interest", 0.25), ("carrier_not_eligible", 0.08), ("no_agreement", 0.2), ("", 0.12)
+]
+
+CALL_EVENT_TYPES = ["question_asked", "rate_discussed", "objection_raised", "interest_expressed", "silence"]
+
+
+def generate_calls(count: int, loads: List[LoadData], seed: int = 42) -> List[Dict[str, Any]]:
+    """call_ended call data (as dumped by the webhook handler) for calls about the given loads"""
+    rng = random.Random(seed)
+    outcomes = [outcome for outcome, _ in CALL_OUTCOMES]
+    weights = [share for _, share in CALL_OUTCOMES]
+    calls = []
+    for i in range(count):
+        load = rng.choice(loads)
+        outcome = rng.choices(outcomes, weights)[0]
+        rounds = rng.randint(1, 3) if outcome in ("deal_closed", "agreement_transfer_failed", "no_agreement") else 0
+        final_rate = round(load.loadboard_rate * rng.uniform(1.0, 1.15), -1) if rounds else None
+        mc_number = str(rng.randint(100000, 899999))
+        call = {
+            "call_id": f"call-{seed}-{i:07d}",
+            "load_id": load.load_id,
+            "outcome": outcome,
+            "original_rate": load.loadboard_rate,
+            "final_rate": final_rate,
+            "negotiation_rounds": rounds,
+            "negotiation_occurred": rounds > 0,
+            "agreement_reached": outcome in ("deal_closed", "agreement_transfer_failed"),
+            "carrier_interested": outcome not in ("no_interest", "carrier_not_eligible"),
+            "call_duration_seconds": rng.randint(10, 900),
+            "questions_asked": rng.randint(0, 8),
+            "multiple_loads_discussed": rng.random() < 0.2,
+            "call_events": [
+                {"type": rng.choice(CALL_EVENT_TYPES), "timestamp": f"2024-12-19T10:{minute:02d}:00Z"}
+                for minute in range(rng.randint(0, 40))
+            ],
+            "carrier_info": {"mc_number": mc_number, "company_name": f"Carrier {mc_number} LLC",
+                             "phone_number": f"+1555{rng.randint(0, 9999999):07d}", "email": None},
+            "load_info": load.model_dump(mode="json")
+        }
+        if rng.random() < 0.3:
+            call["carrier_sentiment"] = rng.choice(["positive", "neutral", "frustrated", "interested"])
+        calls.append(call)
+    return calls
+
+
+def generate_negotiations(count: int, loads: List[LoadData], seed: int = 42) -> List[NegotiationOffer]:
+    """Completed negotiation sessions on the lanes of the given loads"""
+    rng = random.Random(seed)
+    negotiations = []
+    for _ in range(count):
+        load = rng.choice(loads)
+        rounds = rng.randint(1, 3)
+        offered = round(load.loadboard_rate * rng.uniform(1.0, 1.2), -1)
+        origin_state = load.origin.rsplit(",", 1)[-1].strip()
+        destination_state = load.destination.rsplit(",", 1)[-1].strip()
+        negotiations.append(NegotiationOffer(
+            load_id=load.load_id,
+            carrier_mc=str(rng.randint(100000, 899999)),
+            original_rate=load.loadboard_rate,
+            offered_rate=offered,
+            counter_offer_count=rounds,
+            max_acceptable_rate=round(load.loadboard_rate * 1.15, 2),
+            status=rng.choice(["accepted", "accepted", "rejected", "limit_reached", "completed"]),
+            negotiation_history=[{"round": r + 1, "offered_rate": offered} for r in range(rounds)],
+            origin_state=origin_state,
+            destination_state=destination_state,
+            equipment_type=load.equipment_type.lower()
+        ))
+    return negotiations
+
+
+def populate_database(path: Path, rows: int, seed: int = 42, days: int = 90, distinct_calls: int = 2000) -> None:
+    """
+    Create a database at path holding rows analyzed calls (and rows // 3 negotiations) over the last days.
+
+    distinct_calls calls are analyzed with the real rules and their rows are
+    repeated with new ids and dates, which keeps a million rows fast to build.
+    Aggregates (sketches, counters, lane cube) are rebuilt from the rows.
+    """
+    from src.database import storage, init_database, rebuild_aggregates
+    from src.services.analytics import extract_call_analytics
+    from src.services.lanes import lane_key
+
+    storage.DB_PATH = Path(path)
+    init_database()
+    rng = random.Random(seed)
+    loads = generate_loads(200, seed=seed)
+    now = datetime.utcnow()
+
+    templates = []
+    for call in generate_calls(min(rows, distinct_calls), loads, seed=seed):
+        analytics = extract_call_analytics(call)
+        load = LoadData(**call["load_info"])
+        templates.append((
+            json.dumps(analytics["offer_data"]), json.dumps(analytics["call_outcome"]),
+            json.dumps(analytics["carrier_sentiment"]), json.dumps(analytics["summary"]),
+            json.dumps(analytics["call_features"]), analytics["analysis_version"],
+            "|".join(lane_key(load.origin, load.destination, load.equipment_type)), load.loadboard_rate
+        ))
+
+    conn = storage._connect()
+    try:
+        def analytics_rows():
+            for i in range(rows):
+                created_at = (now - timedelta(days=rng.random() * days)).isoformat()
+                template = templates[i % len(templates)]
+                yield (f"syn-{i}", f"evt-{i}", created_at, *template[:4], created_at, *template[4:])
+
+        conn.executemany("""
+            INSERT INTO call_analytics (
+                call_id, event_id, analysis_timestamp, offer_data, call_outcome, carrier_sentiment,
+                summary_metrics, created_at, call_features, analysis_version, lane, posted_rate
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, analytics_rows())
+
+        def negotiation_rows():
+            for negotiation in generate_negotiations(rows // 3, loads, seed=seed):
+                updated_at = (now - timedelta(days=rng.random() * days)).isoformat()
+                yield (negotiation.load_id, negotiation.carrier_mc, negotiation.original_rate,
+                       negotiation.offered_rate, negotiation.max_acceptable_rate, negotiation.counter_offer_count,
+                       negotiation.status, json.dumps(negotiation.negotiation_history), updated_at, updated_at,
+                       negotiation.origin_state, negotiation.destination_state, negotiation.equipment_type)
+
+        conn.executemany("""
+            INSERT INTO negotiations (
+                load_id, carrier_mc, original_rate, offered_rate, max_acceptable_rate, counter_offer_count,
+                status, negotiation_history, created_at, updated_at, origin_state, destination_state, equipment_type
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, negotiation_rows())
+        conn.commit()
+    finally:
+        conn.close()
+    rebuild_aggregates()
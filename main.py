@@ -1,3 +1,6 @@
+# First, so that with STARTUP_PROFILE_IMPORTS=1 the import of everything below is timed
+from src.monitoring.startup import startup_profile
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -6,18 +9,41 @@ from datetime import datetime
 import logging
 import os
 
-from src.services import initialize_sample_data
-from src.routes import webhook_router, loads_router, carriers_router, dashboard_router
+from src.services import (
+    initialize_sample_data, negotiation_sessions, dashboard_broadcaster, analytics_summary_cache,
+    sentiment_trackers, lane_rate_index, warm_up, close_fmcsa_client
+)
+from src.routes import webhook_router, loads_router, carriers_router, dashboard_router, metrics_router, diagnostics_router, FastJSONResponse
 from src.auth import check_security_configuration
+from src.handlers import webhook_worker_pool, idempotency_index
+from src.database import loads_db, SHARED_MODE, WEB_CONCURRENCY
+from src.monitoring import (
+    MetricsMiddleware, ProfilerMiddleware, metrics_snapshots, profiler, memory_monitor,
+    configure_logging, parse_sampling
+)
 
 # Configure logging for production monitoring and debugging
+# Records are queued and written by a background thread, as JSON lines unless LOG_FORMAT=text
 log_level = getattr(logging, os.getenv("LOG_LEVEL", "WARNING").upper(), logging.WARNING)
-logging.basicConfig(
+configure_logging(
     level=log_level,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    json_format=os.getenv("LOG_FORMAT", "json").lower() != "text",
+    sampling=parse_sampling(os.getenv("LOG_SAMPLING", "")),  # e.g. "src.database.storage=0.1"
+    queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000"))
 )
 logger = logging.getLogger(__name__)
 
+# Long-lived in-process structures reported by /diagnostics/memory
+memory_monitor.track("loads_db", loads_db)
+memory_monitor.track("negotiation_sessions", negotiation_sessions)
+memory_monitor.track("sentiment_trackers", sentiment_trackers)
+memory_monitor.track("idempotency_index", idempotency_index)
+memory_monitor.track("lane_rate_index", lane_rate_index)
+memory_monitor.track("analytics_summary_cache", analytics_summary_cache,
+                     count=lambda: int(analytics_summary_cache.version >= 0))
+memory_monitor.track("dashboard_subscribers", dashboard_broadcaster, count=lambda: dashboard_broadcaster.subscribers)
+memory_monitor.track("webhook_queue", webhook_worker_pool, count=webhook_worker_pool.queue_depth)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -25,13 +51,42 @@ async def lifespan(app: FastAPI):
     Application lifespan management
     Handles startup tasks like security validation and data initialization
     """
-    # Startup
+    # Startup; each step is timed in the startup profile (/diagnostics/startup)
     logger.info("🚀 Starting HappyRobot API...")
-    check_security_configuration()  # Validate API keys and security settings
-    await initialize_sample_data()  # Load sample carriers and freight loads
+    with startup_profile.step("check_security_configuration"):
+        check_security_configuration()  # Validate API keys and security settings
+    if SHARED_MODE:
+        logger.info("Worker %s of %s: sharing state through the database and SHARED_STATE_DIR",
+                    os.getpid(), WEB_CONCURRENCY)
+        for setting in ("METRICS_MULTIPROC_DIR", "RATE_LIMIT_FILE"):
+            if not os.getenv(setting):
+                logger.warning("%s workers but %s is not set: each worker keeps its own", WEB_CONCURRENCY, setting)
+    with startup_profile.step("initialize_sample_data"):
+        await initialize_sample_data()  # Load sample carriers and freight loads
+    with startup_profile.step("background_tasks"):
+        await lane_rate_index.start()  # Pick up negotiations stored by the other workers
+        await negotiation_sessions.start()  # Persist expired sessions every NEGOTIATION_SWEEP_INTERVAL seconds
+        await idempotency_index.start()  # Prune old idempotency keys every IDEMPOTENCY_PRUNE_INTERVAL seconds
+        await webhook_worker_pool.start()  # Background processing for non-interactive webhook events
+        await dashboard_broadcaster.start()  # Live dashboard updates over SSE
+        await metrics_snapshots.start()  # Share this worker's metrics with the others (METRICS_MULTIPROC_DIR)
+        await memory_monitor.start()  # Log memory growth every MEMORY_SAMPLE_INTERVAL seconds
+    await warm_up.start(app)  # Fill caches and indexes (WARM_UP=background|blocking|off)
+    startup_profile.mark_ready()
     logger.info("✅ API startup complete")
     yield
-    # Shutdown (if needed)
+    # Shutdown
+    await warm_up.stop()
+    profiler.stop()  # Write the stacks of a profiling window still open
+    await memory_monitor.stop()
+    await metrics_snapshots.stop()
+    await dashboard_broadcaster.stop()
+    await webhook_worker_pool.stop()
+    await lane_rate_index.stop()
+    await negotiation_sessions.stop()
+    await idempotency_index.stop()
+    negotiation_sessions.close_all()  # Persist negotiations still open (kept for the other workers when shared)
+    await close_fmcsa_client()
 
 
 # FastAPI application instance with metadata for API documentation
@@ -39,7 +94,8 @@ app = FastAPI(
     title="HappyRobot Inbound Carrier API",
     description="API for handling inbound carrier engagement and load management",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse  # Single-pass serialization in pydantic-core
 )
 
 # Mount static files for dashboard
@@ -56,12 +112,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency, status codes and in-flight requests per route, exposed at /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Marks requests selected by an open profiling window (/diagnostics/profiler)
+app.add_middleware(ProfilerMiddleware)
+
 # Include API route modules
 # Each router handles specific business domain (carriers, loads, webhooks, dashboard)
 app.include_router(webhook_router)  # POST /webhook/carrier-engagement
 app.include_router(loads_router)    # GET /loads/for-voice-agent
 app.include_router(carriers_router) # GET /verify-carrier/{mc_number}
 app.include_router(dashboard_router) # GET /dashboard/analytics, /dashboard/status
+app.include_router(metrics_router)   # GET /metrics
+app.include_router(diagnostics_router) # /diagnostics/profiler/*, /diagnostics/memory/*
 
 
 # Basic health endpoints for monitoring and status checks
@@ -77,8 +141,8 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint for load balancers and monitoring systems"""
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+    """Health check endpoint for load balancers and monitoring systems, with this worker's startup times"""
+    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat(), "startup": startup_profile.summary()}
 
 
 @app.get("/dashboard")
@@ -87,6 +151,8 @@ async def dashboard():
     from fastapi.responses import FileResponse
     return FileResponse("static/dashboard/index.html")
 
+startup_profile.mark_imported()
+
 
 # Development server configuration
 if __name__ == "__main__":
@@ -105,10 +171,11 @@ if __name__ == "__main__":
             reload=True
         )
     else:
-        # For production without reload
+        # For production without reload; several workers (WEB_CONCURRENCY) share state through the database
         uvicorn.run(
-            app, 
+            "main:app" if WEB_CONCURRENCY > 1 else app,
             host=host, 
             port=port, 
-            reload=False
+            reload=False,
+            workers=WEB_CONCURRENCY
         ) 
\ No newline at end of file
@@ -1,3 +1,34 @@
-from .authentication import verify_api_key, security, check_security_configuration
+from .authentication import (
+    verify_api_key,
+    verify_voice_agent_key,
+    verify_webhook_key,
+    verify_dashboard_key,
+    require_scope,
+    authenticate,
+    security,
+    check_security_configuration,
+    issue_stream_token,
+    verify_stream_token
+)
+from .keys import ApiKey, KeyStore, TokenBucketLimiter, key_store, rate_limiter, hash_api_key, SCOPES, DEFAULT_API_KEY
 
-__all__ = ["verify_api_key", "security", "check_security_configuration"] 
\ No newline at end of file
+__all__ = [
+    "verify_api_key",
+    "verify_voice_agent_key",
+    "verify_webhook_key",
+    "verify_dashboard_key",
+    "require_scope",
+    "authenticate",
+    "security",
+    "check_security_configuration",
+    "issue_stream_token",
+    "verify_stream_token",
+    "ApiKey",
+    "KeyStore",
+    "TokenBucketLimiter",
+    "key_store",
+    "rate_limiter",
+    "hash_api_key",
+    "SCOPES",
+    "DEFAULT_API_KEY"
+]
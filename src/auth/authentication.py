@@ -1,8 +1,18 @@
+import hashlib
+import hmac
 import logging
+import math
 import os
-from fastapi import HTTPException, Security, status
+import secrets
+import time
+from typing import Callable, Optional
+from fastapi import HTTPException, Query, Security, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
+from ..database import SHARED_MODE
+from ..monitoring import AUTH_REJECTIONS
+from .keys import ApiKey, DEFAULT_API_KEY, key_store, rate_limiter
+
 logger = logging.getLogger(__name__)
 
 # Security
@@ -11,11 +21,13 @@ security = HTTPBearer()
 
 def validate_api_key_security():
     """Validate API key meets security requirements"""
-    api_key = os.getenv("HAPPYROBOT_API_KEY", "happyrobot-api-key-change-in-production")
+    api_key = key_store.env_key
+    if not api_key:
+        return True  # Only the hashed keys of API_KEYS_FILE are accepted
     min_length = 32
     
     if len(api_key) < min_length:
-        logger.warning(f"API key is too short ({len(api_key)} chars). Minimum: {min_length}")
+        logger.warning("API key is too short (%s chars). Minimum: %s", len(api_key), min_length)
         return False
     
     if api_key in ["happyrobot-api-key-change-in-production", "test-key", "demo-key"]:
@@ -25,16 +37,89 @@ def validate_api_key_security():
     return True
 
 
-def verify_api_key(credentials: HTTPAuthorizationCredentials = Security(security)):
-    """Verify API key authentication"""
-    api_key = os.getenv("HAPPYROBOT_API_KEY", "happyrobot-api-key-change-in-production")
-    if credentials.credentials != api_key:
+def authenticate(presented: str, scope: Optional[str] = None) -> ApiKey:
+    """
+    Resolve a bearer token to its stored key, check the scope and take a
+    token from the key's rate-limit bucket (401, 403 or 429 otherwise)
+    """
+    api_key = key_store.authenticate(presented)
+    if api_key is None:
+        AUTH_REJECTIONS.inc("unknown", "invalid_key")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return credentials.credentials
+    if not api_key.allows(scope):
+        AUTH_REJECTIONS.inc(api_key.key_id, "forbidden")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"API key not allowed for {scope}")
+    allowed, retry_after = rate_limiter.acquire(api_key.key_id, api_key.rate_per_second, api_key.burst)
+    if not allowed:
+        AUTH_REJECTIONS.inc(api_key.key_id, "rate_limited")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    return api_key
+
+
+def require_scope(scope: Optional[str]) -> Callable[..., ApiKey]:
+    """Dependency accepting keys with the given scope (voice_agent, webhook, dashboard; None for any)"""
+    def verify(credentials: HTTPAuthorizationCredentials = Security(security)) -> ApiKey:
+        return authenticate(credentials.credentials, scope)
+    verify.__name__ = f"verify_{scope or 'any'}_api_key"
+    return verify
+
+
+# Any valid key, whatever its scopes
+verify_api_key = require_scope(None)
+verify_voice_agent_key = require_scope("voice_agent")
+verify_webhook_key = require_scope("webhook")
+verify_dashboard_key = require_scope("dashboard")
+
+
+# Short-lived tokens for clients that cannot send headers (EventSource)
+STREAM_TOKEN_TTL = int(os.getenv("STREAM_TOKEN_TTL", "3600"))
+
+
+def _stream_token_secret() -> bytes:
+    """
+    STREAM_TOKEN_SECRET, or a random secret for this process (tokens then
+    stop validating on restart and the dashboard fetches a new one). Workers
+    must share the secret, so it is required with several of them.
+    """
+    secret = os.getenv("STREAM_TOKEN_SECRET")
+    if secret:
+        return secret.encode()
+    if SHARED_MODE:
+        raise RuntimeError("STREAM_TOKEN_SECRET must be set when running several workers")
+    return secrets.token_bytes(32)
+
+
+STREAM_TOKEN_SECRET = _stream_token_secret()
+
+
+def _sign_stream_token(expires: int) -> str:
+    return hmac.new(STREAM_TOKEN_SECRET, f"stream:{expires}".encode(), hashlib.sha256).hexdigest()
+
+
+def issue_stream_token() -> str:
+    """Signed token valid for STREAM_TOKEN_TTL seconds, passed as ?token= on streaming endpoints"""
+    expires = int(time.time()) + STREAM_TOKEN_TTL
+    return f"{expires}.{_sign_stream_token(expires)}"
+
+
+def verify_stream_token(token: Optional[str] = Query(None)):
+    """Verify a stream token from the query string (the API key never goes in URLs)"""
+    try:
+        expires, signature = (token or "").split(".", 1)
+        valid = int(expires) >= time.time() and hmac.compare_digest(signature, _sign_stream_token(int(expires)))
+    except ValueError:
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired stream token")
+    return token
 
 
 # Check security on startup
@@ -50,7 +135,14 @@ def check_security_configuration():
     if not require_https and api_key != "happyrobot-test-key-123456":
         issues.append("HTTPS not required")
     
+    if key_store.default_key_active:
+        issues.append(f"the public default API key is accepted with scopes {', '.join(key_store.env_scopes)}")
+    
+    unlimited = [api_key.key_id for api_key in key_store.keys if api_key.rate_per_second <= 0]
+    if key_store.path is not None and unlimited:
+        logger.info("API keys without a rate limit: %s", ', '.join(unlimited))
+    
     if issues:
-        logger.warning(f"Security issues detected: {', '.join(issues)}")
+        logger.warning("Security issues detected: %s", ', '.join(issues))
     
     logger.info("For production: Use strong API keys (32+ chars) and enable HTTPS") 
\ No newline at end of file
@@ -0,0 +1,252 @@
+"""
+API key store and per-key rate limiting.
+
+Keys are kept as SHA-256 digests only. The store is loaded once from
+API_KEYS_FILE (JSON) plus the HAPPYROBOT_API_KEY environment key (the public
+default key only when neither is configured), and the
+file is re-read when its modification time changes (checked at most every
+API_KEYS_RELOAD_INTERVAL seconds), so keys can be added, revoked or re-scoped
+without a restart. A presented key is compared with every stored digest in
+constant time.
+
+    {"keys": [
+        {"id": "voice-agent", "sha256": "<hex digest of the key>", "scopes": ["voice_agent"],
+         "rate_per_second": 20, "burst": 40},
+        {"id": "dashboard", "sha256": "...", "scopes": ["dashboard"]}
+    ]}
+
+Each key gets a token bucket (rate_per_second, burst; 0 means unlimited). The
+buckets live in a memory-mapped table; with several workers, point
+RATE_LIMIT_FILE at the same file (preferably on tmpfs, e.g. /dev/shm) so all
+of them draw from the same buckets. Without it the buckets are per process.
+"""
+
+import fcntl
+import hashlib
+import hmac
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ("voice_agent", "webhook", "dashboard")
+ALL_SCOPES = "*"
+
+DEFAULT_API_KEY = "happyrobot-api-key-change-in-production"
+
+
+def hash_api_key(key: str) -> str:
+    """Hex SHA-256 digest stored in API_KEYS_FILE for key"""
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class ApiKey:
+    """A stored key: id, digest, scopes and rate limit"""
+
+    __slots__ = ("key_id", "digest", "scopes", "rate_per_second", "burst")
+
+    def __init__(self, key_id: str, digest: bytes, scopes: Iterable[str],
+                 rate_per_second: float = 0.0, burst: Optional[float] = None):
+        self.key_id = key_id
+        self.digest = digest
+        self.scopes = frozenset(scopes)
+        self.rate_per_second = rate_per_second
+        self.burst = burst if burst is not None else max(1.0, rate_per_second)
+
+    def allows(self, scope: Optional[str]) -> bool:
+        return scope is None or ALL_SCOPES in self.scopes or scope in self.scopes
+
+    def info(self) -> Dict[str, object]:
+        return {"id": self.key_id, "scopes": sorted(self.scopes),
+                "rate_per_second": self.rate_per_second, "burst": self.burst}
+
+
+class KeyStore:
+    """Hashed API keys from a JSON file and the environment, reloaded when the file changes"""
+
+    def __init__(self, path: Optional[Path], env_key: Optional[str], env_scopes: Iterable[str] = (ALL_SCOPES,),
+                 default_rate: float = 0.0, default_burst: Optional[float] = None, reload_interval: float = 1.0):
+        self.path = Path(path) if path else None
+        self.env_key = env_key
+        self.env_scopes = tuple(env_scopes)
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self.reload_interval = reload_interval
+        self._keys: List[ApiKey] = []
+        self._mtime: Optional[int] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    @property
+    def keys(self) -> List[ApiKey]:
+        return self._keys
+
+    @property
+    def default_key_active(self) -> bool:
+        """Whether the public DEFAULT_API_KEY is accepted"""
+        return self.env_key == DEFAULT_API_KEY
+
+    def _parse(self, entry: Dict[str, object]) -> ApiKey:
+        digest = bytes.fromhex(str(entry["sha256"]))
+        if len(digest) != 32:
+            raise ValueError(f"key {entry.get('id')}: sha256 must be a 64-character hex digest")
+        scopes = entry.get("scopes") or [ALL_SCOPES]
+        unknown = set(scopes) - set(SCOPES) - {ALL_SCOPES}
+        if unknown:
+            raise ValueError(f"key {entry.get('id')}: unknown scopes {sorted(unknown)}")
+        burst = entry.get("burst", self.default_burst)
+        return ApiKey(str(entry["id"]), digest, scopes, float(entry.get("rate_per_second", self.default_rate)),
+                      float(burst) if burst is not None else None)
+
+    def reload(self) -> None:
+        """Re-read the key file; on a bad file the current keys are kept"""
+        keys = []
+        if self.env_key:
+            keys.append(ApiKey("default", hashlib.sha256(self.env_key.encode()).digest(), self.env_scopes,
+                               self.default_rate, self.default_burst))
+        mtime = None
+        if self.path is not None:
+            try:
+                mtime = self.path.stat().st_mtime_ns
+                keys.extend([self._parse(entry) for entry in json.loads(self.path.read_text())["keys"]])
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.error("Error loading API keys from %s: %s", self.path, e)
+                if self._keys:
+                    self._mtime = mtime
+                    return
+        self._keys = keys
+        self._mtime = mtime
+        logger.info("Loaded %s API keys", len(keys))
+
+    def maybe_reload(self) -> None:
+        """Reload if the key file changed since it was read (stat at most every reload_interval)"""
+        now = time.monotonic()
+        if self.path is None or now - self._checked < self.reload_interval:
+            return
+        with self._lock:
+            if now - self._checked < self.reload_interval:
+                return
+            self._checked = now
+            try:
+                mtime = self.path.stat().st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime != self._mtime:
+                self.reload()
+
+    def authenticate(self, presented: str) -> Optional[ApiKey]:
+        """The stored key matching presented, comparing every digest in constant time"""
+        self.maybe_reload()
+        digest = hashlib.sha256(presented.encode()).digest()
+        match = None
+        for key in self._keys:
+            if hmac.compare_digest(digest, key.digest):
+                match = key
+        return match
+
+
+# Bucket slot: key id digest, tokens left, last refill (Unix time)
+_SLOT = struct.Struct("32sdd")
+_EMPTY = bytes(32)
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets per key id in an open-addressed table of fixed-size slots.
+
+    The table is an anonymous buffer, or a shared memory-mapped file guarded by
+    flock so several worker processes update the same buckets.
+    """
+
+    def __init__(self, path: Optional[Path] = None, slots: int = 1024):
+        self.path = Path(path) if path else None
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._full_warned = False
+        size = _SLOT.size * slots
+        if self.path is None:
+            self._table = bytearray(size)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self._fd).st_size < size:
+                    os.ftruncate(self._fd, size)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._table = mmap.mmap(self._fd, size)
+
+    def _slot(self, key_digest: bytes) -> Optional[int]:
+        """Offset of the key's slot, claiming an empty one for a new key"""
+        start = int.from_bytes(key_digest[:4], "big") % self.slots
+        for probe in range(self.slots):
+            offset = ((start + probe) % self.slots) * _SLOT.size
+            stored = bytes(self._table[offset:offset + 32])
+            if stored == key_digest:
+                return offset
+            if stored == _EMPTY:
+                _SLOT.pack_into(self._table, offset, key_digest, -1.0, 0.0)
+                return offset
+        return None
+
+    def acquire(self, key_id: str, rate_per_second: float, burst: float) -> Tuple[bool, float]:
+        """Take a token from the key's bucket: (allowed, seconds until a token is available)"""
+        if rate_per_second <= 0:
+            return True, 0.0
+        key_digest = hashlib.sha256(key_id.encode()).digest()
+        with self._lock:
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                offset = self._slot(key_digest)
+                if offset is None:
+                    if not self._full_warned:
+                        logger.warning("Rate limit table full (%s slots); not limiting new keys", self.slots)
+                        self._full_warned = True
+                    return True, 0.0
+                _, tokens, updated = _SLOT.unpack_from(self._table, offset)
+                now = time.time()
+                tokens = burst if tokens < 0 else min(burst, tokens + max(0.0, now - updated) * rate_per_second)
+                allowed = tokens >= 1.0
+                if allowed:
+                    tokens -= 1.0
+                _SLOT.pack_into(self._table, offset, key_digest, tokens, now)
+            finally:
+                if self._fd is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return allowed, 0.0 if allowed else (1.0 - tokens) / rate_per_second
+
+    def reset(self) -> None:
+        with self._lock:
+            self._table[:] = bytes(len(self._table))
+
+
+def _env_float(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+key_store = KeyStore(
+    Path(os.environ["API_KEYS_FILE"]) if os.getenv("API_KEYS_FILE") else None,
+    # With a key file, an unset HAPPYROBOT_API_KEY must not leave the public default key valid
+    os.getenv("HAPPYROBOT_API_KEY") or (None if os.getenv("API_KEYS_FILE") else DEFAULT_API_KEY),
+    env_scopes=[scope.strip() for scope in os.getenv("HAPPYROBOT_API_KEY_SCOPES", ALL_SCOPES).split(",")],
+    default_rate=float(os.getenv("RATE_LIMIT_PER_SECOND", "0")),  # 0 = unlimited
+    default_burst=_env_float("RATE_LIMIT_BURST"),
+    reload_interval=float(os.getenv("API_KEYS_RELOAD_INTERVAL", "1"))
+)
+
+rate_limiter = TokenBucketLimiter(
+    Path(os.environ["RATE_LIMIT_FILE"]) if os.getenv("RATE_LIMIT_FILE") else None,
+    slots=int(os.getenv("RATE_LIMIT_SLOTS", "1024"))
+)
@@ -1,19 +1,98 @@
 from .storage import (
     loads_db, 
-    negotiations_db,
     init_database,
+    batch_transaction,
+    recording_writes,
+    persist_writes,
+    DeferredWrite,
+    get_data_version,
     store_call_analytics,
     store_negotiation,
     store_call_event,
-    get_analytics_summary
+    get_analytics_summary,
+    get_quantile_summary,
+    get_distinct_counts,
+    query_lane_cube,
+    rebuild_aggregates,
+    get_accepted_negotiation_rates,
+    get_call_feature_range,
+    get_call_feature_columns,
+    update_call_classifications,
+    create_webhook_job,
+    update_webhook_job,
+    get_webhook_job,
+    get_pending_webhook_jobs,
+    claim_webhook_job,
+    store_dead_letter,
+    claim_idempotency_key,
+    complete_idempotency_key,
+    release_idempotency_key,
+    prune_idempotency_keys,
+    get_idempotent_response,
+    store_loads,
+    get_stored_loads,
+    get_call_state,
+    update_call_state,
+    pop_call_states,
+    count_call_states
 )
+from .shared import shared_versions, SharedVersions, SharedBuffer, SHARED_MODE, WEB_CONCURRENCY, process_identity
+from .inventory import load_inventory, LoadInventory
+from .columnar import ColumnarLoadStore, LoadSelection, SORT_KEYS as LOAD_SORT_KEYS
+from .event_log import EventLog, event_log, partition_hash
+from .sketches import DDSketch, HyperLogLog
  
 __all__ = [
     "loads_db", 
-    "negotiations_db",
     "init_database",
+    "batch_transaction",
+    "recording_writes",
+    "persist_writes",
+    "DeferredWrite",
+    "get_data_version",
     "store_call_analytics",
     "store_negotiation", 
     "store_call_event",
-    "get_analytics_summary"
+    "get_analytics_summary",
+    "get_quantile_summary",
+    "get_distinct_counts",
+    "query_lane_cube",
+    "rebuild_aggregates",
+    "get_accepted_negotiation_rates",
+    "get_call_feature_range",
+    "get_call_feature_columns",
+    "update_call_classifications",
+    "create_webhook_job",
+    "update_webhook_job",
+    "get_webhook_job",
+    "get_pending_webhook_jobs",
+    "claim_webhook_job",
+    "store_dead_letter",
+    "claim_idempotency_key",
+    "complete_idempotency_key",
+    "release_idempotency_key",
+    "prune_idempotency_keys",
+    "get_idempotent_response",
+    "store_loads",
+    "get_stored_loads",
+    "get_call_state",
+    "update_call_state",
+    "pop_call_states",
+    "count_call_states",
+    "shared_versions",
+    "SharedVersions",
+    "SharedBuffer",
+    "SHARED_MODE",
+    "WEB_CONCURRENCY",
+    "process_identity",
+    "load_inventory",
+    "LoadInventory",
+    "ColumnarLoadStore",
+    "LoadSelection",
+    "LOAD_SORT_KEYS",
+    "EventLog",
+    "event_log",
+    "partition_hash",
+    "DDSketch",
+    "HyperLogLog"
 ] 
\ No newline at end of file
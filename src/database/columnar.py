@@ -0,0 +1,364 @@
+"""
+Column-oriented in-memory load inventory.
+
+A LoadData model per load costs over a kilobyte, and searching means
+scanning all of them. The store keeps one array per field instead:
+- rates, weights, miles and piece counts as float64 (NaN when missing)
+- pickup and delivery times as int64 microseconds since the epoch
+- load ids as fixed-width bytes
+- cities, equipment and commodity, which repeat a lot, dictionary-encoded:
+  int32 codes into the column's list of distinct values, -1 when missing
+- notes and dimensions, which are free text, packed as one UTF-8 buffer
+  per column with an int64 offset per load
+That comes to about 105 bytes per load plus the text of its notes and
+dimensions (about 125 bytes with the synthetic loads), and the distinct
+values of the dictionary-encoded fields. A snapshot written by save() is
+about the same size.
+
+A substring filter is evaluated once per distinct value. The result is a
+lookup table, which the code column is gathered through. Sorting runs on
+the arrays. LoadData models are built only for the rows a caller reads
+from a LoadSelection. replace() and extend() swap in a new set of columns,
+so a search never sees a half-updated inventory.
+"""
+
+import itertools
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ..models import LoadData
+
+FLOAT_FIELDS = ("loadboard_rate", "weight", "miles", "num_of_pieces")
+STRING_FIELDS = ("origin", "destination", "equipment_type", "commodity_type")  # dictionary-encoded
+TEXT_FIELDS = ("notes", "dimensions")  # packed per row
+TIME_FIELDS = ("pickup_datetime", "delivery_datetime")
+
+# Orders of search results: soonest pickup, highest rate, highest rate per mile
+SORT_KEYS = ("pickup_datetime", "loadboard_rate", "rate_per_mile")
+
+_EPOCH = datetime(1970, 1, 1)
+_CHUNK_ROWS = 65536  # loads encoded at a time, bounding the Python objects held while encoding
+
+
+class _Dictionary:
+    """Distinct values of a string column, append-only; rows store their index"""
+
+    __slots__ = ("values", "_codes", "_lowered")
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: List[str] = list(values)
+        self._codes = {value: code for code, value in enumerate(self.values)}
+        self._lowered: Optional[List[str]] = None
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def containing(self, text: str) -> np.ndarray:
+        """Lookup table by code, whether the value contains text ignoring case; the last entry (code -1) is False"""
+        lowered = self._lowered
+        if lowered is None or len(lowered) != len(self.values):
+            lowered = self._lowered = [value.lower() for value in self.values]
+        text = text.lower()
+        table = np.zeros(len(lowered) + 1, dtype=bool)
+        table[:-1] = np.fromiter((text in value for value in lowered), dtype=bool, count=len(lowered))
+        return table
+
+
+class _Text:
+    """Strings packed into one UTF-8 buffer; string i is data[offsets[i]:offsets[i + 1]]"""
+
+    __slots__ = ("data", "offsets")
+
+    def __init__(self, data: bytes, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def pack(cls, values: Iterable[Optional[str]]) -> "_Text":
+        """Packed values; None is stored as an empty string"""
+        encoded = [b"" if value is None else value.encode() for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+        return cls(b"".join(encoded), offsets)
+
+    @classmethod
+    def concatenate(cls, parts: Sequence["_Text"]) -> "_Text":
+        shifts = np.cumsum([0] + [len(part.data) for part in parts[:-1]])
+        offsets = np.concatenate([parts[0].offsets[:1]]
+                                 + [part.offsets[1:] + shift for part, shift in zip(parts, shifts.tolist())])
+        return cls(b"".join(part.data for part in parts), offsets)
+
+    def strings(self, indices: Optional[np.ndarray] = None) -> List[str]:
+        """All the strings, or those at indices"""
+        data, offsets = self.data, self.offsets
+        if indices is not None and len(indices) <= 16:
+            # Scalar reads beat gathering the offsets for the few rows of a lookup or a page of results
+            return [data[offsets[index]:offsets[index + 1]].decode() for index in indices.tolist()]
+        starts, ends = offsets[:-1], offsets[1:]
+        if indices is not None:
+            starts, ends = starts[indices], ends[indices]
+        return [data[start:end].decode() for start, end in zip(starts.tolist(), ends.tolist())]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data) + self.offsets.nbytes
+
+
+def _micros(value: datetime) -> int:
+    """Microseconds since the epoch; aware datetimes are taken in UTC"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _datetime(micros: int, aware: bool) -> datetime:
+    value = _EPOCH + timedelta(microseconds=micros)
+    return value.replace(tzinfo=timezone.utc) if aware else value
+
+
+class _Columns:
+    """One immutable version of the inventory: arrays by field, packed text, string dictionaries and the id index"""
+
+    __slots__ = ("arrays", "texts", "dictionaries", "id_order", "sorted_ids", "size")
+
+    def __init__(self, arrays: Dict[str, np.ndarray], texts: Dict[str, _Text], dictionaries: Dict[str, _Dictionary]):
+        self.arrays = arrays
+        self.texts = texts
+        self.dictionaries = dictionaries
+        self.size = len(arrays["load_id"])
+        # Stable, so a lookup finds the first of duplicate ids like a scan would
+        self.id_order = np.argsort(arrays["load_id"], kind="stable").astype(np.int32)
+        self.sorted_ids = arrays["load_id"][self.id_order]
+
+    @classmethod
+    def empty(cls) -> "_Columns":
+        dictionaries = {name: _Dictionary() for name in STRING_FIELDS}
+        return cls(*_encode([], dictionaries), dictionaries)
+
+    def rows(self, indices: np.ndarray) -> List[LoadData]:
+        """The loads at these rows, as models; values are gathered column by column"""
+        arrays = self.arrays
+        values: Dict[str, List[Any]] = {"load_id": [value.decode() for value in arrays["load_id"][indices].tolist()]}
+        for name in STRING_FIELDS:
+            strings = self.dictionaries[name].values
+            values[name] = [strings[code] if code >= 0 else None for code in arrays[name][indices].tolist()]
+        missing = arrays["missing"][indices].tolist()
+        for bit, name in enumerate(TEXT_FIELDS):
+            values[name] = [None if flags >> bit & 1 else value
+                            for value, flags in zip(self.texts[name].strings(indices), missing)]
+        for name in FLOAT_FIELDS:
+            values[name] = [None if value != value else value for value in arrays[name][indices].tolist()]
+        values["num_of_pieces"] = [None if value is None else int(value) for value in values["num_of_pieces"]]
+        aware = arrays["aware"][indices].tolist()
+        for bit, name in enumerate(TIME_FIELDS):
+            values[name] = [_datetime(micros, bool(flags >> bit & 1))
+                            for micros, flags in zip(arrays[name][indices].tolist(), aware)]
+        names = list(values)
+        return [LoadData(**dict(zip(names, row))) for row in zip(*values.values())]
+
+
+def _encode(loads: Iterable[LoadData],
+            dictionaries: Dict[str, _Dictionary]) -> Tuple[Dict[str, np.ndarray], Dict[str, _Text]]:
+    """Column arrays and packed text of loads, adding new strings to dictionaries"""
+    parts: List[Dict[str, np.ndarray]] = []
+    text_parts: List[Dict[str, _Text]] = []
+    loads = iter(loads)
+    while True:
+        chunk = list(itertools.islice(loads, _CHUNK_ROWS))
+        if not chunk and parts:
+            break
+        part = {
+            "load_id": np.array([load.load_id.encode() for load in chunk], dtype=np.bytes_)
+            if chunk else np.array([], dtype="S1")
+        }
+        for name in STRING_FIELDS:
+            code = dictionaries[name].code
+            part[name] = np.fromiter((code(getattr(load, name)) for load in chunk), dtype=np.int32, count=len(chunk))
+        for name in FLOAT_FIELDS:
+            part[name] = np.array([getattr(load, name) for load in chunk], dtype=np.float64)  # None -> NaN
+        for name in TIME_FIELDS:
+            part[name] = np.fromiter((_micros(getattr(load, name)) for load in chunk), dtype=np.int64, count=len(chunk))
+        part["aware"] = np.fromiter(
+            (sum(1 << bit for bit, name in enumerate(TIME_FIELDS) if getattr(load, name).tzinfo is not None)
+             for load in chunk), dtype=np.uint8, count=len(chunk)
+        )
+        part["missing"] = np.fromiter(
+            (sum(1 << bit for bit, name in enumerate(TEXT_FIELDS) if getattr(load, name) is None)
+             for load in chunk), dtype=np.uint8, count=len(chunk)
+        )
+        parts.append(part)
+        text_parts.append({name: _Text.pack(getattr(load, name) for load in chunk) for name in TEXT_FIELDS})
+        if len(chunk) < _CHUNK_ROWS:
+            break
+    if len(parts) == 1:
+        return parts[0], text_parts[0]
+    return ({name: np.concatenate([part[name] for part in parts]) for name in parts[0]},
+            {name: _Text.concatenate([part[name] for part in text_parts]) for name in TEXT_FIELDS})
+
+
+class LoadSelection(Sequence[LoadData]):
+    """
+    Rows matched by a search, in inventory order or by a sort key.
+
+    LoadData models are built on access. With a sort key, reading a prefix
+    (selection[:n]) partially sorts only the n best rows.
+    """
+
+    def __init__(self, columns: _Columns, rows: np.ndarray, sort_by: Optional[str] = None):
+        self._columns = columns
+        self._rows = rows
+        self._sort_by = sort_by
+        self._sorted = sort_by is None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _keys(self, rows: np.ndarray) -> np.ndarray:
+        """Ascending sort keys of rows"""
+        arrays = self._columns.arrays
+        if self._sort_by == "pickup_datetime":
+            return arrays["pickup_datetime"][rows]
+        if self._sort_by == "loadboard_rate":
+            return -arrays["loadboard_rate"][rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate_per_mile = arrays["loadboard_rate"][rows] / arrays["miles"][rows]
+        # Loads without a usable distance go last
+        return np.where(np.isfinite(rate_per_mile) & (arrays["miles"][rows] > 0), -rate_per_mile, np.inf)
+
+    def _sort(self) -> np.ndarray:
+        if not self._sorted:
+            self._rows = self._rows[np.argsort(self._keys(self._rows), kind="stable")]
+            self._sorted = True
+        return self._rows
+
+    def _prefix(self, count: int) -> np.ndarray:
+        """The first count rows in order, without sorting the rest"""
+        if count <= 0:
+            return self._rows[:0]
+        if self._sorted or count * 4 >= len(self._rows):
+            return self._sort()[:count]
+        keys = self._keys(self._rows)
+        best = np.argpartition(keys, count - 1)[:count]
+        best = best[np.lexsort((best, keys[best]))]  # by key, then inventory order like a stable sort
+        return self._rows[best]
+
+    def indices(self) -> np.ndarray:
+        """Row numbers of the selection, in order"""
+        return self._sort()
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[LoadData, List[LoadData]]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            return self._columns.rows(self._prefix(stop)[start::step] if step > 0 else self._sort()[index])
+        return self._columns.rows(self._sort()[[index]])[0]
+
+    def __iter__(self) -> Iterator[LoadData]:
+        rows = self._sort()
+        for start in range(0, len(rows), 1024):
+            yield from self._columns.rows(rows[start:start + 1024])
+
+
+class ColumnarLoadStore:
+    """The load inventory as typed columns, searched with vectorized filters"""
+
+    def __init__(self, loads: Iterable[LoadData] = ()):
+        self._columns = _Columns.empty()
+        self.replace(loads)
+
+    def __len__(self) -> int:
+        return self._columns.size
+
+    def __iter__(self) -> Iterator[LoadData]:
+        return iter(self.search())
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[LoadData, List[LoadData]]:
+        return self.search()[index]
+
+    def replace(self, loads: Iterable[LoadData]) -> None:
+        """Make loads the whole inventory"""
+        dictionaries = {name: _Dictionary() for name in STRING_FIELDS}
+        self._columns = _Columns(*_encode(loads, dictionaries), dictionaries)
+
+    def extend(self, loads: Iterable[LoadData]) -> None:
+        """Append loads to the inventory"""
+        columns = self._columns
+        # Dictionaries are append-only, so the current columns stay valid while they grow
+        added, added_texts = _encode(loads, columns.dictionaries)
+        arrays = {name: np.concatenate([array, added[name]]) for name, array in columns.arrays.items()}
+        texts = {name: _Text.concatenate([text, added_texts[name]]) for name, text in columns.texts.items()}
+        self._columns = _Columns(arrays, texts, columns.dictionaries)
+
+    def clear(self) -> None:
+        self.replace(())
+
+    def search(self, origin: Optional[str] = None, destination: Optional[str] = None,
+               equipment_type: Optional[str] = None, sort_by: Optional[str] = None) -> LoadSelection:
+        """Loads whose origin, destination and equipment contain the given texts (ignoring case)"""
+        if sort_by is not None and sort_by not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key {sort_by!r}, expected one of {', '.join(SORT_KEYS)}")
+        columns = self._columns
+        rows = None
+        for name, text in (("origin", origin), ("destination", destination), ("equipment_type", equipment_type)):
+            if text:
+                # Later filters only look at the rows the earlier ones kept
+                table = columns.dictionaries[name].containing(text)
+                if rows is None:
+                    rows = np.flatnonzero(np.take(table, columns.arrays[name]))
+                else:
+                    rows = rows[np.take(table, columns.arrays[name][rows])]
+        return LoadSelection(columns, np.arange(columns.size) if rows is None else rows, sort_by)
+
+    def get(self, load_id: str) -> Optional[LoadData]:
+        """The load with this ID (the first one if several share it)"""
+        columns = self._columns
+        key = load_id.encode()
+        position = int(np.searchsorted(columns.sorted_ids, key))
+        if position < columns.size and columns.sorted_ids[position] == key:
+            return columns.rows(columns.id_order[position:position + 1])[0]
+        return None
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays, the packed text and the string dictionaries (as Python objects)"""
+        columns = self._columns
+        dictionaries = sum(sys.getsizeof(dictionary.values) + sys.getsizeof(dictionary._codes)
+                           + sum(map(sys.getsizeof, dictionary.values))
+                           for dictionary in columns.dictionaries.values())
+        return (sum(array.nbytes for array in columns.arrays.values())
+                + sum(text.nbytes for text in columns.texts.values())
+                + columns.id_order.nbytes + columns.sorted_ids.nbytes + dictionaries)
+
+    def save(self, file: Union[str, IO[bytes]]) -> None:
+        """Write the columns, packed text and dictionaries as an uncompressed .npz"""
+        columns = self._columns
+        arrays = {f"column_{name}": array for name, array in columns.arrays.items()}
+        texts = {f"text_{name}": text for name, text in columns.texts.items()}
+        # Dictionaries are packed too: a str_ array pads every value to the longest at 4 bytes a character
+        texts.update({f"values_{name}": _Text.pack(dictionary.values)
+                      for name, dictionary in columns.dictionaries.items()})
+        for name, text in texts.items():
+            arrays[f"{name}_data"] = np.frombuffer(text.data, dtype=np.uint8)
+            arrays[f"{name}_offsets"] = text.offsets
+        np.savez(file, **arrays)
+
+    def load(self, file: Union[str, IO[bytes]]) -> None:
+        """Replace the inventory with columns written by save()"""
+        with np.load(file, allow_pickle=False) as data:
+            arrays = {name[len("column_"):]: data[name] for name in data.files if name.startswith("column_")}
+
+            def text(name: str) -> _Text:
+                return _Text(data[f"{name}_data"].tobytes(), data[f"{name}_offsets"])
+
+            dictionaries = {name: _Dictionary(text(f"values_{name}").strings()) for name in STRING_FIELDS}
+            texts = {name: text(f"text_{name}") for name in TEXT_FIELDS}
+        self._columns = _Columns(arrays, texts, dictionaries)
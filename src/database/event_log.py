@@ -0,0 +1,256 @@
+"""
+Append-only log of raw webhook payloads.
+
+Every accepted webhook event is appended, zlib-compressed, to the active
+segment file of the log directory. Segments rotate at EVENT_LOG_SEGMENT_BYTES
+and are named by the offset of their first record; each has a sparse offset
+index (.idx) so a reader can seek to an offset without scanning the segment.
+Only the last EVENT_LOG_MAX_SEGMENTS segments are kept; older ones are
+deleted when the log rolls. The log is the source of truth for rebuilding
+analytics (see src/services/replay.py).
+
+Record layout (little endian):
+    offset u64 | length u32 | crc32 u32 | partition hash u32 | zlib(JSON)
+
+The partition hash (crc32 of the call_id) is stored uncompressed so replay
+workers can skip other partitions without decompressing them.
+
+Several processes (the workers of a deployment) can append to the same log:
+appends and rolls hold an flock on the memory-mapped state file of the
+directory, which records the active segment, the next offset and the end of
+the last complete record. A record torn by a writer that died mid-append is
+truncated under that lock, so it never cuts into a record being written.
+"""
+
+import bisect
+import logging
+import os
+import struct
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from pydantic_core import from_json, to_json
+
+from .shared import SharedBuffer
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<QIII")
+_INDEX_ENTRY = struct.Struct("<II")  # offset relative to the segment base, byte position
+_SEGMENT_SUFFIX = ".log"
+_INDEX_SUFFIX = ".idx"
+
+# Shared state: magic, active segment base, next offset, end of the last complete record, bytes since the last index entry
+_STATE = struct.Struct("<4sQQQQ")
+_STATE_MAGIC = b"ELG1"
+_STATE_FILE = "state"
+
+
+def partition_hash(call_id: Optional[str]) -> int:
+    """Stable hash of a call id (Python's hash() is randomized per process)"""
+    return zlib.crc32((call_id or "").encode())
+
+
+class EventLog:
+    """Segmented, compressed, append-only event log with a sparse offset index"""
+
+    def __init__(self, directory: Path, segment_bytes: int = 64 * 1024 * 1024,
+                 index_interval_bytes: int = 4096, compression_level: int = 6, max_segments: int = 0):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments  # 0 keeps every segment
+        self.index_interval_bytes = index_interval_bytes
+        self.compression_level = compression_level
+        self._state: Optional[SharedBuffer] = None
+        self._segment: Optional[BinaryIO] = None
+        self._index: Optional[BinaryIO] = None
+        self._segment_base = -1
+
+    @property
+    def next_offset(self) -> int:
+        with self._locked() as state:
+            return state[1]
+
+    def append(self, event_id: str, call_id: Optional[str], received_at: str, payload: Any) -> int:
+        """Append one event (payload is a pydantic model or JSON-compatible value); returns its offset"""
+        record = to_json({"event_id": event_id, "call_id": call_id, "received_at": received_at, "payload": payload})
+        data = zlib.compress(record, self.compression_level)
+        key = partition_hash(call_id)
+
+        with self._locked() as state:
+            base, offset, end, bytes_since_index = state
+            if end >= self.segment_bytes:
+                self._roll(offset)
+                base, end, bytes_since_index = offset, 0, 0
+
+            if bytes_since_index >= self.index_interval_bytes or end == 0:
+                self._index.write(_INDEX_ENTRY.pack(offset - base, end))
+                self._index.flush()
+                bytes_since_index = 0
+
+            self._segment.write(_HEADER.pack(offset, len(data), zlib.crc32(data), key))
+            self._segment.write(data)
+            self._segment.flush()
+            size = _HEADER.size + len(data)
+            state[:] = [base, offset + 1, end + size, bytes_since_index + size]
+            return offset
+
+    def read(self, from_offset: int = 0, partition: Optional[int] = None,
+             partitions: int = 1) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Stream (offset, record) from from_offset to the end of the log.
+
+        With partition set, only records whose call_id hashes to it
+        (hash % partitions) are decompressed and returned.
+        """
+        segments = self.segments()
+        for position, (base, path) in enumerate(segments):
+            if position + 1 < len(segments) and segments[position + 1][0] <= from_offset:
+                continue
+
+            try:
+                segment = open(path, "rb")
+            except FileNotFoundError:
+                continue  # Deleted by retention since it was listed
+            with segment:
+                segment.seek(self._seek_position(path, from_offset - base) if from_offset > base else 0)
+                for offset, key, data in self._scan(segment):
+                    if offset < from_offset:
+                        continue
+                    if partition is not None and key % partitions != partition:
+                        continue
+                    yield offset, from_json(zlib.decompress(data))
+
+    def segments(self) -> List[Tuple[int, Path]]:
+        """(base offset, path) of every segment, oldest first"""
+        if not self.directory.exists():
+            return []
+        return sorted(
+            (int(path.stem), path) for path in self.directory.glob(f"*{_SEGMENT_SUFFIX}") if path.stem.isdigit()
+        )
+
+    def close(self) -> None:
+        if self._state is None:
+            return
+        with self._state.locked():
+            self._close_segment()
+
+    def _seek_position(self, segment_path: Path, relative_offset: int) -> int:
+        """Byte position of the last indexed record at or before relative_offset"""
+        index_path = segment_path.with_suffix(_INDEX_SUFFIX)
+        if not index_path.exists():
+            return 0
+        raw = index_path.read_bytes()
+        entries = [_INDEX_ENTRY.unpack_from(raw, i) for i in range(0, len(raw) - len(raw) % _INDEX_ENTRY.size,
+                                                                     _INDEX_ENTRY.size)]
+        position = bisect.bisect_right([entry[0] for entry in entries], relative_offset) - 1
+        return entries[position][1] if position >= 0 else 0
+
+    @staticmethod
+    def _scan(segment: BinaryIO) -> Iterator[Tuple[int, int, bytes]]:
+        """(offset, partition hash, compressed data) of each intact record; stops at a torn tail"""
+        while True:
+            header = segment.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            offset, length, crc, key = _HEADER.unpack(header)
+            data = segment.read(length)
+            if len(data) < length or zlib.crc32(data) != crc:
+                return
+            yield offset, key, data
+
+    @contextmanager
+    def _locked(self) -> Iterator[List[int]]:
+        """
+        Exclusive access to the log for this thread and process, with the
+        shared state (base, next offset, end, bytes since index) as a list the
+        caller updates; the active segment is open for appending.
+        """
+        if self._state is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._state = SharedBuffer(self.directory / _STATE_FILE, _STATE.size)
+        with self._state.locked() as buffer:
+            magic, *state = _STATE.unpack_from(buffer, 0)
+            if magic != _STATE_MAGIC:
+                state = self._recover()
+            state = self._sync(state)
+            yield state
+            _STATE.pack_into(buffer, 0, _STATE_MAGIC, *state)
+
+    def _recover(self) -> List[int]:
+        """State of a log without one (new, or written by an older version) from its last segment"""
+        segments = self.segments()
+        if not segments:
+            self._segment_path(0).touch()
+            return [0, 0, 0, 0]
+        base, path = segments[-1]
+        # Force an index entry for the first record appended after recovering
+        return self._adopt_tail(path, [base, base, 0, self.index_interval_bytes])
+
+    def _sync(self, state: List[int]) -> List[int]:
+        """Follow a roll made by another process and repair a tail left by one that died mid-append"""
+        try:
+            size = self._segment_path(state[0]).stat().st_size
+        except FileNotFoundError:
+            size = -1
+        if size < state[2]:
+            # Segment removed or cut short behind the log's back: rebuild the state from the files
+            state = self._recover()
+        elif size > state[2]:
+            state = self._adopt_tail(self._segment_path(state[0]), state)
+        if state[0] != self._segment_base:
+            self._close_segment()
+            self._open_segment(state[0])
+        return state
+
+    def _adopt_tail(self, path: Path, state: List[int]) -> List[int]:
+        """Keep intact records past the recorded end (written, not yet recorded) and truncate the rest"""
+        base, next_offset, end, bytes_since_index = state
+        with open(path, "rb") as segment:
+            segment.seek(end)
+            for offset, _, data in self._scan(segment):
+                bytes_since_index += segment.tell() - end
+                end = segment.tell()
+                next_offset = offset + 1
+        if end < path.stat().st_size:
+            logger.warning("Truncating torn record at byte %s of event log segment %s", end, path.name)
+            os.truncate(path, end)
+        return [base, next_offset, end, bytes_since_index]
+
+    def _roll(self, base: int) -> None:
+        self._close_segment()
+        self._open_segment(base)
+        logger.info("Event log rolled to segment %s", base)
+        if self.max_segments > 0:
+            for _, path in self.segments()[:-self.max_segments]:
+                path.unlink(missing_ok=True)
+                path.with_suffix(_INDEX_SUFFIX).unlink(missing_ok=True)
+                logger.info("Deleted event log segment %s", path.name)
+
+    def _segment_path(self, base: int) -> Path:
+        return self.directory / f"{base:020d}{_SEGMENT_SUFFIX}"
+
+    def _open_segment(self, base: int) -> None:
+        path = self._segment_path(base)
+        self._segment = open(path, "ab")
+        self._index = open(path.with_suffix(_INDEX_SUFFIX), "ab")
+        self._segment_base = base
+
+    def _close_segment(self) -> None:
+        for handle in (self._segment, self._index):
+            if handle is not None:
+                handle.close()
+        self._segment = self._index = None
+        self._segment_base = -1
+
+
+# Opt-in: disabled unless EVENT_LOG_DIR is set
+_event_log_dir = os.getenv("EVENT_LOG_DIR", "")
+event_log: Optional[EventLog] = EventLog(
+    Path(_event_log_dir),
+    segment_bytes=int(os.getenv("EVENT_LOG_SEGMENT_BYTES", str(64 * 1024 * 1024))),
+    compression_level=int(os.getenv("EVENT_LOG_COMPRESSION_LEVEL", "6")),
+    max_segments=int(os.getenv("EVENT_LOG_MAX_SEGMENTS", "16"))  # 1 GB at the default segment size
+) if _event_log_dir else None
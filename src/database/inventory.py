@@ -0,0 +1,87 @@
+"""
+Load inventory shared by the worker processes.
+
+Each worker serves searches from its in-memory loads_db (a ColumnarLoadStore).
+With several workers the inventory of record is the loads table; a writer
+stores it there, writes the columns as a snapshot next to the shared versions
+(tmpfs, so workers load the arrays from memory rather than re-querying and
+re-validating rows from SQLite) and bumps the "loads" version. Readers call
+refresh(), which costs a counter read until the version moves and then swaps
+in the new snapshot.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import zipfile
+from pathlib import Path
+from typing import List, Optional
+
+from ..models import LoadData
+from .columnar import ColumnarLoadStore
+from .shared import SHARED_STATE_DIR, SharedVersions, shared_versions
+from .storage import loads_db, store_loads, get_stored_loads
+
+logger = logging.getLogger(__name__)
+
+
+class LoadInventory:
+    """The in-memory load list of this worker, kept in sync with the other workers"""
+
+    def __init__(self, loads: ColumnarLoadStore, versions: SharedVersions, snapshot_path: Optional[Path]):
+        self.loads = loads
+        self.versions = versions
+        self.snapshot_path = snapshot_path if versions.shared else None
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def replace(self, loads: List[LoadData]) -> None:
+        """Make loads the inventory of every worker"""
+        if self.snapshot_path is None:
+            self.loads.replace(loads)
+            return
+        with self._lock:
+            store_loads(loads)
+            self.loads.replace(loads)
+            temporary = self.snapshot_path.with_suffix(".tmp")
+            with open(temporary, "wb") as f:
+                self.loads.save(f)
+            os.replace(temporary, self.snapshot_path)
+            self._version = self.versions.bump("loads")
+
+    def refresh(self) -> bool:
+        """Swap in the shared inventory if another worker changed it; returns whether it did"""
+        if self.snapshot_path is None:
+            return False
+        version = self.versions.get("loads")
+        if version == self._version:
+            return False
+        with self._lock:
+            if version == self._version:
+                return False
+            try:
+                self.loads.load(self.snapshot_path)
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+                logger.warning("Load snapshot unreadable (%s), reading the loads table", e)
+                self.loads.replace(get_stored_loads())
+            self._version = version
+        logger.info("Load inventory refreshed to version %s: %s loads", version, len(self.loads))
+        return True
+
+    async def wait_until_ready(self, timeout: float = 30.0, poll_interval: float = 0.05) -> bool:
+        """Wait for the worker that initializes the deployment to publish the inventory"""
+        if self.snapshot_path is None:
+            return True
+        deadline = asyncio.get_running_loop().time() + timeout
+        while self.versions.get("loads") == 0:
+            if asyncio.get_running_loop().time() >= deadline:
+                logger.warning("No shared load inventory published yet, using the stored one")
+                self.loads.replace(get_stored_loads())
+                return False
+            await asyncio.sleep(poll_interval)
+        self.refresh()
+        return True
+
+
+load_inventory = LoadInventory(loads_db, shared_versions, SHARED_STATE_DIR / "loads.npz")
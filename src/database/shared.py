@@ -0,0 +1,130 @@
+"""
+Cross-process state for multi-worker deployments.
+
+With WEB_CONCURRENCY > 1 the workers share, under SHARED_STATE_DIR (local
+disk or tmpfs, default /dev/shm/happyrobot):
+
+- versions: named change counters in a memory-mapped file. Writers bump them;
+  every worker compares them on read to invalidate its caches (analytics
+  summary, load inventory snapshot, lane rate index), so reading one costs
+  no system call.
+- the load inventory snapshot (see LoadInventory).
+
+The versions file records the deployment it belongs to (the supervisor
+process that started the workers); the first worker of a new deployment
+resets it and seeds the shared state, workers started later (or restarted
+after a crash) attach to it. With a single worker everything is process-local.
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+SHARED_MODE = WEB_CONCURRENCY > 1
+SHARED_STATE_DIR = Path(os.getenv("SHARED_STATE_DIR") or (
+    "/dev/shm/happyrobot" if Path("/dev/shm").is_dir() else "/tmp/happyrobot"
+))
+
+
+class SharedBuffer:
+    """Fixed-size buffer, anonymous or a memory-mapped file locked with flock across processes"""
+
+    def __init__(self, path: Optional[Path], size: int):
+        self.path = Path(path) if path else None
+        self.size = size
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        if self.path is None:
+            self.buffer: Union[bytearray, mmap.mmap] = bytearray(size)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self._fd).st_size < size:
+                    os.ftruncate(self._fd, size)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self.buffer = mmap.mmap(self._fd, size)
+
+    @contextmanager
+    def locked(self) -> Iterator[Union[bytearray, mmap.mmap]]:
+        """Exclusive access for this thread and, when file-backed, this process"""
+        with self._lock:
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield self.buffer
+            finally:
+                if self._fd is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+def process_identity(pid: int) -> Optional[str]:
+    """"pid:start time" of a running process, None once it exited (the start time tells reused pids apart)"""
+    try:
+        started = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        # Without /proc no process can be told dead: treat them all as running
+        return None if Path("/proc/self").exists() else str(pid)
+    return f"{pid}:{started}"
+
+
+def _deployment_id() -> bytes:
+    """Identity of the supervisor process: pid, its start time and the boot id"""
+    parent = os.getppid()
+    try:
+        started = Path(f"/proc/{parent}/stat").read_text().rsplit(")", 1)[1].split()[19]
+        boot_id = Path("/proc/sys/kernel/random/boot_id").read_text().strip()
+    except (OSError, IndexError):
+        started, boot_id = "", ""
+    return f"{parent}:{started}:{boot_id}".encode()[:64]
+
+
+# Header: deployment id, deployment start (Unix time); then one counter per name
+_HEADER = struct.Struct("64sd")
+_COUNTER = struct.Struct("Q")
+
+
+class SharedVersions:
+    """Named change counters shared by the workers of a deployment"""
+
+    NAMES = ("analytics", "loads", "negotiations")
+
+    def __init__(self, path: Optional[Path]):
+        self._offsets = {name: _HEADER.size + i * _COUNTER.size for i, name in enumerate(self.NAMES)}
+        self._shared = SharedBuffer(path, _HEADER.size + len(self.NAMES) * _COUNTER.size)
+        deployment = _deployment_id() if path else b"local"
+        with self._shared.locked() as buffer:
+            stored, started_at = _HEADER.unpack_from(buffer, 0)
+            # The first process of a deployment (or a single worker) owns the initialization
+            self.is_initializer = stored.rstrip(b"\0") != deployment
+            if self.is_initializer:
+                buffer[:] = bytes(len(buffer))
+                started_at = time.time()
+                _HEADER.pack_into(buffer, 0, deployment, started_at)
+        self.started_at = started_at
+
+    @property
+    def shared(self) -> bool:
+        return self._shared.path is not None
+
+    def get(self, name: str) -> int:
+        return _COUNTER.unpack_from(self._shared.buffer, self._offsets[name])[0]
+
+    def bump(self, name: str) -> int:
+        offset = self._offsets[name]
+        with self._shared.locked() as buffer:
+            version = _COUNTER.unpack_from(buffer, offset)[0] + 1
+            _COUNTER.pack_into(buffer, offset, version)
+        return version
+
+
+shared_versions = SharedVersions(SHARED_STATE_DIR / "versions" if SHARED_MODE else None)
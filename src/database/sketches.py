@@ -0,0 +1,231 @@
+"""
+Mergeable quantile and cardinality sketches.
+
+DDSketch (Masson et al., VLDB 2019) maps each value to a logarithmic bucket,
+so every quantile estimate is within relative_accuracy of the true value,
+two sketches merge by adding bucket counts, and the sketch size grows with
+the log of the value range rather than the number of values. Storage keeps
+one sketch per metric, lane and day (see quantile_sketches in storage.py)
+and merges them when a summary is requested.
+
+HyperLogLog estimates the number of distinct values from 2^precision
+one-byte registers (about 1.6% standard error at precision 12); two
+sketches merge by taking the register-wise maximum, so hourly and daily
+buckets combine into any range (see hll_buckets in storage.py).
+
+DDSketch serialized layout (little endian):
+    version u8 | relative accuracy f64 | zero count, sum, min, max |
+    positive buckets | negative buckets
+where counts are varints and each bucket store is its size followed by
+(zigzag index delta, count) pairs in index order.
+"""
+
+import hashlib
+import math
+import struct
+import zlib
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<Bd")
+_STATS = struct.Struct("<ddd")
+
+# Values closer to zero than this are counted as zero
+MIN_INDEXABLE_VALUE = 1e-6
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, position: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+class DDSketch:
+    """Quantile sketch with relative-error guarantees, mergeable and compactly serializable"""
+
+    __slots__ = ("relative_accuracy", "max_buckets", "_gamma", "_log_gamma",
+                 "positive", "negative", "zero_count", "count", "sum", "min", "max")
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        return 2 * self._gamma ** index / (self._gamma + 1)
+
+    def add(self, value: float, weight: int = 1) -> None:
+        if value > MIN_INDEXABLE_VALUE:
+            store = self.positive
+            index = self._index(value)
+        elif value < -MIN_INDEXABLE_VALUE:
+            store = self.negative
+            index = self._index(-value)
+        else:
+            self.zero_count += weight
+            store = None
+        if store is not None:
+            store[index] = store.get(index, 0) + weight
+            if len(store) > self.max_buckets:
+                self._collapse(store)
+
+        self.count += weight
+        self.sum += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def update(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "DDSketch") -> None:
+        """Add the values of other (which must have the same relative accuracy)"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for index, count in other_store.items():
+                store[index] = store.get(index, 0) + count
+            if len(store) > self.max_buckets:
+                self._collapse(store)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _collapse(self, store: Dict[int, int]) -> None:
+        """Fold the lowest-magnitude buckets into one so the store stays bounded"""
+        indexes = sorted(store)
+        excess = indexes[:len(indexes) - self.max_buckets + 1]
+        target = indexes[len(excess)]
+        store[target] += sum(store.pop(index) for index in excess)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated q-quantile (0 <= q <= 1), None when empty"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+
+        seen = 0
+        for index in sorted(self.negative, reverse=True):
+            seen += self.negative[index]
+            if seen > rank:
+                return max(self.min, -self._value(index))
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive):
+            seen += self.positive[index]
+            if seen > rank:
+                return min(self.max, self._value(index))
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def to_bytes(self) -> bytes:
+        out = bytearray(_HEADER.pack(_FORMAT_VERSION, self.relative_accuracy))
+        _write_varint(out, self.zero_count)
+        out += _STATS.pack(self.sum, self.min, self.max)
+        for store in (self.positive, self.negative):
+            _write_varint(out, len(store))
+            previous = 0
+            for index in sorted(store):
+                delta = index - previous
+                _write_varint(out, (delta << 1) ^ (delta >> 63))  # zigzag
+                _write_varint(out, store[index])
+                previous = index
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, max_buckets: int = 2048) -> "DDSketch":
+        version, relative_accuracy = _HEADER.unpack_from(data, 0)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported sketch format version {version}")
+        sketch = cls(relative_accuracy, max_buckets)
+        sketch.zero_count, position = _read_varint(data, _HEADER.size)
+        sketch.sum, sketch.min, sketch.max = _STATS.unpack_from(data, position)
+        position += _STATS.size
+
+        count = sketch.zero_count
+        for store in (sketch.positive, sketch.negative):
+            size, position = _read_varint(data, position)
+            index = 0
+            for _ in range(size):
+                zigzag, position = _read_varint(data, position)
+                index += (zigzag >> 1) ^ -(zigzag & 1)
+                store[index], position = _read_varint(data, position)
+                count += store[index]
+        sketch.count = count
+        return sketch
+
+
+class HyperLogLog:
+    """Distinct-count sketch over 64-bit blake2b hashes, merged by register-wise max"""
+
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision: int = 12, registers: Optional[np.ndarray] = None):
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, value: str) -> bool:
+        """Add a value; returns whether a register changed (i.e. the sketch needs saving)"""
+        hashed = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "little")
+        index = hashed >> (64 - self.precision)
+        remaining_bits = 64 - self.precision
+        rank = remaining_bits - (hashed & ((1 << remaining_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small range: linear counting is more accurate
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def to_bytes(self) -> bytes:
+        """Precision byte and zlib-compressed registers (mostly zeros for small periods)"""
+        return bytes([self.precision]) + zlib.compress(self.registers.tobytes(), 1)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        registers = np.frombuffer(zlib.decompress(data[1:]), dtype=np.uint8).copy()
+        return cls(data[0], registers)
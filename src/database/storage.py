@@ -6,22 +6,466 @@ Uses SQLite for persistent analytics storage and in-memory for sample data
 import sqlite3
 import json
 import logging
-from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
+import re
+import time
+from functools import lru_cache, wraps
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Any, Optional, Iterable, Iterator, Tuple
+from datetime import date, datetime, timedelta
 from pathlib import Path
 from ..models import LoadData, NegotiationOffer
+from ..monitoring import SQLITE_STATEMENT_DURATION
+from .sketches import DDSketch, HyperLogLog
+from .shared import shared_versions
+from .columnar import ColumnarLoadStore
 
 logger = logging.getLogger(__name__)
 
 # Database setup
 DB_PATH = Path("happyrobot_analytics.db")
 
+# Stored in PRAGMA user_version once init_database has created the schema;
+# bump it whenever init_database changes, so existing databases are migrated
+SCHEMA_VERSION = 3
+
+# The "analytics" shared version is bumped after every committed analytics, negotiation or call
+# event write; readers (in any worker) compare it to detect changes
+
+# Metrics kept as per-lane, per-day quantile sketches
+QUANTILE_METRICS = ("rate_over_posted_pct", "negotiation_rounds", "call_duration_seconds")
+QUANTILES = (0.5, 0.9, 0.99)
+SKETCH_RELATIVE_ACCURACY = 0.01
+
+# Distinct values counted per hour and per day: metric -> call_events field
+DISTINCT_METRICS = {"carriers": "carrier_mc", "loads": "load_id", "callers": "caller_phone"}
+HLL_PERIODS = {"hour": 13, "day": 10}  # bucket = received_at prefix of this length
+HLL_PRECISION = 12
+
+# Lane cube dimensions, and the outcomes that count as converted calls and agreed negotiations
+LANE_CUBE_DIMENSIONS = ("origin_state", "destination_state", "equipment_type", "outcome", "day")
+LANE_CUBE_SUCCESS_OUTCOMES = ("success", "transferred", "partial_success")
+LANE_CUBE_ACCEPTED_STATUSES = ("accepted", "agreement_transfer_failed")
+LANE_CUBE_SUMS = ("calls", "posted_rate_sum", "negotiations", "negotiated_posted_sum", "negotiated_rate_sum")
+
+# Connection shared by all writes inside batch_transaction() or persist_writes()
+_batch_connection: ContextVar[Optional[sqlite3.Connection]] = ContextVar("_batch_connection", default=None)
+
+# Writes recorded inside recording_writes(), persisted later by persist_writes()
+_recorded_writes: ContextVar[Optional[List["DeferredWrite"]]] = ContextVar("_recorded_writes", default=None)
+
+
+_STATEMENT_TABLE = re.compile(r"\b(?:INTO|FROM|UPDATE|TABLE(?:\s+IF\s+NOT\s+EXISTS)?)\s+(\w+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def _statement_label(sql: str) -> str:
+    """Metric label of a statement: its verb and first table, e.g. "INSERT call_analytics" """
+    verb = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else "EMPTY"
+    match = _STATEMENT_TABLE.search(sql)
+    return f"{verb} {match.group(1)}" if match and verb != "PRAGMA" else verb
+
+
+class _TimedCursor(sqlite3.Cursor):
+    """Cursor recording statement latency in sqlite_statement_duration_seconds"""
+    
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            SQLITE_STATEMENT_DURATION.observe(time.perf_counter() - started, _statement_label(sql))
+    
+    def executemany(self, sql: str, seq_of_parameters: Any) -> sqlite3.Cursor:
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            SQLITE_STATEMENT_DURATION.observe(time.perf_counter() - started, _statement_label(sql))
+
+
+class _TimedConnection(sqlite3.Connection):
+    def cursor(self, factory: Any = _TimedCursor) -> sqlite3.Cursor:
+        return super().cursor(factory)
+    
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+
+
+def _open(path: Path, timeout: float = 5.0) -> sqlite3.Connection:
+    """sqlite3.connect with statement timing"""
+    return sqlite3.connect(path, timeout=timeout, factory=_TimedConnection)
+
+
+class _BatchConnection:
+    """
+    Handle on the batch connection. Every storage call runs in its own
+    savepoint: commit() releases it, close() without a commit rolls back only
+    that call's writes; the transaction itself ends with the batch.
+    """
+    
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+        self._open = True
+        conn.execute("SAVEPOINT storage_call")
+    
+    def cursor(self) -> sqlite3.Cursor:
+        return self._conn.cursor()
+    
+    def commit(self) -> None:
+        if self._open:
+            self._conn.execute("RELEASE storage_call")
+            self._open = False
+    
+    def close(self) -> None:
+        if self._open:
+            self._conn.execute("ROLLBACK TO storage_call")
+            self._conn.execute("RELEASE storage_call")
+            self._open = False
+
+
+class DeferredWrite:
+    """A storage write recorded by recording_writes(), run by persist_writes()"""
+    
+    __slots__ = ("function", "args", "kwargs", "result", "on_result")
+    
+    def __init__(self, function: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.result: Any = None
+        self.on_result: Optional[Callable[[Any], None]] = None
+    
+    @property
+    def name(self) -> str:
+        return self.function.__name__
+    
+    def run(self) -> Any:
+        self.result = self.function(*self.args, **self.kwargs)
+        if self.on_result is not None:
+            self.on_result(self.result)
+        return self.result
+
+
+def _deferrable(function: Callable[..., Any]) -> Callable[..., Any]:
+    """Inside recording_writes(), record the call (returning None) instead of writing"""
+    @wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        writes = _recorded_writes.get()
+        if writes is None:
+            return function(*args, **kwargs)
+        writes.append(DeferredWrite(function, args, kwargs))
+        return None
+    return wrapper
+
+
+def get_data_version() -> int:
+    """Current analytics data version (changes whenever analytics, negotiations or call events are written)"""
+    return shared_versions.get("analytics")
+
+
+def _bump_data_version() -> None:
+    shared_versions.bump("analytics")
+
+
+def _connect():
+    """Open a connection, or join the current batch transaction if one is active"""
+    conn = _batch_connection.get()
+    if conn is not None:
+        return _BatchConnection(conn)
+    return _open(DB_PATH)
+
+
+@contextmanager
+def batch_transaction() -> Iterator[None]:
+    """
+    Run all storage writes in this context (including asyncio tasks created in it)
+    in a single SQLite transaction, committed on exit and rolled back on error.
+    
+    The write lock is held for the whole context, so use it for synchronous
+    work or private databases; code that awaits between writes on the live
+    database records them with recording_writes() and calls persist_writes().
+    """
+    conn = _open(DB_PATH, timeout=30.0)
+    token = _batch_connection.set(conn)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        yield
+        conn.commit()
+        _bump_data_version()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        _batch_connection.reset(token)
+        conn.close()
+
+
+@contextmanager
+def recording_writes() -> Iterator[List[DeferredWrite]]:
+    """
+    Record the deferrable writes (store_* and complete_idempotency_key) made
+    in this context, including asyncio tasks created in it, instead of running
+    them. Reads and the other calls are unaffected.
+    """
+    writes: List[DeferredWrite] = []
+    token = _recorded_writes.set(writes)
+    try:
+        yield writes
+    finally:
+        _recorded_writes.reset(token)
+
+
+def persist_writes(writes: Iterable[DeferredWrite]) -> None:
+    """Run recorded writes in order in one short transaction, each in its own savepoint"""
+    with batch_transaction():
+        for write in writes:
+            write.run()
+
+
+def _ensure_columns(cursor: sqlite3.Cursor, table: str, columns: Dict[str, str]) -> None:
+    """Add columns missing from an existing table (lightweight schema migration)"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in cursor.fetchall()}
+    for column, declaration in columns.items():
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+def _lane_label(lane: Optional[Iterable[Optional[str]]]) -> str:
+    """Lane (origin, destination, equipment) as stored in the lane columns, "unknown" without one"""
+    if not lane or not all(lane[:2]):
+        return "unknown"
+    return "|".join((lane[0], lane[1], lane[2] or "any"))
+
+def _rate_over_posted_pct(original_rate: Optional[float], offered_rate: Optional[float]) -> Optional[float]:
+    if not original_rate or offered_rate is None:
+        return None
+    return (offered_rate - original_rate) / original_rate * 100
+
+def _observe_quantiles(cursor: sqlite3.Cursor, day: str, lane: str, observations: Dict[str, Optional[float]]) -> None:
+    """Add values to the sketches of their metric for the lane and day (in the caller's transaction)"""
+    for metric, value in observations.items():
+        if value is None:
+            continue
+        cursor.execute(
+            "SELECT sketch FROM quantile_sketches WHERE metric = ? AND lane = ? AND day = ?",
+            (metric, lane, day)
+        )
+        row = cursor.fetchone()
+        sketch = DDSketch.from_bytes(row[0]) if row else DDSketch(SKETCH_RELATIVE_ACCURACY)
+        sketch.add(value)
+        cursor.execute("""
+            INSERT INTO quantile_sketches (metric, lane, day, sketch) VALUES (?, ?, ?, ?)
+            ON CONFLICT (metric, lane, day) DO UPDATE SET sketch = excluded.sketch
+        """, (metric, lane, day, sketch.to_bytes()))
+
+def _rebuild_quantile_sketches(cursor: sqlite3.Cursor) -> int:
+    """Recompute every quantile sketch from the negotiations and call_analytics rows"""
+    sketches: Dict[Tuple[str, str, str], DDSketch] = {}
+    
+    def observe(metric: str, lane: str, day: str, value: Optional[float]) -> None:
+        if value is not None:
+            key = (metric, lane, day)
+            if key not in sketches:
+                sketches[key] = DDSketch(SKETCH_RELATIVE_ACCURACY)
+            sketches[key].add(value)
+    
+    cursor.execute("""
+        SELECT substr(COALESCE(updated_at, created_at), 1, 10), origin_state, destination_state, equipment_type,
+               original_rate, offered_rate, counter_offer_count
+        FROM negotiations
+    """)
+    for day, origin, destination, equipment, original_rate, offered_rate, rounds in cursor.fetchall():
+        lane = _lane_label((origin, destination, equipment))
+        observe("rate_over_posted_pct", lane, day, _rate_over_posted_pct(original_rate, offered_rate))
+        observe("negotiation_rounds", lane, day, rounds)
+    
+    cursor.execute("""
+        SELECT substr(created_at, 1, 10), COALESCE(lane, 'unknown'),
+               COALESCE(json_extract(call_features, '$.call_duration_seconds'),
+                        json_extract(call_features, '$.duration'))
+        FROM call_analytics
+        WHERE call_features IS NOT NULL
+    """)
+    for day, lane, duration in cursor.fetchall():
+        observe("call_duration_seconds", lane, day, duration)
+    
+    cursor.execute("DELETE FROM quantile_sketches")
+    cursor.executemany(
+        "INSERT INTO quantile_sketches (metric, lane, day, sketch) VALUES (?, ?, ?, ?)",
+        ((*key, sketch.to_bytes()) for key, sketch in sketches.items())
+    )
+    return len(sketches)
+
+def _observe_distinct(cursor: sqlite3.Cursor, received_at: str, values: Dict[str, Optional[str]]) -> None:
+    """Add values to the hourly and daily HyperLogLogs of their metric (in the caller's transaction)"""
+    for metric, value in values.items():
+        if not value:
+            continue
+        for period, length in HLL_PERIODS.items():
+            bucket = received_at[:length]
+            cursor.execute(
+                "SELECT registers FROM hll_buckets WHERE metric = ? AND period = ? AND bucket = ?",
+                (metric, period, bucket)
+            )
+            row = cursor.fetchone()
+            hll = HyperLogLog.from_bytes(row[0]) if row else HyperLogLog(HLL_PRECISION)
+            # Repeat values rarely change a register, so most events skip the write
+            if hll.add(value) or not row:
+                cursor.execute("""
+                    INSERT INTO hll_buckets (metric, period, bucket, registers) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (metric, period, bucket) DO UPDATE SET registers = excluded.registers
+                """, (metric, period, bucket, hll.to_bytes()))
+
+def _rebuild_distinct_counters(cursor: sqlite3.Cursor) -> int:
+    """Recompute every HyperLogLog bucket from the call_events rows"""
+    counters: Dict[Tuple[str, str, str], HyperLogLog] = {}
+    cursor.execute("""
+        SELECT received_at, carrier_mc, load_id, json_extract(event_data, '$.caller_phone')
+        FROM call_events
+        WHERE received_at IS NOT NULL
+    """)
+    for received_at, *values in cursor.fetchall():
+        for metric, value in zip(DISTINCT_METRICS, values):
+            if not value:
+                continue
+            for period, length in HLL_PERIODS.items():
+                key = (metric, period, received_at[:length])
+                if key not in counters:
+                    counters[key] = HyperLogLog(HLL_PRECISION)
+                counters[key].add(value)
+    
+    cursor.execute("DELETE FROM hll_buckets")
+    cursor.executemany(
+        "INSERT INTO hll_buckets (metric, period, bucket, registers) VALUES (?, ?, ?, ?)",
+        ((*key, hll.to_bytes()) for key, hll in counters.items())
+    )
+    return len(counters)
+
+def _sql_state(location: str) -> str:
+    """SQL expression of the state of a "City, ST" location (text after the last comma, like parse_state)"""
+    after_comma = f"substr({location}, length(rtrim({location}, replace({location}, ',', ''))) + 1)"
+    return f"NULLIF(substr(upper(trim({after_comma})), 1, 2), '')"
+
+def _observe_lane_cube(cursor: sqlite3.Cursor, lane: Optional[Iterable[Optional[str]]], outcome: str, day: str,
+                       calls: int = 0, posted_rate: float = 0, negotiations: int = 0,
+                       negotiated_posted: float = 0, negotiated_rate: float = 0) -> None:
+    """Add a call or a negotiation to its daily and monthly lane cube cells (in the caller's transaction)"""
+    if not lane or not all(lane[:2]):
+        return
+    for table, period_column, period in (("lane_cube", "day", day), ("lane_cube_monthly", "month", day[:7])):
+        cursor.execute(f"""
+            INSERT INTO {table} (
+                origin_state, destination_state, equipment_type, outcome, {period_column},
+                calls, posted_rate_sum, negotiations, negotiated_posted_sum, negotiated_rate_sum
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (origin_state, destination_state, equipment_type, outcome, {period_column}) DO UPDATE SET
+                calls = calls + excluded.calls,
+                posted_rate_sum = posted_rate_sum + excluded.posted_rate_sum,
+                negotiations = negotiations + excluded.negotiations,
+                negotiated_posted_sum = negotiated_posted_sum + excluded.negotiated_posted_sum,
+                negotiated_rate_sum = negotiated_rate_sum + excluded.negotiated_rate_sum
+        """, (lane[0], lane[1], lane[2] or "any", outcome or "unknown", period,
+              calls, posted_rate or 0, negotiations, negotiated_posted or 0, negotiated_rate or 0))
+
+def _rebuild_lane_cube(cursor: sqlite3.Cursor) -> int:
+    """Recompute the daily and monthly lane cubes from the call_analytics and negotiations rows"""
+    cursor.execute("DELETE FROM lane_cube")
+    cursor.execute("DELETE FROM lane_cube_monthly")
+    
+    # Rows stored before call analytics kept their lane and posted rate fall back to the offer data
+    origin = "json_extract(offer_data, '$.load_details.origin')"
+    destination = "json_extract(offer_data, '$.load_details.destination')"
+    equipment = "lower(trim(COALESCE(json_extract(offer_data, '$.load_details.equipment_type'), 'any')))"
+    cursor.execute(f"""
+        INSERT INTO lane_cube (origin_state, destination_state, equipment_type, outcome, day, calls, posted_rate_sum)
+        SELECT lane_origin, lane_destination, lane_equipment, outcome, day, COUNT(*), SUM(posted_rate)
+        FROM (
+            SELECT
+                COALESCE(substr(lane, 1, instr(lane, '|') - 1), {_sql_state(origin)}) AS lane_origin,
+                COALESCE(substr(lane, instr(lane, '|') + 1, 2), {_sql_state(destination)}) AS lane_destination,
+                COALESCE(substr(lane, instr(lane, '|') + 4), {equipment}) AS lane_equipment,
+                COALESCE(json_extract(call_outcome, '$.primary_outcome'), 'unknown') AS outcome,
+                substr(created_at, 1, 10) AS day,
+                COALESCE(posted_rate, json_extract(offer_data, '$.load_details.original_rate'),
+                         json_extract(offer_data, '$.negotiation_data.original_rate'), 0) AS posted_rate
+            FROM call_analytics
+            WHERE lane IS NULL OR lane != 'unknown'
+        )
+        WHERE lane_origin IS NOT NULL AND lane_destination IS NOT NULL
+        GROUP BY lane_origin, lane_destination, lane_equipment, outcome, day
+    """)
+    
+    cursor.execute("""
+        INSERT INTO lane_cube (
+            origin_state, destination_state, equipment_type, outcome, day,
+            negotiations, negotiated_posted_sum, negotiated_rate_sum
+        )
+        SELECT origin_state, destination_state, COALESCE(equipment_type, 'any'), COALESCE(status, 'unknown'),
+               substr(COALESCE(updated_at, created_at), 1, 10), COUNT(*),
+               SUM(COALESCE(original_rate, 0)), SUM(COALESCE(offered_rate, 0))
+        FROM negotiations
+        WHERE origin_state IS NOT NULL AND destination_state IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5
+        ON CONFLICT (origin_state, destination_state, equipment_type, outcome, day) DO UPDATE SET
+            negotiations = negotiations + excluded.negotiations,
+            negotiated_posted_sum = negotiated_posted_sum + excluded.negotiated_posted_sum,
+            negotiated_rate_sum = negotiated_rate_sum + excluded.negotiated_rate_sum
+    """)
+    
+    cursor.execute(f"""
+        INSERT INTO lane_cube_monthly (origin_state, destination_state, equipment_type, outcome, month,
+                                       {', '.join(LANE_CUBE_SUMS)})
+        SELECT origin_state, destination_state, equipment_type, outcome, substr(day, 1, 7),
+               {', '.join(f'SUM({column})' for column in LANE_CUBE_SUMS)}
+        FROM lane_cube
+        GROUP BY 1, 2, 3, 4, 5
+    """)
+    
+    cursor.execute("SELECT COUNT(*) FROM lane_cube")
+    return cursor.fetchone()[0]
+
+def rebuild_aggregates() -> Dict[str, int]:
+    """
+    Recompute the quantile sketches, distinct counters and lane cube from the
+    raw rows in one transaction (after bulk imports and replays)
+    """
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        rebuilt = {
+            "quantile_sketches": _rebuild_quantile_sketches(cursor),
+            "hll_buckets": _rebuild_distinct_counters(cursor),
+            "lane_cube": _rebuild_lane_cube(cursor)
+        }
+        conn.commit()
+        _bump_data_version()
+        logger.info("Rebuilt aggregates: %s", rebuilt)
+        return rebuilt
+        
+    except Exception as e:
+        logger.error("Error rebuilding aggregates: %s", e)
+        raise
+    finally:
+        conn.close()
+
 def init_database():
-    """Initialize SQLite database with required tables"""
+    """Initialize SQLite database with required tables (a no-op when the schema is current)"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _open(DB_PATH, timeout=30.0)
         cursor = conn.cursor()
         
+        # Restarts (cold starts) skip the schema work; the journal mode is stored in the file too
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] == SCHEMA_VERSION:
+            logger.info("Database schema is current (version %s)", SCHEMA_VERSION)
+            return
+        
+        # WAL lets the workers read while one of them writes; the schema work below
+        # runs in one write transaction so concurrently starting workers migrate once
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("BEGIN IMMEDIATE")
+        
         # Analytics table for storing call analytics
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS call_analytics (
@@ -37,6 +481,14 @@ def init_database():
             )
         """)
         
+        # Rule inputs of the call (for rescoring history) and the version of the rules applied
+        _ensure_columns(cursor, "call_analytics", {
+            "call_features": "TEXT",  # JSON string
+            "analysis_version": "TEXT",
+            "lane": "TEXT",  # origin|destination|equipment
+            "posted_rate": "REAL"  # posted rate of the call's load
+        })
+        
         # Negotiations table for detailed negotiation tracking
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS negotiations (
@@ -54,6 +506,13 @@ def init_database():
             )
         """)
         
+        # Lane of the negotiated load, used by the lane market-rate index
+        _ensure_columns(cursor, "negotiations", {
+            "origin_state": "TEXT",
+            "destination_state": "TEXT",
+            "equipment_type": "TEXT"
+        })
+        
         # Call events table for tracking all webhook events
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS call_events (
@@ -68,26 +527,163 @@ def init_database():
             )
         """)
         
+        # Webhook jobs table for events processed by the background worker pool
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS webhook_jobs (
+                event_id TEXT PRIMARY KEY,
+                event_type TEXT,
+                call_id TEXT,
+                status TEXT,  -- queued, processing, processed, failed
+                attempts INTEGER DEFAULT 0,
+                payload TEXT,  -- JSON string
+                result TEXT,  -- JSON string
+                error TEXT,
+                created_at TEXT,
+                updated_at TEXT,
+                owner TEXT  -- process_identity of the worker whose queue holds the job
+            )
+        """)
+        _ensure_columns(cursor, "webhook_jobs", {"owner": "TEXT"})
+        
+        # Dead-letter table for webhook events that exhausted their retries
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS webhook_dead_letters (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id TEXT,
+                event_type TEXT,
+                payload TEXT,  -- JSON string
+                error TEXT,
+                attempts INTEGER,
+                failed_at TEXT
+            )
+        """)
+        
+        # Idempotency keys of processed webhook events with their original response
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS webhook_idempotency (
+                idempotency_key TEXT PRIMARY KEY,
+                event_id TEXT,
+                status_code INTEGER,
+                response TEXT,  -- JSON string, NULL while the event is being processed
+                created_at TEXT  -- when the key was (last) claimed
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_webhook_idempotency_created ON webhook_idempotency (created_at)")
+        
+        # Quantile sketches per metric, lane and day, merged at query time
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'quantile_sketches'")
+        sketches_exist = cursor.fetchone() is not None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS quantile_sketches (
+                metric TEXT,
+                lane TEXT,
+                day TEXT,
+                sketch BLOB,  -- serialized DDSketch
+                PRIMARY KEY (metric, lane, day)
+            )
+        """)
+        if not sketches_exist:
+            _rebuild_quantile_sketches(cursor)
+        
+        # HyperLogLog registers of distinct carriers, loads and callers per hour and day
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'hll_buckets'")
+        counters_exist = cursor.fetchone() is not None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS hll_buckets (
+                metric TEXT,
+                period TEXT,  -- hour or day
+                bucket TEXT,  -- YYYY-MM-DDTHH or YYYY-MM-DD (UTC)
+                registers BLOB,  -- serialized HyperLogLog
+                PRIMARY KEY (metric, period, bucket)
+            )
+        """)
+        if not counters_exist:
+            _rebuild_distinct_counters(cursor)
+        
+        # Pre-aggregated lane x outcome x day cube behind /dashboard/lanes. Outcome is the
+        # call primary outcome for call measures and the negotiation status for negotiation measures
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'lane_cube'")
+        cube_exists = cursor.fetchone() is not None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS lane_cube (
+                origin_state TEXT,
+                destination_state TEXT,
+                equipment_type TEXT,
+                outcome TEXT,
+                day TEXT,
+                calls INTEGER DEFAULT 0,
+                posted_rate_sum REAL DEFAULT 0,  -- posted rates of the calls' loads
+                negotiations INTEGER DEFAULT 0,
+                negotiated_posted_sum REAL DEFAULT 0,
+                negotiated_rate_sum REAL DEFAULT 0,
+                PRIMARY KEY (origin_state, destination_state, equipment_type, outcome, day)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_lane_cube_day ON lane_cube (day)")
+        
+        # Monthly roll-up of the cube, so long ranges read whole months instead of every day
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS lane_cube_monthly (
+                origin_state TEXT,
+                destination_state TEXT,
+                equipment_type TEXT,
+                outcome TEXT,
+                month TEXT,  -- YYYY-MM
+                calls INTEGER DEFAULT 0,
+                posted_rate_sum REAL DEFAULT 0,
+                negotiations INTEGER DEFAULT 0,
+                negotiated_posted_sum REAL DEFAULT 0,
+                negotiated_rate_sum REAL DEFAULT 0,
+                PRIMARY KEY (origin_state, destination_state, equipment_type, outcome, month)
+            )
+        """)
+        if not cube_exists:
+            _rebuild_lane_cube(cursor)
+        
+        # Load inventory shared by the workers (the in-memory copy is loads_db)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS loads (
+                load_id TEXT PRIMARY KEY,
+                data TEXT  -- JSON string
+            )
+        """)
+        
+        # State of calls in progress shared by the workers: negotiation sessions and sentiment trackers
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS call_state (
+                kind TEXT,  -- negotiation, sentiment
+                call_id TEXT,
+                item TEXT,  -- load_id for negotiations, '' otherwise
+                state TEXT,  -- JSON string
+                last_activity REAL,  -- Unix time
+                PRIMARY KEY (kind, call_id, item)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_call_state_activity ON call_state (kind, last_activity)")
+        
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
         conn.commit()
         logger.info("Database initialized successfully")
         
     except Exception as e:
-        logger.error(f"Database initialization error: {str(e)}")
+        logger.error("Database initialization error: %s", e)
         raise
     finally:
         conn.close()
 
+@_deferrable
 def store_call_analytics(analytics_data: Dict[str, Any]) -> Optional[int]:
     """Store call analytics data in SQLite database"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _connect()
         cursor = conn.cursor()
         
         cursor.execute("""
             INSERT INTO call_analytics (
                 call_id, event_id, analysis_timestamp, offer_data, 
-                call_outcome, carrier_sentiment, summary_metrics, created_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                call_outcome, carrier_sentiment, summary_metrics, created_at,
+                call_features, analysis_version, lane, posted_rate
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             analytics_data.get("call_id"),
             analytics_data.get("event_id"),
@@ -96,32 +692,52 @@ def store_call_analytics(analytics_data: Dict[str, Any]) -> Optional[int]:
             json.dumps(analytics_data.get("call_outcome", {})),
             json.dumps(analytics_data.get("carrier_sentiment", {})),
             json.dumps(analytics_data.get("summary", {})),
-            datetime.utcnow().isoformat()
+            datetime.utcnow().isoformat(),
+            json.dumps(analytics_data["call_features"]) if "call_features" in analytics_data else None,
+            analytics_data.get("analysis_version"),
+            _lane_label(analytics_data.get("lane")),
+            analytics_data.get("posted_rate")
         ))
         
         analytics_id = cursor.lastrowid
+        day = datetime.utcnow().date().isoformat()
+        features = analytics_data.get("call_features") or {}
+        _observe_quantiles(cursor, day, _lane_label(analytics_data.get("lane")), {
+            "call_duration_seconds": features.get("call_duration_seconds", features.get("duration"))
+        })
+        offer_data = analytics_data.get("offer_data") or {}
+        _observe_lane_cube(
+            cursor, analytics_data.get("lane"), (analytics_data.get("call_outcome") or {}).get("primary_outcome"), day,
+            calls=1,
+            posted_rate=analytics_data.get("posted_rate")
+            or (offer_data.get("load_details") or {}).get("original_rate")
+            or (offer_data.get("negotiation_data") or {}).get("original_rate")
+        )
         conn.commit()
-        logger.info(f"Analytics stored with ID: {analytics_id}")
+        _bump_data_version()
+        logger.info("Analytics stored with ID: %s", analytics_id)
         return analytics_id
         
     except Exception as e:
-        logger.error(f"Error storing analytics: {str(e)}")
+        logger.error("Error storing analytics: %s", e)
         return None
     finally:
         conn.close()
 
+@_deferrable
 def store_negotiation(negotiation: NegotiationOffer) -> Optional[int]:
     """Store negotiation data in SQLite database"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _connect()
         cursor = conn.cursor()
         
         cursor.execute("""
             INSERT INTO negotiations (
                 load_id, carrier_mc, original_rate, offered_rate, 
                 max_acceptable_rate, counter_offer_count, status, 
-                negotiation_history, created_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                negotiation_history, created_at, updated_at,
+                origin_state, destination_state, equipment_type
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             negotiation.load_id,
             negotiation.carrier_mc,
@@ -132,24 +748,40 @@ def store_negotiation(negotiation: NegotiationOffer) -> Optional[int]:
             negotiation.status,
             json.dumps(negotiation.negotiation_history),
             negotiation.created_at.isoformat() if negotiation.created_at else datetime.utcnow().isoformat(),
-            negotiation.updated_at.isoformat() if negotiation.updated_at else datetime.utcnow().isoformat()
+            negotiation.updated_at.isoformat() if negotiation.updated_at else datetime.utcnow().isoformat(),
+            negotiation.origin_state,
+            negotiation.destination_state,
+            negotiation.equipment_type
         ))
         
         negotiation_id = cursor.lastrowid
+        day = (negotiation.updated_at or datetime.utcnow()).date().isoformat()
+        lane = (negotiation.origin_state, negotiation.destination_state, negotiation.equipment_type)
+        _observe_quantiles(cursor, day, _lane_label(lane), {
+            "rate_over_posted_pct": _rate_over_posted_pct(negotiation.original_rate, negotiation.offered_rate),
+            "negotiation_rounds": negotiation.counter_offer_count
+        })
+        _observe_lane_cube(
+            cursor, lane, negotiation.status, day,
+            negotiations=1, negotiated_posted=negotiation.original_rate, negotiated_rate=negotiation.offered_rate
+        )
         conn.commit()
-        logger.info(f"Negotiation stored with ID: {negotiation_id}")
+        _bump_data_version()
+        shared_versions.bump("negotiations")
+        logger.info("Negotiation stored with ID: %s", negotiation_id)
         return negotiation_id
         
     except Exception as e:
-        logger.error(f"Error storing negotiation: {str(e)}")
+        logger.error("Error storing negotiation: %s", e)
         return None
     finally:
         conn.close()
 
+@_deferrable
 def store_call_event(event_data: Dict[str, Any]) -> Optional[int]:
     """Store webhook event data for tracking"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -168,19 +800,638 @@ def store_call_event(event_data: Dict[str, Any]) -> Optional[int]:
         ))
         
         event_id = cursor.lastrowid
+        _observe_distinct(cursor, event_data.get("received_at") or datetime.utcnow().isoformat(), {
+            metric: event_data.get(field) for metric, field in DISTINCT_METRICS.items()
+        })
         conn.commit()
+        _bump_data_version()
         return event_id
         
     except Exception as e:
-        logger.error(f"Error storing call event: {str(e)}")
+        logger.error("Error storing call event: %s", e)
+        return None
+    finally:
+        conn.close()
+
+def create_webhook_job(event_id: str, event_type: str, call_id: Optional[str], payload_json: str,
+                       owner: Optional[str] = None) -> bool:
+    """Record a webhook event accepted for background processing by the worker owner"""
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        
+        now = datetime.utcnow().isoformat()
+        cursor.execute("""
+            INSERT INTO webhook_jobs (
+                event_id, event_type, call_id, status, attempts,
+                payload, created_at, updated_at, owner
+            ) VALUES (?, ?, ?, 'queued', 0, ?, ?, ?, ?)
+        """, (event_id, event_type, call_id, payload_json, now, now, owner))
+        
+        conn.commit()
+        return True
+        
+    except Exception as e:
+        logger.error("Error creating webhook job: %s", e)
+        return False
+    finally:
+        conn.close()
+
+def update_webhook_job(event_id: str, status: str, attempts: int,
+                       result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+    """Update processing state of a queued webhook event"""
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            UPDATE webhook_jobs
+            SET status = ?, attempts = ?, result = ?, error = ?, updated_at = ?
+            WHERE event_id = ?
+        """, (
+            status,
+            attempts,
+            json.dumps(result, default=str) if result is not None else None,
+            error,
+            datetime.utcnow().isoformat(),
+            event_id
+        ))
+        
+        conn.commit()
+        
+    except Exception as e:
+        logger.error("Error updating webhook job %s: %s", event_id, e)
+    finally:
+        conn.close()
+
+def get_webhook_job(event_id: str) -> Optional[Dict[str, Any]]:
+    """Get processing status and result of a queued webhook event"""
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT event_id, event_type, call_id, status, attempts, result, error, created_at, updated_at
+            FROM webhook_jobs WHERE event_id = ?
+        """, (event_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        
+        return {
+            "event_id": row[0],
+            "event_type": row[1],
+            "call_id": row[2],
+            "status": row[3],
+            "attempts": row[4],
+            "result": json.loads(row[5]) if row[5] else None,
+            "error": row[6],
+            "created_at": row[7],
+            "updated_at": row[8]
+        }
+        
+    except Exception as e:
+        logger.error("Error getting webhook job %s: %s", event_id, e)
+        return None
+    finally:
+        conn.close()
+
+def get_pending_webhook_jobs() -> List[Dict[str, Any]]:
+    """Get webhook events that were accepted but never finished processing, oldest first"""
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT event_id, payload, attempts, status, created_at, owner FROM webhook_jobs
+            WHERE status IN ('queued', 'processing')
+            ORDER BY created_at
+        """)
+        return [
+            {"event_id": row[0], "payload": row[1], "attempts": row[2], "status": row[3],
+             "created_at": row[4], "owner": row[5]}
+            for row in cursor.fetchall()
+        ]
+        
+    except Exception as e:
+        logger.error("Error getting pending webhook jobs: %s", e)
+        return []
+    finally:
+        conn.close()
+
+def claim_webhook_job(event_id: str, previous_owner: Optional[str], owner: str) -> bool:
+    """Take over an unfinished job from previous_owner; False if another worker got it first"""
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            UPDATE webhook_jobs SET owner = ?, updated_at = ?
+            WHERE event_id = ? AND owner IS ? AND status IN ('queued', 'processing')
+        """, (owner, datetime.utcnow().isoformat(), event_id, previous_owner))
+        claimed = cursor.rowcount == 1
+        conn.commit()
+        return claimed
+        
+    except Exception as e:
+        logger.error("Error claiming webhook job %s: %s", event_id, e)
+        return False
+    finally:
+        conn.close()
+
+def store_dead_letter(event_id: str, event_type: str, payload_json: str, error: str, attempts: int) -> Optional[int]:
+    """Store a webhook event that failed all processing attempts"""
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            INSERT INTO webhook_dead_letters (
+                event_id, event_type, payload, error, attempts, failed_at
+            ) VALUES (?, ?, ?, ?, ?, ?)
+        """, (event_id, event_type, payload_json, error, attempts, datetime.utcnow().isoformat()))
+        
+        dead_letter_id = cursor.lastrowid
+        conn.commit()
+        logger.warning("Webhook event %s moved to dead-letter table after %s attempts", event_id, attempts)
+        return dead_letter_id
+        
+    except Exception as e:
+        logger.error("Error storing dead letter: %s", e)
+        return None
+    finally:
+        conn.close()
+
+def claim_idempotency_key(idempotency_key: str, event_id: str, stale_after: float = 0) -> bool:
+    """
+    Reserve an idempotency key before processing an event.
+    
+    Returns False if the key was already claimed, i.e. the event is a duplicate.
+    A claim still without a response after stale_after seconds (its worker
+    died between claim and complete) is taken over; 0 never takes one over.
+    """
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        now = datetime.utcnow()
+        
+        cursor.execute("""
+            INSERT OR IGNORE INTO webhook_idempotency (idempotency_key, event_id, created_at)
+            VALUES (?, ?, ?)
+        """, (idempotency_key, event_id, now.isoformat()))
+        
+        claimed = cursor.rowcount == 1
+        if not claimed and stale_after > 0:
+            cursor.execute("""
+                UPDATE webhook_idempotency SET event_id = ?, created_at = ?
+                WHERE idempotency_key = ? AND response IS NULL AND created_at < ?
+            """, (event_id, now.isoformat(), idempotency_key, (now - timedelta(seconds=stale_after)).isoformat()))
+            claimed = cursor.rowcount == 1
+            if claimed:
+                logger.warning("Took over stale idempotency claim for event %s", event_id)
+        conn.commit()
+        return claimed
+        
+    except Exception as e:
+        logger.error("Error claiming idempotency key: %s", e)
+        # Fail open: processing a possible duplicate beats dropping an event
+        return True
+    finally:
+        conn.close()
+
+@_deferrable
+def complete_idempotency_key(idempotency_key: str, status_code: int, response: Dict[str, Any]) -> None:
+    """Attach the original response to a claimed idempotency key"""
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            UPDATE webhook_idempotency SET status_code = ?, response = ?
+            WHERE idempotency_key = ?
+        """, (status_code, json.dumps(response, default=str), idempotency_key))
+        
+        conn.commit()
+        
+    except Exception as e:
+        logger.error("Error completing idempotency key: %s", e)
+    finally:
+        conn.close()
+
+def release_idempotency_key(idempotency_key: str) -> None:
+    """Release a claimed key whose processing failed so a retry can process it"""
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            DELETE FROM webhook_idempotency WHERE idempotency_key = ? AND response IS NULL
+        """, (idempotency_key,))
+        
+        conn.commit()
+        
+    except Exception as e:
+        logger.error("Error releasing idempotency key: %s", e)
+    finally:
+        conn.close()
+
+def prune_idempotency_keys(before: datetime) -> int:
+    """Delete idempotency keys claimed before a time; returns how many were deleted"""
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("DELETE FROM webhook_idempotency WHERE created_at < ?", (before.isoformat(),))
+        deleted = cursor.rowcount
+        
+        conn.commit()
+        return deleted
+        
+    except Exception as e:
+        logger.error("Error pruning idempotency keys: %s", e)
+        return 0
+    finally:
+        conn.close()
+
+def get_idempotent_response(idempotency_key: str) -> Optional[Dict[str, Any]]:
+    """Get the stored response for an idempotency key (response is None while in flight)"""
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT event_id, status_code, response FROM webhook_idempotency
+            WHERE idempotency_key = ?
+        """, (idempotency_key,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        
+        return {
+            "event_id": row[0],
+            "status_code": row[1],
+            "response": json.loads(row[2]) if row[2] else None
+        }
+        
+    except Exception as e:
+        logger.error("Error getting idempotent response: %s", e)
         return None
     finally:
         conn.close()
 
+def get_accepted_negotiation_rates(statuses: List[str], limit_per_lane: int) -> List[tuple]:
+    """
+    Get (origin_state, destination_state, equipment_type, original_rate, offered_rate)
+    for negotiations closed at an agreed rate, most recent last, capped per lane.
+    """
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        
+        placeholders = ",".join("?" for _ in statuses)
+        cursor.execute(f"""
+            SELECT origin_state, destination_state, equipment_type, original_rate, offered_rate
+            FROM (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY origin_state, destination_state, equipment_type
+                    ORDER BY id DESC
+                ) AS lane_rank
+                FROM negotiations
+                WHERE status IN ({placeholders})
+                  AND origin_state IS NOT NULL AND destination_state IS NOT NULL
+                  AND original_rate > 0 AND offered_rate > 0
+            )
+            WHERE lane_rank <= ?
+            ORDER BY id
+        """, (*statuses, limit_per_lane))
+        return cursor.fetchall()
+        
+    except Exception as e:
+        logger.error("Error getting negotiation rates: %s", e)
+        return []
+    finally:
+        conn.close()
+
+def get_call_feature_range(exclude_version: Optional[str] = None) -> Tuple[int, int, int]:
+    """(min id, max id, count) of call_analytics rows with stored call features"""
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), 0), COUNT(*)
+            FROM call_analytics
+            WHERE call_features IS NOT NULL AND (? IS NULL OR analysis_version IS NOT ?)
+        """, (exclude_version, exclude_version))
+        return tuple(cursor.fetchone())
+        
+    except Exception as e:
+        logger.error("Error getting call feature range: %s", e)
+        return (0, 0, 0)
+    finally:
+        conn.close()
+
+def get_call_feature_columns(fields: List[str], min_id: int, max_id: int,
+                             exclude_version: Optional[str] = None) -> Tuple[List[int], Dict[str, List[Any]]]:
+    """
+    Load stored call features of the rows with min_id <= id <= max_id column-wise.
+    
+    Fields are extracted by SQLite (json_extract) so no per-row JSON parsing
+    happens in Python. Returns (ids, {field: values}); missing fields are None.
+    """
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        
+        # Field names come from the analytics rules, never from user input
+        columns = ", ".join(f"json_extract(call_features, '$.{field}')" for field in fields)
+        cursor.execute(f"""
+            SELECT id, {columns}
+            FROM call_analytics
+            WHERE id BETWEEN ? AND ? AND call_features IS NOT NULL
+              AND (? IS NULL OR analysis_version IS NOT ?)
+            ORDER BY id
+        """, (min_id, max_id, exclude_version, exclude_version))
+        rows = cursor.fetchall()
+        
+        if not rows:
+            return [], {field: [] for field in fields}
+        ids, *values = zip(*rows)
+        return list(ids), {field: list(column) for field, column in zip(fields, values)}
+        
+    except Exception as e:
+        logger.error("Error loading call features: %s", e)
+        return [], {field: [] for field in fields}
+    finally:
+        conn.close()
+
+def update_call_classifications(rows: List[tuple]) -> int:
+    """
+    Write rescored outcomes and sentiments back to call_analytics.
+    
+    Each row is (call_outcome JSON, classified_at, overall_sentiment,
+    sentiment_confidence, sentiment_details JSON, analysis_version, id).
+    The sentiment progression and offer data of the row are kept.
+    """
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        
+        cursor.executemany("""
+            UPDATE call_analytics SET
+                call_outcome = ?1,
+                carrier_sentiment = json_set(
+                    COALESCE(carrier_sentiment, '{}'),
+                    '$.classified_at', ?2,
+                    '$.overall_sentiment', ?3,
+                    '$.sentiment_confidence', ?4,
+                    '$.sentiment_details', json(?5)
+                ),
+                summary_metrics = json_set(
+                    COALESCE(summary_metrics, '{}'),
+                    '$.outcome_confidence', json_extract(?1, '$.outcome_confidence'),
+                    '$.sentiment_confidence', ?4
+                ),
+                analysis_version = ?6
+            WHERE id = ?7
+        """, rows)
+        
+        conn.commit()
+        _bump_data_version()
+        return len(rows)
+        
+    except Exception as e:
+        logger.error("Error updating call classifications: %s", e)
+        raise
+    finally:
+        conn.close()
+
+def merge_databases(target_path: Path, source_paths: List[Path], tables: List[str], replace: bool = False) -> Dict[str, int]:
+    """
+    Copy the rows of tables from each source database into the target in one transaction.
+    
+    Ids are reassigned by the target. With replace, the target tables are emptied first.
+    Returns the number of rows copied per table.
+    """
+    conn = _open(target_path, timeout=30.0)
+    try:
+        cursor = conn.cursor()
+        copied = {table: 0 for table in tables}
+        
+        columns = {}
+        for table in tables:
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns[table] = ", ".join(row[1] for row in cursor.fetchall() if row[1] != "id")
+        
+        if replace:
+            for table in tables:
+                cursor.execute(f"DELETE FROM {table}")
+        
+        for source_path in source_paths:
+            source = _open(source_path)
+            try:
+                for table in tables:
+                    placeholders = ", ".join("?" for _ in columns[table].split(", "))
+                    cursor.executemany(
+                        f"INSERT INTO {table} ({columns[table]}) VALUES ({placeholders})",
+                        source.execute(f"SELECT {columns[table]} FROM {table} ORDER BY id")
+                    )
+                    copied[table] += cursor.rowcount
+            finally:
+                source.close()
+        
+        conn.commit()
+        _bump_data_version()
+        return copied
+        
+    except Exception as e:
+        conn.rollback()
+        logger.error("Error merging databases: %s", e)
+        raise
+    finally:
+        conn.close()
+
+def get_quantile_summary(metrics: Iterable[str] = QUANTILE_METRICS, lanes: Optional[List[str]] = None,
+                         since_day: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    p50/p90/p99, count and mean of each metric, merging the per-lane, per-day
+    sketches of the selected lanes (all by default) from since_day (YYYY-MM-DD) on.
+    """
+    metrics = list(metrics)
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        
+        conditions = [f"metric IN ({','.join('?' for _ in metrics)})"]
+        params: List[Any] = list(metrics)
+        if lanes is not None:
+            conditions.append(f"lane IN ({','.join('?' for _ in lanes)})")
+            params.extend(lanes)
+        if since_day:
+            conditions.append("day >= ?")
+            params.append(since_day)
+        cursor.execute(f"SELECT metric, sketch FROM quantile_sketches WHERE {' AND '.join(conditions)}", params)
+        
+        merged = {metric: DDSketch(SKETCH_RELATIVE_ACCURACY) for metric in metrics}
+        for metric, blob in cursor.fetchall():
+            merged[metric].merge(DDSketch.from_bytes(blob))
+        
+        summary = {}
+        for metric, sketch in merged.items():
+            summary[metric] = {"count": sketch.count, "mean": round(sketch.mean, 2) if sketch.count else None}
+            for q in QUANTILES:
+                value = sketch.quantile(q)
+                summary[metric][f"p{round(q * 100)}"] = round(value, 2) if value is not None else None
+        return summary
+        
+    except Exception as e:
+        logger.error("Error getting quantile summary: %s", e)
+        return {}
+    finally:
+        conn.close()
+
+def get_distinct_counts(since: str, until: str, period: str = "day",
+                        metrics: Iterable[str] = DISTINCT_METRICS) -> Dict[str, int]:
+    """
+    Estimated distinct carriers, loads and callers between the since and until
+    buckets (inclusive, YYYY-MM-DD for days or YYYY-MM-DDTHH for hours),
+    merging the HyperLogLog of every bucket in the range.
+    """
+    metrics = list(metrics)
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        
+        cursor.execute(f"""
+            SELECT metric, registers FROM hll_buckets
+            WHERE period = ? AND bucket BETWEEN ? AND ? AND metric IN ({','.join('?' for _ in metrics)})
+        """, (period, since, until, *metrics))
+        
+        merged = {metric: HyperLogLog(HLL_PRECISION) for metric in metrics}
+        for metric, registers in cursor.fetchall():
+            merged[metric].merge(HyperLogLog.from_bytes(registers))
+        return {metric: hll.count() for metric, hll in merged.items()}
+        
+    except Exception as e:
+        logger.error("Error getting distinct counts: %s", e)
+        return {}
+    finally:
+        conn.close()
+
+def _lane_cube_measures() -> Dict[str, str]:
+    success = ", ".join(f"'{outcome}'" for outcome in LANE_CUBE_SUCCESS_OUTCOMES)
+    accepted = ", ".join(f"'{status}'" for status in LANE_CUBE_ACCEPTED_STATUSES)
+    return {
+        "calls": "SUM(calls)",
+        "successful_calls": f"SUM(CASE WHEN outcome IN ({success}) THEN calls ELSE 0 END)",
+        "conversion_rate": f"ROUND(100.0 * SUM(CASE WHEN outcome IN ({success}) THEN calls ELSE 0 END) / NULLIF(SUM(calls), 0), 2)",
+        "unbooked_posted_rate": f"ROUND(SUM(CASE WHEN outcome NOT IN ({success}) THEN posted_rate_sum ELSE 0 END), 2)",
+        "negotiations": "SUM(negotiations)",
+        "accepted_negotiations": f"SUM(CASE WHEN outcome IN ({accepted}) THEN negotiations ELSE 0 END)",
+        "premium_paid": f"ROUND(SUM(CASE WHEN outcome IN ({accepted}) THEN negotiated_rate_sum - negotiated_posted_sum ELSE 0 END), 2)",
+        "premium_pct": f"ROUND(100.0 * SUM(CASE WHEN outcome IN ({accepted}) THEN negotiated_rate_sum - negotiated_posted_sum ELSE 0 END)"
+                       f" / NULLIF(SUM(CASE WHEN outcome IN ({accepted}) THEN negotiated_posted_sum ELSE 0 END), 0), 2)"
+    }
+
+LANE_CUBE_MEASURES = _lane_cube_measures()
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def _lane_cube_ranges(since: Optional[str], until: Optional[str]) -> List[Tuple[str, str, Optional[str], Optional[str]]]:
+    """
+    Split the day range [since, until] into (table, period column, low, high)
+    parts: whole months from lane_cube_monthly and the partial months at
+    either end from lane_cube. Open bounds are None.
+    """
+    start = date.fromisoformat(since) if since else None
+    end = date.fromisoformat(until) if until else None
+    # First day of the first whole month, and first day after the last whole month
+    first = None if start is None else start if start.day == 1 else _next_month(start)
+    after = None if end is None else _next_month(end) if _next_month(end) - timedelta(days=1) == end else end.replace(day=1)
+    if first is not None and after is not None and first >= after:
+        return [("lane_cube", "day", since, until)]
+    
+    ranges = [("lane_cube_monthly", "month", first.isoformat()[:7] if first else None,
+               (after - timedelta(days=1)).isoformat()[:7] if after else None)]
+    if start is not None and start < first:
+        ranges.append(("lane_cube", "day", since, (first - timedelta(days=1)).isoformat()))
+    if end is not None and end >= after:
+        ranges.append(("lane_cube", "day", after.isoformat(), until))
+    return ranges
+
+def query_lane_cube(filters: Dict[str, Optional[str]], since: Optional[str] = None, until: Optional[str] = None,
+                    group_by: Iterable[str] = ("origin_state", "destination_state", "equipment_type"),
+                    sort: str = "calls", limit: int = 10) -> Dict[str, Any]:
+    """
+    Slice and dice the lane cube: filter on dimensions and a day range, group by
+    any dimensions and return the top `limit` groups by a measure (descending).
+    Whole months are read from the monthly roll-up unless grouping or
+    filtering by day.
+    
+    Measures: calls, successful_calls, conversion_rate, unbooked_posted_rate
+    (posted rates of calls that did not convert), negotiations,
+    accepted_negotiations, premium_paid and premium_pct (agreed rate over posted).
+    Raises ValueError for unknown dimensions or measures and malformed days.
+    """
+    group_by = list(group_by)
+    unknown = [name for name in [*group_by, *filters] if name not in LANE_CUBE_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown lane cube dimensions: {', '.join(unknown)}")
+    if sort not in LANE_CUBE_MEASURES:
+        raise ValueError(f"Unknown lane cube measure: {sort}")
+    
+    by_day = "day" in group_by or filters.get("day") is not None
+    ranges = [("lane_cube", "day", since, until)] if by_day else _lane_cube_ranges(since, until)
+    dimensions = [dimension for dimension in LANE_CUBE_DIMENSIONS if dimension != "day" or by_day]
+    columns = ", ".join([*dimensions, *LANE_CUBE_SUMS])
+    
+    parts, params = [], []
+    for table, period_column, low, high in ranges:
+        conditions = []
+        for dimension, value in filters.items():
+            if value is not None:
+                conditions.append(f"{dimension} = ?")
+                params.append(value)
+        if low:
+            conditions.append(f"{period_column} >= ?")
+            params.append(low)
+        if high:
+            conditions.append(f"{period_column} <= ?")
+            params.append(high)
+        parts.append(f"SELECT {columns} FROM {table}" + (f" WHERE {' AND '.join(conditions)}" if conditions else ""))
+    source = " UNION ALL ".join(parts)
+    measures = ", ".join(f"{expression} AS {name}" for name, expression in LANE_CUBE_MEASURES.items())
+    
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        
+        group_columns = ", ".join(group_by)
+        cursor.execute(f"""
+            SELECT {group_columns + ', ' if group_by else ''}{measures}
+            FROM ({source})
+            {'GROUP BY ' + group_columns if group_by else ''}
+            ORDER BY {sort} DESC NULLS LAST
+            LIMIT ?
+        """, (*params, limit))
+        names = [column[0] for column in cursor.description]
+        rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+        
+        cursor.execute(f"SELECT {measures} FROM ({source})", params)
+        totals = dict(zip(LANE_CUBE_MEASURES, cursor.fetchone()))
+        return {"rows": rows, "totals": totals}
+        
+    except Exception as e:
+        logger.error("Error querying lane cube: %s", e)
+        return {"rows": [], "totals": {}}
+    finally:
+        conn.close()
+
 def get_analytics_summary() -> Dict[str, Any]:
     """Get analytics summary for dashboard"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _connect()
         cursor = conn.cursor()
         
         cursor.execute("SELECT COUNT(*) FROM call_analytics")
@@ -220,6 +1471,7 @@ def get_analytics_summary() -> Dict[str, Any]:
         negotiation_stats = cursor.fetchone()
         
         success_rate = (successful_calls / total_calls * 100) if total_calls > 0 else 0
+        today = datetime.utcnow().date()
         
         return {
             "total_calls": total_calls,
@@ -235,17 +1487,143 @@ def get_analytics_summary() -> Dict[str, Any]:
             "negotiation_metrics": {
                 "average_rounds": round(negotiation_stats[0], 1) if negotiation_stats[0] else 0,
                 "average_rate_difference": round(negotiation_stats[1], 2) if negotiation_stats[1] else 0
+            },
+            "distributions": get_quantile_summary(),
+            "unique_counts": {
+                "today": get_distinct_counts(today.isoformat(), today.isoformat()),
+                "last_7_days": get_distinct_counts((today - timedelta(days=6)).isoformat(), today.isoformat()),
+                "this_month": get_distinct_counts(today.replace(day=1).isoformat(), today.isoformat())
             }
         }
         
     except Exception as e:
-        logger.error(f"Error getting analytics summary: {str(e)}")
+        logger.error("Error getting analytics summary: %s", e)
         return {}
     finally:
         conn.close()
 
-loads_db: List[LoadData] = []
-negotiations_db: List[NegotiationOffer] = []
+# In-memory load inventory searched by the voice agent routes, as typed columns
+loads_db = ColumnarLoadStore()
+
+
+def store_loads(loads: List[LoadData]) -> None:
+    """Replace the stored load inventory"""
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM loads")
+        cursor.executemany(
+            "INSERT INTO loads (load_id, data) VALUES (?, ?)",
+            [(load.load_id, load.model_dump_json()) for load in loads]
+        )
+        conn.commit()
+        logger.info("Stored inventory of %s loads", len(loads))
+        
+    except Exception as e:
+        logger.error("Error storing loads: %s", e)
+        raise
+    finally:
+        conn.close()
+
+def get_stored_loads() -> List[LoadData]:
+    """The stored load inventory, in the order it was stored"""
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT data FROM loads ORDER BY rowid")
+        return [LoadData.model_validate_json(row[0]) for row in cursor.fetchall()]
+        
+    except Exception as e:
+        logger.error("Error getting stored loads: %s", e)
+        return []
+    finally:
+        conn.close()
+
+def get_call_state(kind: str, call_id: str, item: str = "") -> Optional[str]:
+    """Stored state (JSON) of a call in progress"""
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT state FROM call_state WHERE kind = ? AND call_id = ? AND item = ?", (kind, call_id, item)
+        )
+        row = cursor.fetchone()
+        return row[0] if row else None
+        
+    finally:
+        conn.close()
+
+def update_call_state(kind: str, call_id: str, item: str, update: Callable[[Optional[str]], Optional[str]],
+                      now: float) -> Optional[str]:
+    """
+    Read-modify-write the state of a call in one write transaction, so
+    workers updating the same call are serialized. update gets the current
+    state (None if there is none) and returns the new one (None to leave it).
+    """
+    try:
+        conn = _open(DB_PATH, timeout=30.0)
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(
+            "SELECT state FROM call_state WHERE kind = ? AND call_id = ? AND item = ?", (kind, call_id, item)
+        )
+        row = cursor.fetchone()
+        state = update(row[0] if row else None)
+        if state is not None:
+            cursor.execute("""
+                INSERT OR REPLACE INTO call_state (kind, call_id, item, state, last_activity)
+                VALUES (?, ?, ?, ?, ?)
+            """, (kind, call_id, item, state, now))
+        conn.commit()
+        return state
+        
+    finally:
+        conn.close()
+
+def pop_call_states(kind: str, call_id: Optional[str] = None, idle_before: Optional[float] = None,
+                    keep: Optional[int] = None) -> List[str]:
+    """
+    Remove and return call states: those of call_id, those idle since
+    idle_before, and the least recently active beyond the newest keep
+    """
+    try:
+        conn = _open(DB_PATH, timeout=30.0)
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        conditions, parameters = [], [kind]
+        if call_id is not None:
+            conditions.append("call_id = ?")
+            parameters.append(call_id)
+        if idle_before is not None:
+            conditions.append("last_activity < ?")
+            parameters.append(idle_before)
+        if keep is not None:
+            conditions.append("""rowid NOT IN (
+                SELECT rowid FROM call_state WHERE kind = ? ORDER BY last_activity DESC LIMIT ?
+            )""")
+            parameters.extend([kind, keep])
+        if not conditions:
+            return []
+        where = f"kind = ? AND ({' OR '.join(conditions)})"
+        cursor.execute(f"SELECT state FROM call_state WHERE {where} ORDER BY last_activity", parameters)
+        states = [row[0] for row in cursor.fetchall()]
+        if states:
+            cursor.execute(f"DELETE FROM call_state WHERE {where}", parameters)
+        conn.commit()
+        return states
+        
+    finally:
+        conn.close()
+
+def count_call_states(kind: str) -> int:
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM call_state WHERE kind = ?", (kind,))
+        return cursor.fetchone()[0]
+        
+    finally:
+        conn.close()
 
 SAMPLE_CARRIERS = {
     "123456": {
@@ -1,3 +1,17 @@
-from .webhook_handler import process_webhook_event
+from .webhook_handler import process_webhook_event, log_webhook_event, record_call_event
+from .event_queue import webhook_worker_pool, WebhookWorkerPool
+from .idempotency import idempotency_index, build_idempotency_key
+from .batch import process_webhook_batch, build_processed_response, BatchTooLarge
  
-__all__ = ["process_webhook_event"] 
\ No newline at end of file
+__all__ = [
+    "process_webhook_event",
+    "log_webhook_event",
+    "record_call_event",
+    "webhook_worker_pool",
+    "WebhookWorkerPool",
+    "idempotency_index",
+    "build_idempotency_key",
+    "process_webhook_batch",
+    "build_processed_response",
+    "BatchTooLarge"
+]
@@ -0,0 +1,172 @@
+"""
+Batch processing of webhook events for replays, backfills and platform catch-up.
+
+Events are processed in order per call_id while independent calls run
+concurrently. Their writes are recorded while they run and persisted at the
+end in a single short transaction per batch, each storage call in its own
+savepoint; no transaction is held open while events await (FMCSA lookups,
+the semaphore), so single webhooks and the worker pool keep writing. The
+stream is read and its size checked before the first event runs.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+from uuid import uuid4
+
+from ..models import WebhookPayload
+from ..database import recording_writes, persist_writes, release_idempotency_key
+from ..monitoring import correlation_id
+from .webhook_handler import process_webhook_event, log_webhook_event
+from .idempotency import idempotency_index, build_idempotency_key
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_EVENTS = int(os.getenv("WEBHOOK_BATCH_MAX_EVENTS", "5000"))
+BATCH_CONCURRENCY = int(os.getenv("WEBHOOK_BATCH_CONCURRENCY", "32"))
+
+
+class BatchTooLarge(Exception):
+    """Raised when a batch exceeds WEBHOOK_BATCH_MAX_EVENTS"""
+
+
+def build_processed_response(event_id: str, payload: WebhookPayload, analytics_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Response body for a webhook event processed synchronously"""
+    return {
+        "event_id": event_id,
+        "received_at": datetime.utcnow().isoformat(),
+        "event_type": payload.event_type,
+        "status": "processed",
+        "message": "Call analytics extracted: offer data, outcome classification, and sentiment analysis",
+        "analytics": analytics_result  # Complete analytics breakdown
+    }
+
+
+async def _process_batch_event(index: int, payload: WebhookPayload, semaphore: asyncio.Semaphore,
+                               previous: Optional[asyncio.Task]) -> Dict[str, Any]:
+    """Process one event after the previous event of the same call has finished"""
+    if previous is not None:
+        await asyncio.gather(previous, return_exceptions=True)
+
+    event_id = str(uuid4())
+    correlation_id.set(event_id)  # Each event runs in its own task, so this does not leak to the others
+    call_id = payload.call_data.call_id if payload.call_data else None
+    result = {"index": index, "call_id": call_id, "event_type": payload.event_type}
+
+    async def process_event():
+        received_at = datetime.utcnow().isoformat()
+        log_webhook_event(event_id, payload, received_at)
+        analytics_result = await process_webhook_event(payload, event_id=event_id, received_at=received_at)
+        return 200, build_processed_response(event_id, payload, analytics_result)
+
+    async with semaphore:
+        # Writes of this event (and only this task) are recorded, not run
+        with recording_writes() as writes:
+            try:
+                key = build_idempotency_key(payload)
+                status_code, body, replayed = await idempotency_index.run(key, event_id, process_event)
+                result.update({
+                    "status": "duplicate" if replayed else "processed",
+                    "status_code": status_code,
+                    "event_id": body.get("event_id"),
+                    "response": body,
+                    "idempotency_key": key,
+                    "writes": writes
+                })
+                _fill_analytics_id(body, writes)
+            except Exception as e:
+                # The key was released, so a retry processes the event again: drop its writes
+                logger.error("Error processing batch event %s: %s", index, e)
+                result.update({"status": "error", "status_code": 500, "error": str(e)})
+
+    return result
+
+
+async def process_webhook_batch(
+    events: AsyncIterator[Tuple[int, Union[WebhookPayload, str]]]
+) -> Dict[str, Any]:
+    """
+    Process a stream of (index, payload) pairs; a string in place of a payload
+    is a validation error for that event.
+
+    Returns per-event results in input order. The whole stream is read before
+    any event is processed, so a stream of more than BATCH_MAX_EVENTS events
+    raises BatchTooLarge without processing any of them (no writes, sessions,
+    idempotency keys, event log records or dashboard updates).
+    """
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    tasks: List[asyncio.Task] = []
+    invalid: List[Dict[str, Any]] = []
+    last_task_per_call: Dict[str, asyncio.Task] = {}
+
+    received: List[Tuple[int, Union[WebhookPayload, str]]] = []
+    async for index, payload in events:
+        if index >= BATCH_MAX_EVENTS:
+            raise BatchTooLarge(f"Batch exceeds {BATCH_MAX_EVENTS} events")
+        received.append((index, payload))
+
+    try:
+        try:
+            for index, payload in received:
+                if isinstance(payload, str):
+                    invalid.append({"index": index, "status": "invalid", "status_code": 422, "error": payload})
+                    continue
+
+                call_id = payload.call_data.call_id if payload.call_data else None
+                previous = last_task_per_call.get(call_id) if call_id else None
+                task = asyncio.create_task(_process_batch_event(index, payload, semaphore, previous))
+                if call_id:
+                    last_task_per_call[call_id] = task
+                tasks.append(task)
+
+            results = list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        # In input order, so the writes of each call keep their order
+        writes = [write for result in results for write in result.pop("writes", ())]
+        await asyncio.to_thread(persist_writes, writes)
+    except BaseException:
+        await _forget_batch_keys(tasks)
+        raise
+
+    results.extend(invalid)
+    results.sort(key=lambda result: result["index"])
+    for result in results:
+        result.pop("idempotency_key", None)
+
+    summary = {"total": len(results)}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+
+    logger.info("Processed webhook batch: %s", summary)
+    return {"summary": summary, "results": results}
+
+
+def _fill_analytics_id(body: Dict[str, Any], writes: List[Any]) -> None:
+    """Set the analytics_id of a response once its deferred analytics row is written"""
+    analytics = body.get("analytics")
+    if not isinstance(analytics, dict) or "analytics_id" not in analytics:
+        return
+    for write in writes:
+        if write.name == "store_call_analytics":
+            # Runs before the response itself is stored with complete_idempotency_key
+            write.on_result = lambda analytics_id: analytics.__setitem__("analytics_id", analytics_id)
+
+
+async def _forget_batch_keys(tasks: List[asyncio.Task]) -> None:
+    """Release idempotency keys claimed by a batch whose writes were not persisted"""
+    keys = []
+    for task in tasks:
+        if task.done() and not task.cancelled() and task.exception() is None:
+            key = task.result().get("idempotency_key")
+            if key:
+                idempotency_index.forget(key)
+                keys.append(key)
+    for key in keys:
+        await asyncio.to_thread(release_idempotency_key, key)
@@ -0,0 +1,196 @@
+"""
+Background processing for non-interactive webhook events.
+
+Events such as call_ended are acknowledged with 202 Accepted and processed on a
+bounded pool of asyncio workers, on the application's event loop (the handlers
+run their storage calls in threads). Failed events are retried with exponential
+backoff and moved to the dead-letter table once their attempts are exhausted.
+Events submitted by a request selected for profiling are processed in a
+profiled context too. Job rows are written from threads, off the event loop.
+Every job records the worker that holds it in its queue. On start a worker
+takes over (claims) the unfinished jobs of workers that are no longer running:
+those of the previous deployment (only the worker that initializes the
+deployment does this) and those of a crashed worker of this deployment that
+the supervisor restarted. A job found in processing counts
+its interrupted attempt, so an event that keeps killing the worker is
+dead-lettered once its attempts are used up instead of running again.
+"""
+
+import asyncio
+import logging
+import os
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Any, Dict, Optional, List, Set
+
+from ..models import WebhookPayload, webhook_event_adapter
+from ..database import (
+    create_webhook_job,
+    update_webhook_job,
+    get_pending_webhook_jobs,
+    claim_webhook_job,
+    store_dead_letter,
+    shared_versions,
+    process_identity
+)
+from ..monitoring import profiler, is_profiled
+from .webhook_handler import process_webhook_event
+
+logger = logging.getLogger(__name__)
+
+# Event types nobody needs a synchronous answer for (comma separated, empty disables)
+ASYNC_EVENT_TYPES: Set[str] = {
+    event_type.strip()
+    for event_type in os.getenv("WEBHOOK_ASYNC_EVENT_TYPES", "call_ended").split(",")
+    if event_type.strip()
+}
+
+
+class WebhookWorkerPool:
+    """Bounded queue of webhook events drained by a fixed number of asyncio workers"""
+
+    def __init__(self, workers: int = 4, max_queue_size: int = 1000,
+                 max_attempts: int = 3, retry_backoff: float = 0.5):
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._owner: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> "WebhookWorkerPool":
+        return cls(
+            workers=int(os.getenv("WEBHOOK_WORKERS", "4")),
+            max_queue_size=int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000")),
+            max_attempts=int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "3")),
+            retry_backoff=float(os.getenv("WEBHOOK_RETRY_BACKOFF", "0.5"))
+        )
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def is_async_event(self, event_type: str) -> bool:
+        """Whether an event type is acknowledged immediately and processed in the background"""
+        return self.running and event_type in ASYNC_EVENT_TYPES
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self) -> None:
+        """Start workers and re-enqueue events left unprocessed by a previous run"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker(worker_id))
+            for worker_id in range(self.workers)
+        ]
+
+        self._owner = process_identity(os.getpid())
+        deployment_started = datetime.utcfromtimestamp(shared_versions.started_at).isoformat()
+        for job in await asyncio.to_thread(get_pending_webhook_jobs):
+            if not self._orphaned(job, deployment_started):
+                continue
+            if self._queue.full():
+                # Left to the next worker start rather than claimed without room to run it
+                logger.warning("Webhook queue full while recovering pending jobs")
+                break
+            if not await asyncio.to_thread(claim_webhook_job, job["event_id"], job["owner"], self._owner):
+                continue  # Taken over by another worker
+            try:
+                payload = webhook_event_adapter.validate_json(job["payload"])
+                attempts = job["attempts"]
+                # A job left in processing stopped the worker mid-run: that attempt is used
+                if job["status"] == "processing" and attempts >= self.max_attempts:
+                    await self._dead_letter(job["event_id"], payload, attempts,
+                                            "Worker stopped while processing the last attempt")
+                    continue
+                self._queue.put_nowait((job["event_id"], payload, attempts, False))
+            except Exception as e:
+                logger.error("Could not recover webhook job %s: %s", job['event_id'], e)
+
+        logger.info("Webhook worker pool started with %s workers", self.workers)
+
+    @staticmethod
+    def _orphaned(job: Dict[str, Any], deployment_started: str) -> bool:
+        """Whether no running worker holds an unfinished job"""
+        if job["created_at"] < deployment_started:
+            return shared_versions.is_initializer
+        owner = job["owner"]
+        return owner is not None and process_identity(int(owner.split(":")[0])) != owner
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Drain queued events (up to timeout) and stop workers"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Webhook queue not drained on shutdown: %s events left", self._queue.qsize())
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Webhook worker pool stopped")
+
+    async def submit(self, event_id: str, payload: WebhookPayload) -> bool:
+        """
+        Persist and enqueue an event for background processing.
+
+        Returns False when the queue is full or the job could not be recorded,
+        so the caller can apply backpressure.
+        """
+        if self._queue is None or self._queue.full():
+            return False
+
+        call_id = payload.call_data.call_id if payload.call_data else None
+        if not await asyncio.to_thread(create_webhook_job, event_id, payload.event_type, call_id,
+                                       payload.model_dump_json(), self._owner):
+            return False
+
+        try:
+            self._queue.put_nowait((event_id, payload, 0, is_profiled()))
+        except asyncio.QueueFull:
+            # Filled up while the job was being recorded
+            await asyncio.to_thread(update_webhook_job, event_id, "failed", 0, error="Webhook queue full")
+            return False
+        return True
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            event_id, payload, attempts, profiled = await self._queue.get()
+            try:
+                with profiler.scope() if profiled else nullcontext():
+                    await self._process(event_id, payload, attempts)
+            except Exception as e:
+                logger.error("Webhook worker %s failed on event %s: %s", worker_id, event_id, e)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, event_id: str, payload: WebhookPayload, attempts: int) -> None:
+        while True:
+            attempts += 1
+            await asyncio.to_thread(update_webhook_job, event_id, "processing", attempts)
+            try:
+                result = await process_webhook_event(payload, event_id=event_id)
+                await asyncio.to_thread(update_webhook_job, event_id, "processed", attempts, result=result)
+                return
+            except Exception as e:
+                error = str(e)
+                logger.warning("Webhook event %s failed (attempt %s/%s): %s",
+                               event_id, attempts, self.max_attempts, error)
+                if attempts >= self.max_attempts:
+                    await self._dead_letter(event_id, payload, attempts, error)
+                    return
+                await asyncio.sleep(self.retry_backoff * (2 ** (attempts - 1)))
+
+    async def _dead_letter(self, event_id: str, payload: WebhookPayload, attempts: int, error: str) -> None:
+        await asyncio.to_thread(update_webhook_job, event_id, "failed", attempts, error=error)
+        await asyncio.to_thread(store_dead_letter, event_id, payload.event_type, payload.model_dump_json(),
+                                error, attempts)
+
+webhook_worker_pool = WebhookWorkerPool.from_env()
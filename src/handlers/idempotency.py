@@ -0,0 +1,171 @@
+"""
+Idempotent webhook ingestion.
+
+The HappyRobot platform retries webhooks, so every event is identified by an
+idempotency key: the Idempotency-Key header when present, otherwise
+call_id + event_type + platform timestamp. Recent keys live in a bounded
+in-memory LRU in front of the unique index in SQLite; a duplicate gets the
+original response back without being processed again.
+
+A claim left without a response by a worker that died mid-event is taken over
+after IDEMPOTENCY_CLAIM_TIMEOUT seconds, and keys older than
+IDEMPOTENCY_RETENTION_DAYS are pruned every IDEMPOTENCY_PRUNE_INTERVAL seconds.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from pydantic_core import to_jsonable_python
+
+from ..models import WebhookPayload
+from ..database import (
+    claim_idempotency_key,
+    complete_idempotency_key,
+    release_idempotency_key,
+    prune_idempotency_keys,
+    get_idempotent_response
+)
+
+logger = logging.getLogger(__name__)
+
+IdempotentResponse = Tuple[int, Dict[str, Any]]
+
+
+def build_idempotency_key(payload: WebhookPayload, header_key: Optional[str] = None) -> Optional[str]:
+    """
+    Derive the idempotency key for a webhook event.
+
+    Returns None when the event cannot be identified: without a header we need
+    both a call_id and a timestamp sent by the platform (the model default of
+    "now" would make every retry look unique).
+    """
+    if header_key:
+        raw_key = f"header|{header_key}"
+    else:
+        call_id = payload.call_data.call_id if payload.call_data else None
+        if not call_id or "timestamp" not in payload.model_fields_set:
+            return None
+        raw_key = f"{call_id}|{payload.event_type}|{payload.timestamp.isoformat()}"
+
+    return hashlib.sha256(raw_key.encode()).hexdigest()
+
+
+class IdempotencyIndex:
+    """Bounded LRU of processed idempotency keys backed by the webhook_idempotency table"""
+
+    def __init__(self, max_entries: int = 10000, claim_timeout: float = 300.0,
+                 retention_days: float = 7.0, prune_interval: float = 3600.0):
+        self.max_entries = max_entries
+        self.claim_timeout = claim_timeout
+        self.retention_days = retention_days
+        self.prune_interval = prune_interval
+        self._responses: "OrderedDict[str, IdempotentResponse]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def _remember(self, key: str, response: IdempotentResponse) -> None:
+        self._responses[key] = response
+        self._responses.move_to_end(key)
+        while len(self._responses) > self.max_entries:
+            self._responses.popitem(last=False)
+
+    def forget(self, key: str) -> None:
+        """Drop a key whose response was never persisted (e.g. rolled-back batch)"""
+        self._responses.pop(key, None)
+
+    async def lookup(self, key: str) -> Optional[IdempotentResponse]:
+        """Get the original response for a key from the LRU, falling back to SQLite"""
+        cached = self._responses.get(key)
+        if cached is not None:
+            self._responses.move_to_end(key)
+            return cached
+
+        stored = await asyncio.to_thread(get_idempotent_response, key)
+        if stored and stored["response"] is not None:
+            response = (stored["status_code"], stored["response"])
+            self._remember(key, response)
+            return response
+        return None
+
+    async def run(self, key: Optional[str], event_id: str,
+                  process: Callable[[], Awaitable[IdempotentResponse]]) -> Tuple[int, Dict[str, Any], bool]:
+        """
+        Process an event at most once per idempotency key.
+
+        Returns (status_code, body, replayed). Duplicates get the original
+        status code and body with replayed=True.
+        """
+        if key is None:
+            status_code, body = await process()
+            return status_code, body, False
+
+        original = self._responses.get(key)
+        if original is None and key in self._in_flight:
+            original = await asyncio.shield(self._in_flight[key])
+        if original is None and not await asyncio.to_thread(claim_idempotency_key, key, event_id, self.claim_timeout):
+            original = await self.lookup(key)
+            if original is None:
+                return 409, {"detail": "Duplicate event is still being processed"}, True
+        if original is not None:
+            logger.info("Duplicate webhook event detected (event %s)", original[1].get('event_id'))
+            return original[0], original[1], True
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            status_code, body = await process()
+            body = to_jsonable_python(body)
+            # Recorded rather than run inside a batch (the context is copied into the thread)
+            await asyncio.to_thread(complete_idempotency_key, key, status_code, body)
+            self._remember(key, (status_code, body))
+            future.set_result((status_code, body))
+            return status_code, body, False
+        except BaseException:
+            try:
+                await asyncio.to_thread(release_idempotency_key, key)
+            finally:
+                future.set_result(None)  # Waiters retry the claim
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def prune(self) -> int:
+        """Delete stored keys older than retention_days; returns how many were deleted"""
+        return prune_idempotency_keys(datetime.utcnow() - timedelta(days=self.retention_days))
+
+    async def start(self) -> None:
+        """Prune old keys every prune_interval seconds"""
+        if self._task is None and self.retention_days > 0 and self.prune_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.prune_interval)
+            try:
+                pruned = await asyncio.to_thread(self.prune)
+                if pruned:
+                    logger.info("Pruned %s idempotency keys", pruned)
+            except Exception as e:
+                logger.error("Error pruning idempotency keys: %s", e)
+
+
+idempotency_index = IdempotencyIndex(
+    max_entries=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000")),
+    claim_timeout=float(os.getenv("IDEMPOTENCY_CLAIM_TIMEOUT", "300")),  # 0 = never take over a claim
+    retention_days=float(os.getenv("IDEMPOTENCY_RETENTION_DAYS", "7")),  # 0 = keep forever
+    prune_interval=float(os.getenv("IDEMPOTENCY_PRUNE_INTERVAL", "3600"))
+)
@@ -1,229 +1,377 @@
+import asyncio
 import logging
 import uuid
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Callable, Awaitable
 
-from ..models import WebhookPayload, NegotiationOffer, NegotiationResult
-from ..services import verify_carrier_mc_number, search_loads_by_criteria, extract_call_analytics
-from ..database import negotiations_db, store_call_analytics, store_negotiation, store_call_event
+from ..models import (
+    WebhookPayload,
+    NegotiationOffer,
+    NegotiationResult,
+    CallEndedData,
+    CarrierCallInitiatedEvent,
+    LoadInterestExpressedEvent,
+    NegotiationOfferEvent,
+    AgreementReachedEvent,
+    NegotiationDeclinedEvent,
+    CarrierNotInterestedEvent,
+    TransferFailedEvent,
+    CallEndedEvent
+)
+from ..services import (
+    verify_carrier_mc_number,
+    search_loads_by_criteria,
+    get_load_by_id,
+    negotiation_sessions,
+    lane_rate_index
+)
+from ..services.lanes import lane_key
+from ..services.sentiment import sentiment_trackers
+from ..services.analytics import (
+    ANALYSIS_VERSION,
+    extract_offer_data,
+    classify_call_outcome,
+    classify_carrier_sentiment,
+    extract_call_features
+)
+from ..database import store_call_analytics, store_negotiation, store_call_event, event_log
+from ..monitoring import WEBHOOK_EVENTS, correlation_id
 
 logger = logging.getLogger(__name__)
 
+MAX_NEGOTIATION_ROUNDS = 3
 
-async def process_webhook_event(payload: WebhookPayload) -> Dict[str, Any]:
+
+def _carrier_mc(payload: WebhookPayload) -> str:
+    return payload.carrier_info.mc_number if payload.carrier_info else "unknown"
+
+
+async def _handle_carrier_call_initiated(payload: CarrierCallInitiatedEvent, response_data: Dict[str, Any]) -> None:
+    if payload.carrier_info:
+        verification_result = await verify_carrier_mc_number(payload.carrier_info.mc_number)
+        response_data["carrier_verification"] = verification_result
+        
+        if verification_result.get("is_eligible"):
+            loads = search_loads_by_criteria()
+            response_data["available_loads"] = loads[:5]
+            response_data["message"] = "Carrier verified - presenting available loads"
+        else:
+            response_data["message"] = "Carrier verification failed"
+
+
+async def _handle_load_interest_expressed(payload: LoadInterestExpressedEvent, response_data: Dict[str, Any]) -> None:
+    response_data["message"] = "Load interest recorded - providing detailed information"
+    response_data["next_action"] = "present_load_details"
+
+
+async def _handle_negotiation_offer(payload: NegotiationOfferEvent, response_data: Dict[str, Any]) -> None:
+    call_data = payload.call_data
+    if not call_data or call_data.offered_rate is None:
+        return
+    
+    load_id = call_data.load_id
+    carrier_mc = _carrier_mc(payload)
+    carrier_offer = call_data.offered_rate
+    original_rate = call_data.original_rate
+    
+    session_key = negotiation_sessions.session_key(call_data.call_id, load_id, carrier_mc)
+    
+    # Ceiling and counter offer come from accepted rates on the load's lane
+    load = payload.load_info or get_load_by_id(load_id)
+    lane = lane_key(load.origin, load.destination, load.equipment_type) if load else None
+    quote = None
+    if original_rate:
+        quote = lane_rate_index.quote(
+            load.origin if load else None,
+            load.destination if load else None,
+            load.equipment_type if load else None,
+            original_rate
+        )
+    max_acceptable_rate = quote["ceiling"] if quote else carrier_offer
+    
+    # Round state is tracked server-side, not taken from the platform. Business rule: 3 rounds
+    # maximum, checked and counted in one step so concurrent offers cannot both get past it
+    session = await asyncio.to_thread(
+        negotiation_sessions.record_offer,
+        session_key,
+        carrier_mc=carrier_mc,
+        original_rate=original_rate if original_rate is not None else carrier_offer,
+        offered_rate=carrier_offer,
+        max_acceptable_rate=max_acceptable_rate,
+        status="over_limit" if carrier_offer > max_acceptable_rate else "negotiating",
+        lane=lane,
+        max_rounds=MAX_NEGOTIATION_ROUNDS
+    )
+    current_round = session.counter_offer_count - 1
+    reported_round = call_data.counter_offer_count
+    if reported_round is not None and reported_round != current_round:
+        logger.warning("Platform reported round %s but session is at round %s", reported_round, current_round)
+    
+    if session.status == "limit_reached":
+        response_data["negotiation_status"] = "limit_reached"
+        response_data["message"] = "Maximum negotiation rounds reached. Final offer stands."
+        response_data["next_action"] = "final_decision"
+        response_data["final_offer"] = min(carrier_offer, max_acceptable_rate)
+    
+    # Business rule: 20% rate cap
+    elif session.status == "over_limit":
+        response_data["negotiation_status"] = "over_limit"
+        counter_offer = quote["suggested_counter"] if quote else max_acceptable_rate
+        response_data["message"] = f"Offer exceeds maximum acceptable rate. Best we can do is ${counter_offer:.2f}"
+        response_data["counter_offer"] = counter_offer
+        response_data["next_action"] = "counter_offer"
+    
+    else:
+        response_data["negotiation_status"] = "recorded"
+        response_data["message"] = "Counter offer recorded and within acceptable range"
+        response_data["next_action"] = "continue_negotiation"
+    
+    response_data["rate_analysis"] = {
+        "original_rate": original_rate,
+        "carrier_offer": carrier_offer,
+        "max_acceptable": max_acceptable_rate,
+        "suggested_counter": quote["suggested_counter"] if quote else None,
+        "pricing_source": quote["source"] if quote else None,
+        "current_round": current_round + 1,
+        "rounds_remaining": max(0, MAX_NEGOTIATION_ROUNDS - (current_round + 1))
+    }
+
+
+def _record_negotiation_outcome(payload: WebhookPayload, status: str, outcome: str, outcome_reason: str,
+                                final_rate: Optional[float]) -> Dict[str, Any]:
+    """Mark the negotiation session outcome and build the NegotiationResult for the response"""
+    call_data = payload.call_data
+    carrier_mc = _carrier_mc(payload)
+    session = negotiation_sessions.mark_outcome(
+        negotiation_sessions.session_key(call_data.call_id, call_data.load_id, carrier_mc),
+        status,
+        final_rate
+    )
+    
+    result = NegotiationResult(
+        load_id=call_data.load_id,
+        carrier_mc=carrier_mc,
+        original_rate=call_data.original_rate or 0,
+        final_rate=final_rate,
+        total_rounds=session.counter_offer_count if session else call_data.total_rounds,
+        outcome=outcome,
+        outcome_reason=outcome_reason
+    )
+    return result.model_dump()
+
+
+async def _handle_agreement_reached(payload: AgreementReachedEvent, response_data: Dict[str, Any]) -> None:
+    if payload.call_data:
+        response_data["negotiation_result"] = _record_negotiation_outcome(
+            payload, "accepted", "agreement", "price_agreed", payload.call_data.final_rate
+        )
+    
+    response_data["message"] = "Agreement reached - transferring to sales rep"
+    response_data["next_action"] = "transfer_call"
+
+
+async def _handle_negotiation_declined(payload: NegotiationDeclinedEvent, response_data: Dict[str, Any]) -> None:
+    if payload.call_data:
+        response_data["negotiation_result"] = _record_negotiation_outcome(
+            payload, "rejected", "no_agreement", "carrier_declined", None
+        )
+    
+    response_data["message"] = "Negotiation declined by carrier"
+    response_data["next_action"] = "offer_other_loads"
+
+
+async def _handle_carrier_not_interested(payload: CarrierNotInterestedEvent, response_data: Dict[str, Any]) -> None:
+    response_data["message"] = "Carrier not interested in available loads"
+    response_data["next_action"] = "end_call"
+
+
+async def _handle_transfer_failed(payload: TransferFailedEvent, response_data: Dict[str, Any]) -> None:
+    if payload.call_data:
+        response_data["negotiation_result"] = _record_negotiation_outcome(
+            payload,
+            "agreement_transfer_failed",
+            "agreement_transfer_failed",
+            payload.call_data.transfer_failure_reason,
+            payload.call_data.final_rate
+        )
+    
+    response_data["message"] = "Agreement reached but transfer to sales failed - follow-up required"
+    response_data["next_action"] = "schedule_callback"
+    response_data["requires_follow_up"] = True
+    response_data["failure_type"] = "operational"
+
+
+async def _handle_call_ended(payload: CallEndedEvent, response_data: Dict[str, Any]) -> None:
+    data = payload.call_data or CallEndedData()
+    
+    # Analytics rules read the call data exactly as sent by the platform
+    call_data = data.model_dump(exclude_unset=True)
+    if payload.carrier_info:
+        call_data["carrier_info"] = payload.carrier_info.model_dump()
+    if payload.load_info:
+        call_data["load_info"] = payload.load_info.model_dump()
+    
+    load = payload.load_info or get_load_by_id(data.load_id)
+    lane = lane_key(load.origin, load.destination, load.equipment_type) if load else None
+    
+    offer_data = extract_offer_data(call_data)
+    call_outcome = classify_call_outcome(call_data)
+    # Storage calls (and the shared stores, which read and write SQLite) run in threads
+    tracker = await asyncio.to_thread(sentiment_trackers.pop, data.call_id)
+    carrier_sentiment = classify_carrier_sentiment(call_data, tracker)
+    
+    analytics = {
+        "call_id": data.call_id or "unknown",
+        "event_id": response_data["event_id"],
+        "analysis_timestamp": datetime.utcnow().isoformat(),
+        "analysis_version": ANALYSIS_VERSION,
+        "call_features": extract_call_features(call_data),
+        "lane": lane,
+        "posted_rate": load.loadboard_rate if load else data.original_rate,
+        "offer_data": offer_data,
+        "call_outcome": call_outcome,
+        "carrier_sentiment": carrier_sentiment,
+        "summary": {
+            "data_quality": offer_data["offer_summary"]["data_completeness"],
+            "outcome_confidence": call_outcome["outcome_confidence"],
+            "sentiment_confidence": carrier_sentiment["sentiment_confidence"],
+            "analysis_complete": True
+        }
+    }
+    
+    analytics_id = await asyncio.to_thread(store_call_analytics, analytics)
+    
+    # Negotiations tracked server-side are written once, when the call ends
+    carrier_mc = _carrier_mc(payload)
+    negotiation_status = {
+        "success": "accepted",
+        "partial_success": "agreement_transfer_failed"
+    }.get(call_outcome["primary_outcome"], "completed")
+    completed_sessions = await asyncio.to_thread(
+        negotiation_sessions.complete_call,
+        negotiation_sessions.call_key(data.call_id, carrier_mc),
+        status=negotiation_status,
+        load_id=data.load_id,
+        final_rate=data.final_rate,
+        details={"outcome": data.outcome}
+    )
+    
+    if not completed_sessions and data.negotiation_rounds > 0:
+        try:
+            logger.info("Creating negotiation summary for call %s", data.call_id)
+            original_rate = data.original_rate or 0
+            quote = lane_rate_index.quote(
+                load.origin if load else None,
+                load.destination if load else None,
+                load.equipment_type if load else None,
+                original_rate
+            ) if original_rate else None
+            negotiation_summary = NegotiationOffer(
+                load_id=data.load_id or "unknown",
+                carrier_mc=carrier_mc,
+                original_rate=original_rate,
+                offered_rate=data.final_rate if data.final_rate is not None else original_rate,
+                counter_offer_count=data.negotiation_rounds,
+                max_acceptable_rate=quote["ceiling"] if quote else 0,
+                status=negotiation_status,
+                origin_state=lane[0] if lane else None,
+                destination_state=lane[1] if lane else None,
+                equipment_type=lane[2] if lane else None,
+                negotiation_history=[{
+                    "round": data.negotiation_rounds,
+                    "final_rate": data.final_rate or 0,
+                    "original_rate": original_rate,
+                    "outcome": data.outcome,
+                    "timestamp": datetime.utcnow().isoformat()
+                }]
+            )
+            negotiation_id = await asyncio.to_thread(store_negotiation, negotiation_summary)
+            lane_rate_index.observe(negotiation_summary)
+            logger.info("Negotiation stored with ID: %s", negotiation_id)
+        except Exception as e:
+            logger.error("Error creating/storing negotiation: %s", e)
+    
+    response_data["analytics"] = analytics
+    response_data["analytics_id"] = analytics_id
+    response_data["message"] = "Call analytics extracted: offer data, outcome classification, and sentiment analysis"
+
+
+# Dispatch table: event type -> handler (unknown event types are only recorded)
+EVENT_HANDLERS: Dict[str, Callable[[Any, Dict[str, Any]], Awaitable[None]]] = {
+    "carrier_call_initiated": _handle_carrier_call_initiated,
+    "load_interest_expressed": _handle_load_interest_expressed,
+    "negotiation_offer": _handle_negotiation_offer,
+    "agreement_reached": _handle_agreement_reached,
+    "negotiation_declined": _handle_negotiation_declined,
+    "carrier_not_interested": _handle_carrier_not_interested,
+    "transfer_failed": _handle_transfer_failed,
+    "call_ended": _handle_call_ended,
+}
+
+
+def log_webhook_event(event_id: str, payload: WebhookPayload, received_at: str) -> None:
+    """Append an accepted event to the raw event log (failures never fail the webhook)"""
+    if event_log is None:
+        return
+    try:
+        event_log.append(event_id, payload.call_data.call_id if payload.call_data else None, received_at, payload)
+    except Exception as e:
+        logger.error("Error appending event %s to event log: %s", event_id, e)
+
+
+def record_call_event(payload: WebhookPayload, event_id: str, received_at: str) -> None:
+    """Store the call_events row of a webhook event"""
+    store_call_event({
+        "event_id": event_id,
+        "event_type": payload.event_type,
+        "call_id": payload.call_data.call_id if payload.call_data else None,
+        "carrier_mc": payload.carrier_info.mc_number if payload.carrier_info else None,
+        "load_id": payload.call_data.load_id if payload.call_data else None,
+        "caller_phone": payload.carrier_info.phone_number if payload.carrier_info else None,
+        "received_at": received_at
+    })
+
+
+async def process_webhook_event(payload: WebhookPayload, event_id: Optional[str] = None,
+                                received_at: Optional[str] = None) -> Dict[str, Any]:
     """
     Process webhook event from HappyRobot platform.
     
     Handles carrier engagement events including verification, load matching, 
-    negotiation processing, and analytics extraction.
+    negotiation processing, and analytics extraction. The payload is one of the
+    typed event models of the WebhookEvent union and is dispatched by event_type.
+    An event_id (and received_at) is passed in when the event was already
+    acknowledged, e.g. queued for background processing or replayed from the event log.
     """
+    event_id = event_id or str(uuid.uuid4())
+    token = correlation_id.set(event_id)  # Logs of background and replayed events carry their id too
     try:
-        logger.info(f"Processing webhook event: {payload.event_type}")
+        logger.info("Processing webhook event: %s", payload.event_type)
         
         response_data = {
-            "event_id": str(uuid.uuid4()),
-            "received_at": datetime.utcnow().isoformat(),
+            "event_id": event_id,
+            "received_at": received_at or datetime.utcnow().isoformat(),
             "event_type": payload.event_type,
             "status": "processed"
         }
         
-        event_data = {
-            "event_id": response_data["event_id"],
-            "event_type": payload.event_type,
-            "call_id": payload.call_data.get("call_id") if payload.call_data else None,
-            "carrier_mc": payload.carrier_info.mc_number if payload.carrier_info else None,
-            "load_id": payload.call_data.get("load_id") if payload.call_data else None,
-            "received_at": response_data["received_at"]
-        }
-        store_call_event(event_data)
-        
-        if payload.event_type == "carrier_call_initiated":
-            if payload.carrier_info:
-                verification_result = await verify_carrier_mc_number(payload.carrier_info.mc_number)
-                response_data["carrier_verification"] = verification_result
-                
-                if verification_result.get("is_eligible"):
-                    loads = search_loads_by_criteria()
-                    response_data["available_loads"] = loads[:5]
-                    response_data["message"] = "Carrier verified - presenting available loads"
-                else:
-                    response_data["message"] = "Carrier verification failed"
-        
-        elif payload.event_type == "load_interest_expressed":
-            response_data["message"] = "Load interest recorded - providing detailed information"
-            response_data["next_action"] = "present_load_details"
-        
-        elif payload.event_type == "negotiation_offer":
-            if payload.call_data and "offered_rate" in payload.call_data:
-                load_id = payload.call_data.get("load_id")
-                carrier_offer = payload.call_data["offered_rate"]
-                original_rate = payload.call_data.get("original_rate")
-                current_round = payload.call_data.get("counter_offer_count", 0)
-                
-                max_acceptable_rate = original_rate * 1.20 if original_rate else carrier_offer
-                
-                # Business rule: 3 rounds maximum
-                if current_round >= 3:
-                    response_data["negotiation_status"] = "limit_reached"
-                    response_data["message"] = "Maximum negotiation rounds reached. Final offer stands."
-                    response_data["next_action"] = "final_decision"
-                    response_data["final_offer"] = min(carrier_offer, max_acceptable_rate)
-                
-                # Business rule: 20% rate cap
-                elif carrier_offer > max_acceptable_rate:
-                    response_data["negotiation_status"] = "over_limit"
-                    response_data["message"] = f"Offer exceeds maximum acceptable rate. Best we can do is ${max_acceptable_rate:.2f}"
-                    response_data["counter_offer"] = max_acceptable_rate
-                    response_data["next_action"] = "counter_offer"
-                
-                else:
-                    negotiation = NegotiationOffer(
-                        load_id=load_id,
-                        carrier_mc=payload.carrier_info.mc_number if payload.carrier_info else "unknown",
-                        original_rate=original_rate,
-                        offered_rate=carrier_offer,
-                        counter_offer_count=current_round + 1,
-                        max_acceptable_rate=max_acceptable_rate,
-                        status="negotiating",
-                        negotiation_history=[{
-                            "round": current_round + 1,
-                            "offered_rate": carrier_offer,
-                            "timestamp": datetime.utcnow().isoformat()
-                        }]
-                    )
-                    
-                    negotiations_db.append(negotiation)
-                    store_negotiation(negotiation)
-                    
-                    response_data["negotiation_status"] = "recorded"
-                    response_data["message"] = "Counter offer recorded and within acceptable range"
-                    response_data["next_action"] = "continue_negotiation"
-                
-                response_data["rate_analysis"] = {
-                    "original_rate": original_rate,
-                    "carrier_offer": carrier_offer,
-                    "max_acceptable": max_acceptable_rate,
-                    "current_round": current_round + 1,
-                    "rounds_remaining": max(0, 3 - (current_round + 1))
-                }
-        
-        elif payload.event_type == "agreement_reached":
-            if payload.call_data:
-                final_rate = payload.call_data.get("final_rate")
-                load_id = payload.call_data.get("load_id")
-                
-                result = NegotiationResult(
-                    load_id=load_id,
-                    carrier_mc=payload.carrier_info.mc_number if payload.carrier_info else "unknown",
-                    original_rate=payload.call_data.get("original_rate", 0),
-                    final_rate=final_rate,
-                    total_rounds=payload.call_data.get("total_rounds", 0),
-                    outcome="agreement",
-                    outcome_reason="price_agreed"
-                )
-                response_data["negotiation_result"] = result.dict()
-            
-            response_data["message"] = "Agreement reached - transferring to sales rep"
-            response_data["next_action"] = "transfer_call"
-        
-        elif payload.event_type == "negotiation_declined":
-            if payload.call_data:
-                result = NegotiationResult(
-                    load_id=payload.call_data.get("load_id"),
-                    carrier_mc=payload.carrier_info.mc_number if payload.carrier_info else "unknown",
-                    original_rate=payload.call_data.get("original_rate", 0),
-                    final_rate=None,
-                    total_rounds=payload.call_data.get("total_rounds", 0),
-                    outcome="no_agreement",
-                    outcome_reason="carrier_declined"
-                )
-                response_data["negotiation_result"] = result.dict()
-            
-            response_data["message"] = "Negotiation declined by carrier"
-            response_data["next_action"] = "offer_other_loads"
-        
-        elif payload.event_type == "carrier_not_interested":
-            response_data["message"] = "Carrier not interested in available loads"
-            response_data["next_action"] = "end_call"
+        await asyncio.to_thread(record_call_event, payload, response_data["event_id"], response_data["received_at"])
         
-        elif payload.event_type == "transfer_failed":
-            if payload.call_data:
-                result = NegotiationResult(
-                    load_id=payload.call_data.get("load_id"),
-                    carrier_mc=payload.carrier_info.mc_number if payload.carrier_info else "unknown",
-                    original_rate=payload.call_data.get("original_rate", 0),
-                    final_rate=payload.call_data.get("final_rate"),
-                    total_rounds=payload.call_data.get("total_rounds", 0),
-                    outcome="agreement_transfer_failed",
-                    outcome_reason=payload.call_data.get("transfer_failure_reason", "transfer_technical_failure")
-                )
-                response_data["negotiation_result"] = result.dict()
-            
-            response_data["message"] = "Agreement reached but transfer to sales failed - follow-up required"
-            response_data["next_action"] = "schedule_callback"
-            response_data["requires_follow_up"] = True
-            response_data["failure_type"] = "operational"
+        # Call events sent while the call is in progress update its sentiment tracker
+        call_events = payload.call_data.model_extra.get("call_events") if payload.call_data else None
+        if call_events and payload.call_data.call_id and payload.event_type != "call_ended":
+            sentiment_trackers.feed(payload.call_data.call_id, call_events)
         
-        elif payload.event_type == "call_ended":
-            call_data = payload.call_data or {}
-            
-            if payload.carrier_info:
-                call_data["carrier_info"] = payload.carrier_info.dict()
-            if payload.load_info:
-                call_data["load_info"] = payload.load_info.dict()
-            
-            from ..services.analytics import extract_offer_data, classify_call_outcome, classify_carrier_sentiment
-            offer_data = extract_offer_data(call_data)
-            call_outcome = classify_call_outcome(call_data)
-            carrier_sentiment = classify_carrier_sentiment(call_data)
-            
-            analytics = {
-                "call_id": call_data.get("call_id", "unknown"),
-                "event_id": response_data["event_id"],
-                "analysis_timestamp": datetime.utcnow().isoformat(),
-                "offer_data": offer_data,
-                "call_outcome": call_outcome,
-                "carrier_sentiment": carrier_sentiment,
-                "summary": {
-                    "data_quality": offer_data["offer_summary"]["data_completeness"],
-                    "outcome_confidence": call_outcome["outcome_confidence"],
-                    "sentiment_confidence": carrier_sentiment["sentiment_confidence"],
-                    "analysis_complete": True
-                }
-            }
-            
-            analytics_id = store_call_analytics(analytics)
-            
-            if call_data.get("negotiation_rounds", 0) > 0:
-                try:
-                    logger.info(f"Creating negotiation summary for call {call_data.get('call_id')}")
-                    negotiation_summary = NegotiationOffer(
-                        load_id=call_data.get("load_id", "unknown"),
-                        carrier_mc=payload.carrier_info.mc_number if payload.carrier_info else "unknown",
-                        original_rate=call_data.get("original_rate", 0),
-                        offered_rate=call_data.get("final_rate", call_data.get("original_rate", 0)),
-                        counter_offer_count=call_data.get("negotiation_rounds", 0),
-                        max_acceptable_rate=call_data.get("original_rate", 0) * 1.20 if call_data.get("original_rate") else 0,
-                        status="completed",
-                        negotiation_history=[{
-                            "round": call_data.get("negotiation_rounds", 0),
-                            "final_rate": call_data.get("final_rate", 0),
-                            "original_rate": call_data.get("original_rate", 0),
-                            "outcome": call_data.get("outcome", "unknown"),
-                            "timestamp": datetime.utcnow().isoformat()
-                        }]
-                    )
-                    negotiation_id = store_negotiation(negotiation_summary)
-                    logger.info(f"Negotiation stored with ID: {negotiation_id}")
-                except Exception as e:
-                    logger.error(f"Error creating/storing negotiation: {str(e)}")
-            
-            response_data["analytics"] = analytics
-            response_data["analytics_id"] = analytics_id
-            response_data["message"] = "Call analytics extracted: offer data, outcome classification, and sentiment analysis"
+        handler = EVENT_HANDLERS.get(payload.event_type)
+        if handler is not None:
+            await handler(payload, response_data)
         
+        WEBHOOK_EVENTS.inc(payload.event_type if handler is not None else "other", "processed")
         return response_data
         
     except Exception as e:
-        logger.error(f"Error processing webhook event: {str(e)}")
-        raise 
\ No newline at end of file
+        logger.error("Error processing webhook event: %s", e)
+        WEBHOOK_EVENTS.inc(payload.event_type if payload.event_type in EVENT_HANDLERS else "other", "error")
+        raise
+    finally:
+        correlation_id.reset(token)
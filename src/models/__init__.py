@@ -1,12 +1,42 @@
 from .carrier import CarrierInfo
 from .load import LoadData
-from .webhook import WebhookPayload
+from .webhook import (
+    WebhookPayload,
+    WebhookEvent,
+    webhook_event_adapter,
+    CallData,
+    NegotiationOfferData,
+    NegotiationOutcomeData,
+    CallEndedData,
+    CarrierCallInitiatedEvent,
+    LoadInterestExpressedEvent,
+    NegotiationOfferEvent,
+    AgreementReachedEvent,
+    NegotiationDeclinedEvent,
+    CarrierNotInterestedEvent,
+    TransferFailedEvent,
+    CallEndedEvent
+)
 from .negotiation import NegotiationOffer, NegotiationResult
 
 __all__ = [
     "CarrierInfo",
     "LoadData", 
     "WebhookPayload",
+    "WebhookEvent",
+    "webhook_event_adapter",
+    "CallData",
+    "NegotiationOfferData",
+    "NegotiationOutcomeData",
+    "CallEndedData",
+    "CarrierCallInitiatedEvent",
+    "LoadInterestExpressedEvent",
+    "NegotiationOfferEvent",
+    "AgreementReachedEvent",
+    "NegotiationDeclinedEvent",
+    "CarrierNotInterestedEvent",
+    "TransferFailedEvent",
+    "CallEndedEvent",
     "NegotiationOffer",
     "NegotiationResult"
-] 
\ No newline at end of file
+]
@@ -13,6 +13,9 @@ class NegotiationOffer(BaseModel):
     max_acceptable_rate: Optional[float] = None  # 20% above original
     status: str = "pending"  # pending, accepted, rejected, negotiating, limit_reached
     negotiation_history: List[dict] = Field(default_factory=list)  # Track all offers
+    origin_state: Optional[str] = None  # Lane of the load, e.g. "IL"
+    destination_state: Optional[str] = None
+    equipment_type: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
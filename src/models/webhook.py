@@ -1,14 +1,130 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Discriminator, Field, Tag, TypeAdapter
+from typing import Optional, Any, Literal, Union
+from typing_extensions import Annotated
 from datetime import datetime
 from .carrier import CarrierInfo
 from .load import LoadData
 
 
+def _identifier(value: Any) -> Any:
+    """The platform sends some ids as numbers; they are kept as strings"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    return value
+
+
+Identifier = Annotated[Optional[str], BeforeValidator(_identifier)]
+
+
+class CallData(BaseModel):
+    """Call data shared by all webhook events; unknown fields are kept for analytics"""
+    model_config = ConfigDict(extra="allow")
+
+    call_id: Identifier = None
+    load_id: Identifier = None
+
+
+class NegotiationOfferData(CallData):
+    """Call data for negotiation_offer events"""
+    offered_rate: Optional[float] = None
+    original_rate: Optional[float] = None
+    counter_offer_count: Optional[int] = None  # Reported by the platform, rounds are tracked server-side
+
+
+class NegotiationOutcomeData(CallData):
+    """Call data for agreement_reached, negotiation_declined and transfer_failed events"""
+    original_rate: Optional[float] = None
+    final_rate: Optional[float] = None
+    total_rounds: int = 0
+    transfer_failure_reason: str = "transfer_technical_failure"
+
+
+class CallEndedData(CallData):
+    """Call data for call_ended events"""
+    outcome: str = "unknown"
+    original_rate: Optional[float] = None
+    final_rate: Optional[float] = None
+    negotiation_rounds: int = 0
+
+
 class WebhookPayload(BaseModel):
     """Model for webhook payload from HappyRobot"""
     event_type: str
     carrier_info: Optional[CarrierInfo] = None
     load_info: Optional[LoadData] = None
-    call_data: Optional[Dict[str, Any]] = None
-    timestamp: datetime = Field(default_factory=datetime.utcnow) 
\ No newline at end of file
+    call_data: Optional[CallData] = None
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+
+class CarrierCallInitiatedEvent(WebhookPayload):
+    event_type: Literal["carrier_call_initiated"]
+
+
+class LoadInterestExpressedEvent(WebhookPayload):
+    event_type: Literal["load_interest_expressed"]
+
+
+class NegotiationOfferEvent(WebhookPayload):
+    event_type: Literal["negotiation_offer"]
+    call_data: Optional[NegotiationOfferData] = None
+
+
+class AgreementReachedEvent(WebhookPayload):
+    event_type: Literal["agreement_reached"]
+    call_data: Optional[NegotiationOutcomeData] = None
+
+
+class NegotiationDeclinedEvent(WebhookPayload):
+    event_type: Literal["negotiation_declined"]
+    call_data: Optional[NegotiationOutcomeData] = None
+
+
+class CarrierNotInterestedEvent(WebhookPayload):
+    event_type: Literal["carrier_not_interested"]
+
+
+class TransferFailedEvent(WebhookPayload):
+    event_type: Literal["transfer_failed"]
+    call_data: Optional[NegotiationOutcomeData] = None
+
+
+class CallEndedEvent(WebhookPayload):
+    event_type: Literal["call_ended"]
+    call_data: Optional[CallEndedData] = None
+
+
+EVENT_PAYLOADS = {
+    "carrier_call_initiated": CarrierCallInitiatedEvent,
+    "load_interest_expressed": LoadInterestExpressedEvent,
+    "negotiation_offer": NegotiationOfferEvent,
+    "agreement_reached": AgreementReachedEvent,
+    "negotiation_declined": NegotiationDeclinedEvent,
+    "carrier_not_interested": CarrierNotInterestedEvent,
+    "transfer_failed": TransferFailedEvent,
+    "call_ended": CallEndedEvent,
+}
+
+
+def _event_tag(value: Any) -> str:
+    """Pick the payload model by event_type; unknown event types are accepted as generic events"""
+    event_type = value.get("event_type") if isinstance(value, dict) else getattr(value, "event_type", None)
+    return event_type if event_type in EVENT_PAYLOADS else "generic"
+
+
+# Discriminated union of all webhook payloads, validated once at the edge
+WebhookEvent = Annotated[
+    Union[
+        Annotated[CarrierCallInitiatedEvent, Tag("carrier_call_initiated")],
+        Annotated[LoadInterestExpressedEvent, Tag("load_interest_expressed")],
+        Annotated[NegotiationOfferEvent, Tag("negotiation_offer")],
+        Annotated[AgreementReachedEvent, Tag("agreement_reached")],
+        Annotated[NegotiationDeclinedEvent, Tag("negotiation_declined")],
+        Annotated[CarrierNotInterestedEvent, Tag("carrier_not_interested")],
+        Annotated[TransferFailedEvent, Tag("transfer_failed")],
+        Annotated[CallEndedEvent, Tag("call_ended")],
+        Annotated[WebhookPayload, Tag("generic")],
+    ],
+    Discriminator(_event_tag)
+]
+
+webhook_event_adapter: TypeAdapter = TypeAdapter(WebhookEvent)
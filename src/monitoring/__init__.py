@@ -0,0 +1,60 @@
+from .metrics import (
+    registry,
+    metrics_snapshots,
+    MetricsRegistry,
+    MetricsSnapshotWriter,
+    HTTP_REQUESTS,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_FLIGHT,
+    FMCSA_REQUEST_DURATION,
+    SQLITE_STATEMENT_DURATION,
+    WEBHOOK_EVENTS,
+    AUTH_REJECTIONS,
+    STARTUP_DURATION
+)
+from .middleware import MetricsMiddleware, ProfilerMiddleware
+from .profiler import profiler, is_profiled, StackProfiler
+from .startup import startup_profile, StartupProfile, ImportTimer
+from .memory import memory_monitor, MemoryMonitor, estimate_size
+from .logs import (
+    configure_logging,
+    shutdown_logging,
+    parse_sampling,
+    bind_correlation_id,
+    correlation_id,
+    JsonFormatter,
+    LOG_RECORDS_DROPPED
+)
+
+__all__ = [
+    "registry",
+    "metrics_snapshots",
+    "MetricsRegistry",
+    "MetricsSnapshotWriter",
+    "HTTP_REQUESTS",
+    "HTTP_REQUEST_DURATION",
+    "HTTP_REQUESTS_IN_FLIGHT",
+    "FMCSA_REQUEST_DURATION",
+    "SQLITE_STATEMENT_DURATION",
+    "WEBHOOK_EVENTS",
+    "AUTH_REJECTIONS",
+    "STARTUP_DURATION",
+    "MetricsMiddleware",
+    "ProfilerMiddleware",
+    "profiler",
+    "is_profiled",
+    "StackProfiler",
+    "startup_profile",
+    "StartupProfile",
+    "ImportTimer",
+    "memory_monitor",
+    "MemoryMonitor",
+    "estimate_size",
+    "configure_logging",
+    "shutdown_logging",
+    "parse_sampling",
+    "bind_correlation_id",
+    "correlation_id",
+    "JsonFormatter",
+    "LOG_RECORDS_DROPPED"
+]
@@ -0,0 +1,184 @@
+"""
+Non-blocking structured logging.
+
+Loggers hand records to a QueueHandler on the root logger, which only
+attaches the correlation id and enqueues them; a QueueListener thread formats
+and writes them (JSON lines by default), so a slow stderr or log collector
+never blocks the event loop. Messages use %-style arguments and are formatted
+by the listener, so records that are filtered or sampled out cost no
+formatting at all.
+
+- Correlation ids: bind_correlation_id() sets the id (the webhook event id
+  while an event is handled) for everything logged in the current context,
+  including code run through asyncio.to_thread.
+- Sampling: LOG_SAMPLING="logger=rate,..." keeps a fraction of the INFO and
+  DEBUG records of a logger and its children; warnings and errors are always
+  kept.
+- Backpressure: the queue holds LOG_QUEUE_SIZE records; when the listener
+  falls behind, new records are dropped and counted rather than waited on.
+"""
+
+import atexit
+import contextvars
+import copy
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional
+
+from pydantic_core import to_json
+
+from .metrics import registry
+
+correlation_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("correlation_id", default=None)
+
+LOG_RECORDS_DROPPED = registry.counter(
+    "log_records_dropped_total", "Log records not written, by reason (sampled, queue_full)", ("reason",)
+)
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed with extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "correlation_id"
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+@contextmanager
+def bind_correlation_id(value: Optional[str]) -> Iterator[None]:
+    """Tag the records logged in this context (and tasks or threads started from it) with value"""
+    token = correlation_id.set(value)
+    try:
+        yield
+    finally:
+        correlation_id.reset(token)
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """"src.database=0.1,src.handlers.webhook_handler=0.25" -> {logger name: kept fraction}"""
+    rates = {}
+    for item in spec.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = max(0.0, min(1.0, float(rate)))
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of the INFO/DEBUG records of configured loggers (longest matching prefix)"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: Dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            prefix = name
+            while prefix and prefix not in self.rates:
+                prefix = prefix.rpartition(".")[0]
+            rate = self._resolved[name] = self.rates.get(prefix, 1.0)
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        LOG_RECORDS_DROPPED.inc("sampled")
+        return False
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records without formatting them.
+
+    The stdlib QueueHandler formats the message in the calling thread; here
+    only the correlation id and the exception text (which needs the live
+    traceback) are resolved before the record is handed to the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.correlation_id = correlation_id.get()
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc("queue_full")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, correlation id and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        correlation = getattr(record, "correlation_id", None)
+        if correlation:
+            entry["correlation_id"] = correlation
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return to_json(entry, fallback=str).decode()
+
+
+def configure_logging(level: int = logging.WARNING, json_format: bool = True,
+                      sampling: Optional[Dict[str, float]] = None, queue_size: int = 10000) -> None:
+    """Route the root logger through the queue to a stderr writer thread (replaces earlier configuration)"""
+    global _listener
+    shutdown_logging()
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    if sampling:
+        handler.addFilter(SamplingFilter(sampling))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Write the records still queued and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except queue.Full:
+            pass  # No room for the stop sentinel; the daemon thread ends with the process
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,290 @@
+"""
+Memory accounting and leak detection.
+
+Long-lived in-process structures (the load inventory, session stores,
+caches, queues) are registered with the MemoryMonitor by name. Their sizes
+are reported as entry counts plus an estimated deep size: containers are
+measured on a sample of MEMORY_SAMPLE_ITEMS entries and extrapolated, so a
+report stays cheap on large structures.
+
+A background task records RSS and structure sizes every
+MEMORY_SAMPLE_INTERVAL seconds, keeps the history and logs a warning for
+every structure that grew in each of the last MEMORY_GROWTH_SAMPLES samples.
+tracemalloc can be started on demand (or at startup with TRACEMALLOC_FRAMES)
+to list top allocators and diff snapshots taken at two points in time.
+"""
+
+import asyncio
+import gc
+import inspect
+import itertools
+import logging
+import os
+import sys
+import threading
+import tracemalloc
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SKIPPED_TYPES = (type, type(sys), type(threading.Lock()), type(threading.RLock()), threading.Condition,
+                  asyncio.Lock, asyncio.AbstractEventLoop)
+
+# Allocations made by the accounting itself
+_TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>")
+]
+
+
+def _rss_bytes() -> Optional[int]:
+    """Current resident set size (Linux), None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def estimate_size(obj: Any, sample_items: int = 100, _seen: Optional[set] = None) -> int:
+    """
+    Approximate deep size in bytes of obj.
+
+    Containers larger than sample_items are measured on their first
+    sample_items entries and extrapolated. Objects reachable twice are counted
+    once; classes, modules, functions and locks are not counted.
+    """
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen or isinstance(obj, _SKIPPED_TYPES) or inspect.isroutine(obj) or inspect.iscoroutine(obj):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj, 0)
+
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        items = obj.items()
+        count = len(obj)
+        measure: Callable[[Any], int] = lambda item: (estimate_size(item[0], sample_items, seen)
+                                                      + estimate_size(item[1], sample_items, seen))
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        items = obj
+        count = len(obj)
+        measure = lambda item: estimate_size(item, sample_items, seen)
+    elif isinstance(obj, asyncio.Queue):
+        return size + estimate_size(getattr(obj, "_queue", None), sample_items, seen)
+    else:
+        attributes = getattr(obj, "__dict__", None)
+        if attributes is not None:
+            size += estimate_size(attributes, sample_items, seen)
+        for slot in getattr(type(obj), "__slots__", ()):
+            size += estimate_size(getattr(obj, slot, None), sample_items, seen)
+        return size
+
+    sampled = list(itertools.islice(items, sample_items))
+    sampled_size = sum(measure(item) for item in sampled)
+    if sampled and count > len(sampled):
+        sampled_size = sampled_size * count // len(sampled)
+    return size + sampled_size
+
+
+class MemoryMonitor:
+    """Registered in-process structures, their size history and tracemalloc snapshots"""
+
+    def __init__(self, interval_seconds: float = 300.0, history_size: int = 288, growth_samples: int = 6,
+                 sample_items: int = 100, max_snapshots: int = 5):
+        self.interval_seconds = interval_seconds
+        self.growth_samples = growth_samples
+        self.sample_items = sample_items
+        self.max_snapshots = max_snapshots
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self._structures: Dict[str, Tuple[Any, Optional[Callable[[], int]]]] = {}
+        self._snapshots: "Dict[str, Tuple[str, tracemalloc.Snapshot]]" = {}
+        self._snapshot_ids = itertools.count(1)
+        self._task: Optional[asyncio.Task] = None
+
+    def track(self, name: str, obj: Any, count: Optional[Callable[[], int]] = None) -> None:
+        """Register a structure; count defaults to len(obj)"""
+        self._structures[name] = (obj, count)
+
+    def structure_sizes(self) -> Dict[str, Dict[str, int]]:
+        sizes = {}
+        for name, (obj, count) in self._structures.items():
+            for _ in range(3):
+                try:
+                    sizes[name] = {
+                        "entries": count() if count else len(obj),
+                        "estimated_bytes": estimate_size(obj, self.sample_items)
+                    }
+                    break
+                except RuntimeError:
+                    # Mutated by another thread while sampled; measure again
+                    continue
+        return sizes
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "timestamp": datetime.utcnow().isoformat(),
+            "rss_bytes": _rss_bytes(),
+            "gc_objects": len(gc.get_objects()),
+            "gc_counts": gc.get_count(),
+            "structures": self.structure_sizes(),
+            "tracemalloc": self.tracemalloc_status()
+        }
+
+    def sample(self) -> Dict[str, Any]:
+        """Record RSS and structure sizes and log structures that keep growing"""
+        entry = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "rss_bytes": _rss_bytes(),
+            "structures": self.structure_sizes()
+        }
+        self.history.append(entry)
+        for name in self._growing():
+            recent = [sample["structures"][name]["entries"] for sample in self.history if name in sample["structures"]]
+            logger.warning("%s grew in each of the last %s memory samples (%s -> %s entries)",
+                           name, self.growth_samples, recent[-self.growth_samples - 1], recent[-1])
+        rss = entry["rss_bytes"]
+        if rss:
+            logger.info("Memory sample: rss %.1f MiB", rss / 1048576)
+        else:
+            logger.info("Memory sample recorded")
+        return entry
+
+    def _growing(self) -> List[str]:
+        if len(self.history) <= self.growth_samples:
+            return []
+        window = list(self.history)[-self.growth_samples - 1:]
+        growing = []
+        for name in window[-1]["structures"]:
+            sizes = [sample["structures"].get(name, {}).get("estimated_bytes") for sample in window]
+            if None not in sizes and all(later > earlier for earlier, later in zip(sizes, sizes[1:])):
+                growing.append(name)
+        return growing
+
+    def trends(self) -> Dict[str, Any]:
+        """Growth of RSS and each structure between the oldest and newest recorded sample"""
+        if len(self.history) < 2:
+            return {"samples": len(self.history), "interval_seconds": self.interval_seconds, "growth": {}}
+        first, last = self.history[0], self.history[-1]
+        growth = {
+            name: {
+                "entries": size["entries"] - first["structures"][name]["entries"],
+                "estimated_bytes": size["estimated_bytes"] - first["structures"][name]["estimated_bytes"]
+            }
+            for name, size in last["structures"].items() if name in first["structures"]
+        }
+        if first["rss_bytes"] is not None and last["rss_bytes"] is not None:
+            growth["rss_bytes"] = last["rss_bytes"] - first["rss_bytes"]
+        return {
+            "samples": len(self.history),
+            "interval_seconds": self.interval_seconds,
+            "since": first["timestamp"],
+            "growth": growth,
+            "growing": self._growing()
+        }
+
+    async def start(self) -> None:
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error("Error sampling memory: %s", e)
+            await asyncio.sleep(self.interval_seconds)
+
+    # tracemalloc
+
+    def tracemalloc_status(self) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            return {"tracing": False}
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": True,
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_bytes": current,
+            "peak_traced_bytes": peak,
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            "snapshots": [{"id": snapshot_id, "taken_at": taken_at}
+                          for snapshot_id, (taken_at, _) in self._snapshots.items()]
+        }
+
+    def start_tracing(self, frames: int = 1) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            logger.info("tracemalloc started (%s frames)", frames)
+
+    def stop_tracing(self) -> None:
+        """Stop tracing; snapshots are dropped as they cannot be compared with later ones"""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            self._snapshots.clear()
+            logger.info("tracemalloc stopped")
+
+    def _take_snapshot(self) -> "tracemalloc.Snapshot":
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing; start it first")
+        return tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+
+    def take_snapshot(self) -> Dict[str, Any]:
+        """Keep a snapshot for later diffs (the oldest is dropped past max_snapshots)"""
+        snapshot = self._take_snapshot()
+        snapshot_id = str(next(self._snapshot_ids))
+        taken_at = datetime.utcnow().isoformat()
+        self._snapshots[snapshot_id] = (taken_at, snapshot)
+        while len(self._snapshots) > self.max_snapshots:
+            self._snapshots.pop(next(iter(self._snapshots)))
+        return {"id": snapshot_id, "taken_at": taken_at}
+
+    def top_allocators(self, limit: int = 20, group_by: str = "lineno") -> List[Dict[str, Any]]:
+        """Largest live allocations grouped by line, file or traceback"""
+        statistics = self._take_snapshot().statistics(group_by)
+        return [
+            {"location": _format_traceback(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+            for stat in statistics[:limit]
+        ]
+
+    def diff(self, since: str, until: Optional[str] = None, limit: int = 20,
+             group_by: str = "lineno") -> List[Dict[str, Any]]:
+        """Allocation growth between two kept snapshots (until defaults to now), largest first"""
+        if since not in self._snapshots or (until is not None and until not in self._snapshots):
+            raise KeyError(f"Unknown snapshot {since if since not in self._snapshots else until}")
+        newer = self._snapshots[until][1] if until is not None else self._take_snapshot()
+        statistics = newer.compare_to(self._snapshots[since][1], group_by)
+        return [
+            {
+                "location": _format_traceback(stat.traceback),
+                "size_diff_bytes": stat.size_diff,
+                "size_bytes": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count
+            }
+            for stat in statistics[:limit]
+        ]
+
+
+def _format_traceback(traceback: "tracemalloc.Traceback") -> List[str]:
+    return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+
+
+memory_monitor = MemoryMonitor(
+    interval_seconds=float(os.getenv("MEMORY_SAMPLE_INTERVAL", "300")),
+    growth_samples=int(os.getenv("MEMORY_GROWTH_SAMPLES", "6")),
+    sample_items=int(os.getenv("MEMORY_SAMPLE_ITEMS", "100"))
+)
+
+if int(os.getenv("TRACEMALLOC_FRAMES", "0")) > 0:
+    memory_monitor.start_tracing(int(os.getenv("TRACEMALLOC_FRAMES")))
@@ -0,0 +1,292 @@
+"""
+In-process metrics registry with Prometheus text exposition.
+
+Counters, gauges and histograms keep their samples in plain dicts keyed by
+label values, so recording is a lock, a dict lookup and an add. Histograms
+store per-bucket counts and are made cumulative only when rendered.
+
+With several worker processes, set METRICS_MULTIPROC_DIR to a directory
+shared by the workers: each one periodically writes a JSON snapshot of its
+registry there (MetricsSnapshotWriter) and /metrics merges the snapshots of
+all workers. Counters and histograms of workers that exited are kept, so
+totals never go backwards; their gauges are dropped. Empty the directory
+when the server is (re)deployed.
+"""
+
+import asyncio
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = [[list(labels), self._copy(value)] for labels, value in self._values.items()]
+        return {"type": self.type, "help": self.help, "labelnames": list(self.labelnames), "samples": samples}
+
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        return value
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                # Per-bucket counts (last one is +Inf) followed by the sum
+                entry = self._values[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        return list(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**super().snapshot(), "buckets": list(self.buckets)}
+
+
+class MetricsRegistry:
+    """Named metrics of this process"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """Sum the samples of several registry snapshots, metric by metric and label set by label set"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                if metric["type"] == "histogram":
+                    current = target["samples"].get(key)
+                    target["samples"][key] = value if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    target["samples"][key] = target["samples"].get(key, 0.0) + value
+    for metric in merged.values():
+        metric["samples"] = [[list(labels), value] for labels, value in metric["samples"].items()]
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render_text(snapshot: Dict[str, Dict[str, Any]]) -> str:
+    """Prometheus text exposition format (version 0.0.4)"""
+    lines: List[str] = []
+    for name in sorted(snapshot):
+        metric = snapshot[name]
+        labelnames = metric["labelnames"]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for labelvalues, value in sorted(metric["samples"]):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip([*metric["buckets"], math.inf], value[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{name}_bucket{_format_labels(labelnames, labelvalues, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labelnames, labelvalues)} {_format_value(value[-1])}")
+            lines.append(f"{name}_count{_format_labels(labelnames, labelvalues)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsSnapshotWriter:
+    """Shares this worker's registry with the other workers through snapshot files"""
+
+    def __init__(self, registry: MetricsRegistry, directory: Optional[Path], interval_seconds: float = 5.0):
+        self.registry = registry
+        self.directory = Path(directory) if directory else None
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def path(self) -> Optional[Path]:
+        return self.directory / f"metrics-{os.getpid()}.json" if self.directory else None
+
+    async def start(self) -> None:
+        if self.directory is not None and self._task is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self.write()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await asyncio.to_thread(self.write)
+            except Exception as e:
+                logger.error("Error writing metrics snapshot: %s", e)
+
+    def write(self) -> None:
+        if self.path is None:
+            return
+        temporary = self.path.with_suffix(".tmp")
+        temporary.write_text(json.dumps(self.registry.snapshot()))
+        os.replace(temporary, self.path)
+
+    def collect(self) -> Dict[str, Dict[str, Any]]:
+        """Merged snapshot of every worker (this one read live)"""
+        snapshots = [self.registry.snapshot()]
+        if self.directory is not None and self.directory.exists():
+            for path in self.directory.glob("metrics-*.json"):
+                if path == self.path:
+                    continue
+                try:
+                    snapshot = json.loads(path.read_text())
+                except (OSError, ValueError):
+                    continue
+                if not _pid_alive(int(path.stem.split("-", 1)[1])):
+                    snapshot = {name: metric for name, metric in snapshot.items() if metric["type"] != "gauge"}
+                snapshots.append(snapshot)
+        return merge_snapshots(snapshots)
+
+    def render(self) -> str:
+        return render_text(self.collect())
+
+
+registry = MetricsRegistry()
+
+metrics_snapshots = MetricsSnapshotWriter(
+    registry,
+    Path(os.environ["METRICS_MULTIPROC_DIR"]) if os.getenv("METRICS_MULTIPROC_DIR") else None,
+    interval_seconds=float(os.getenv("METRICS_SNAPSHOT_INTERVAL", "5"))
+)
+
+# Metrics recorded across the application
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by method, route template and status code", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template", ("method", "route")
+)
+HTTP_REQUESTS_IN_FLIGHT = registry.gauge("http_requests_in_flight", "HTTP requests being served")
+FMCSA_REQUEST_DURATION = registry.histogram(
+    "fmcsa_request_duration_seconds", "FMCSA carrier lookup latency by outcome", ("outcome",)
+)
+SQLITE_STATEMENT_DURATION = registry.histogram(
+    "sqlite_statement_duration_seconds", "SQLite statement latency by statement and table", ("statement",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+)
+WEBHOOK_EVENTS = registry.counter(
+    "webhook_events_total", "Processed webhook events by event type and result", ("event_type", "result")
+)
+STARTUP_DURATION = registry.gauge(
+    "startup_duration_seconds",
+    "Seconds from process start to import, readiness and first request, and warm-up duration, per worker pid",
+    ("phase", "worker")
+)
+AUTH_REJECTIONS = registry.counter(
+    "auth_rejections_total", "Rejected API requests by key id and reason (invalid_key, forbidden, rate_limited)",
+    ("key", "reason")
+)
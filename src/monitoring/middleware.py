@@ -0,0 +1,75 @@
+"""
+ASGI middleware recording request metrics.
+
+Requests are labelled by route template (e.g. /webhook/events/{event_id}),
+never by raw path, so label cardinality stays bounded; paths that match no
+route are labelled "unmatched". The first completed request also marks the
+time to first request of the startup profile.
+
+ProfilerMiddleware marks the requests selected by an open profiling window
+(see profiler.py); it costs an attribute check while no window is open.
+"""
+
+import time
+from typing import Any, Callable, Dict
+
+from .metrics import HTTP_REQUESTS, HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT
+from .profiler import profiler
+from .startup import startup_profile
+
+
+def _route_template(scope: Dict[str, Any]) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Mounted apps (static files) extend root_path with the mount path
+    if scope.get("endpoint") is not None and scope.get("root_path"):
+        return scope["root_path"]
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Latency histogram, status code counts and in-flight gauge per route"""
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = _route_template(scope)
+            HTTP_REQUEST_DURATION.observe(duration, scope["method"], route)
+            HTTP_REQUESTS.inc(scope["method"], route, status)
+            if startup_profile.first_request_at is None:
+                startup_profile.mark_first_request()
+
+
+class ProfilerMiddleware:
+    """Runs requests selected by the active profiling window in a profiled context"""
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or not profiler.active or not profiler.select(scope["path"], scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+        with profiler.scope():
+            await self.app(scope, receive, send)
@@ -0,0 +1,256 @@
+"""
+Sampling stack profiler for production requests.
+
+A profiling window is opened through /diagnostics/profiler/start. While it
+is open, ProfilerMiddleware selects requests (those sending the profiling
+header, plus a random fraction of the requests whose path starts with the
+window's route prefix) and marks them in a context variable. A background
+thread wakes every PROFILER_INTERVAL_MS, walks the stack of every thread
+with sys._current_frames() and keeps a sample only if the code it is running
+belongs to a selected request: the context of the asyncio callback being run
+(event loop threads) or of the asyncio.to_thread call (thread pool workers)
+is checked for the mark. Background webhook jobs inherit the mark of the
+request that submitted them.
+
+Samples are aggregated as collapsed stacks ("root;caller;callee count"),
+the input format of flamegraph.pl, speedscope and similar tools, and written
+to PROFILER_DIR when the window is stopped or expires. Nothing is sampled
+while no window is open or no selected request is in flight.
+
+Windows are per process: with several workers, only the worker that served
+the start request profiles.
+"""
+
+import asyncio.events
+import concurrent.futures.thread
+import contextvars
+import functools
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_PROFILED: contextvars.ContextVar[bool] = contextvars.ContextVar("profiled", default=False)
+
+# Frames whose locals hold the context the code above them runs in
+_HANDLE_RUN = asyncio.events.Handle._run.__code__
+_WORK_ITEM_RUN = concurrent.futures.thread._WorkItem.run.__code__
+
+_PROFILE_NAME = re.compile(r"^profile-[0-9T]+-\d+\.folded$")
+_CWD = os.getcwd() + os.sep
+
+
+def is_profiled() -> bool:
+    """Whether the current request (or job) was selected for profiling"""
+    return _PROFILED.get()
+
+
+@functools.lru_cache(maxsize=8192)
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(_CWD):
+        filename = filename[len(_CWD):]
+    elif "site-packages" + os.sep in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    else:
+        filename = os.path.basename(filename)
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({filename}:{code.co_firstlineno})"
+
+
+def _frame_context(frame) -> Optional[contextvars.Context]:
+    """Context of an asyncio Handle._run or thread pool _WorkItem.run frame"""
+    owner = frame.f_locals.get("self")
+    if frame.f_code is _HANDLE_RUN:
+        return getattr(owner, "_context", None)
+    # asyncio.to_thread submits functools.partial(context.run, func, ...)
+    bound = getattr(getattr(owner, "fn", None), "func", None)
+    context = getattr(bound, "__self__", None)
+    return context if isinstance(context, contextvars.Context) else None
+
+
+class ProfileWindow:
+    """Selection settings and aggregated stacks of one profiling window"""
+
+    def __init__(self, sample_rate: float, route: Optional[str], duration_seconds: float):
+        self.name = f"profile-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}.folded"
+        self.sample_rate = sample_rate
+        self.route = route
+        self.duration_seconds = duration_seconds
+        self.started_at = datetime.utcnow().isoformat()
+        self.deadline = time.monotonic() + duration_seconds
+        self.selected_requests = 0
+        self.samples = 0
+        self.stacks: Counter = Counter()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "sample_rate": self.sample_rate,
+            "route": self.route,
+            "started_at": self.started_at,
+            "duration_seconds": self.duration_seconds,
+            "remaining_seconds": round(max(0.0, self.deadline - time.monotonic()), 1),
+            "selected_requests": self.selected_requests,
+            "samples": self.samples,
+            "distinct_stacks": len(self.stacks)
+        }
+
+
+class StackProfiler:
+    """Opens profiling windows, selects requests and samples their stacks from a background thread"""
+
+    def __init__(self, directory: Path, interval_seconds: float = 0.01, header: str = "X-Profile",
+                 max_duration_seconds: float = 600.0):
+        self.directory = Path(directory)
+        self.interval_seconds = interval_seconds
+        self.header = header.lower().encode("latin-1")
+        self.max_duration_seconds = max_duration_seconds
+        self._window: Optional[ProfileWindow] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self._window is not None
+
+    def status(self) -> Dict[str, Any]:
+        window = self._window
+        return {"active": window is not None, "window": window.status() if window else None}
+
+    def start(self, sample_rate: float = 1.0, route: Optional[str] = None,
+              duration_seconds: float = 60.0) -> Dict[str, Any]:
+        """Open a window; raises RuntimeError if one is already open"""
+        with self._lock:
+            if self._window is not None:
+                raise RuntimeError(f"Profiling window {self._window.name} is already active")
+            window = ProfileWindow(sample_rate, route, min(duration_seconds, self.max_duration_seconds))
+            self._window = window
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, args=(window, self._stop_event), name="stack-profiler", daemon=True
+            )
+            self._thread.start()
+        logger.info("Profiling window %s started (rate %s, route %s, %ss)",
+                    window.name, sample_rate, route or "*", window.duration_seconds)
+        return window.status()
+
+    def stop(self) -> Optional[Dict[str, Any]]:
+        """Close the active window and write its stacks; None if no window was open"""
+        with self._lock:
+            window, thread = self._window, self._thread
+            if window is None:
+                return None
+            self._window = self._thread = None
+            self._stop_event.set()
+        if thread is not threading.current_thread():
+            thread.join()
+        return self._write(window)
+
+    def select(self, path: str, headers: List) -> bool:
+        """Whether a request should be profiled in the active window"""
+        window = self._window
+        if window is None:
+            return False
+        for name, value in headers:
+            if name == self.header:
+                return value.strip().lower() not in (b"", b"0", b"false")
+        if window.route and not path.startswith(window.route):
+            return False
+        return window.sample_rate >= 1.0 or random.random() < window.sample_rate
+
+    @contextmanager
+    def scope(self) -> Iterator[None]:
+        """Mark the code run in this context as profiled while the block runs"""
+        token = _PROFILED.set(True)
+        with self._lock:
+            self._in_flight += 1
+            if self._window is not None:
+                self._window.selected_requests += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            _PROFILED.reset(token)
+
+    def _run(self, window: ProfileWindow, stop_event: threading.Event) -> None:
+        while not stop_event.wait(self.interval_seconds):
+            if time.monotonic() >= window.deadline:
+                self.stop()
+                return
+            if self._in_flight:
+                try:
+                    self._sample(window)
+                except Exception as e:
+                    logger.error("Error sampling stacks: %s", e)
+
+    def _sample(self, window: ProfileWindow) -> None:
+        own_thread = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            labels = []
+            while frame is not None:
+                code = frame.f_code
+                if code is _HANDLE_RUN or code is _WORK_ITEM_RUN:
+                    context = _frame_context(frame)
+                    if context is not None and context.get(_PROFILED, False) and labels:
+                        labels.append("event-loop" if code is _HANDLE_RUN else "thread-pool")
+                        window.stacks[";".join(reversed(labels))] += 1
+                        window.samples += 1
+                    break
+                labels.append(_frame_label(code))
+                frame = frame.f_back
+
+    def _write(self, window: ProfileWindow) -> Dict[str, Any]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / window.name
+        temporary = path.with_suffix(".tmp")
+        with open(temporary, "w") as out:
+            for stack, count in window.stacks.most_common():
+                out.write(f"{stack} {count}\n")
+        os.replace(temporary, path)
+        logger.info("Profiling window %s stopped: %s samples from %s requests",
+                    window.name, window.samples, window.selected_requests)
+        return {**window.status(), "remaining_seconds": 0.0}
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Written profiles, newest first"""
+        if not self.directory.exists():
+            return []
+        profiles = []
+        for path in self.directory.glob("profile-*.folded"):
+            stat = path.stat()
+            profiles.append({
+                "name": path.name,
+                "size_bytes": stat.st_size,
+                "modified_at": datetime.utcfromtimestamp(stat.st_mtime).isoformat()
+            })
+        return sorted(profiles, key=lambda profile: profile["modified_at"], reverse=True)
+
+    def profile_path(self, name: str) -> Optional[Path]:
+        """Path of a written profile, None for unknown or malformed names"""
+        if not _PROFILE_NAME.match(name):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+
+profiler = StackProfiler(
+    Path(os.getenv("PROFILER_DIR", "profiles")),
+    interval_seconds=float(os.getenv("PROFILER_INTERVAL_MS", "10")) / 1000,
+    header=os.getenv("PROFILER_HEADER", "X-Profile"),
+    max_duration_seconds=float(os.getenv("PROFILER_MAX_DURATION", "600"))
+)
@@ -0,0 +1,182 @@
+"""
+Startup profiling: import time per module, lifespan steps and time to first request.
+
+Times are measured from the start of the process (read from /proc, so the
+interpreter start-up and the imports that precede this module count as
+well). With STARTUP_PROFILE_IMPORTS=1 an import hook times every module
+imported after this one, self and cumulative like python -X importtime.
+Lifespan and warm-up steps are timed with step(); the first completed request
+marks the time to first request. /health reports the summary and
+/diagnostics/startup the whole breakdown.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .metrics import STARTUP_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+def _process_started_at() -> float:
+    """Unix time the process started (boot time plus the process start tick from /proc)"""
+    try:
+        with open("/proc/stat") as f:
+            boot_time = next(float(line.split()[1]) for line in f if line.startswith("btime "))
+        with open("/proc/self/stat") as f:
+            start_ticks = float(f.read().rsplit(")", 1)[1].split()[19])
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return time.time()
+
+
+class _TimedLoader:
+    """Loader proxy recording how long executing the module takes"""
+
+    def __init__(self, loader: Any, timer: "ImportTimer"):
+        self._loader = loader
+        self._timer = timer
+
+    def create_module(self, spec: Any) -> Any:
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module: Any) -> None:
+        with self._timer.timing(module.__name__):
+            self._loader.exec_module(module)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._loader, name)
+
+
+class ImportTimer:
+    """sys.meta_path hook recording (self, cumulative) seconds per imported module"""
+
+    def __init__(self):
+        self.modules: Dict[str, Tuple[float, float]] = {}
+        self._local = threading.local()
+
+    def find_spec(self, fullname: str, path: Any, target: Any = None) -> Any:
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(spec.loader, self)
+            return spec
+        return None
+
+    @contextmanager
+    def timing(self, name: str) -> Iterator[None]:
+        stack = self._local.__dict__.setdefault("stack", [])
+        children = [0.0]
+        stack.append(children)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            stack.pop()
+            if stack:
+                stack[-1][0] += elapsed
+            self.modules[name] = (elapsed - children[0], elapsed)
+
+    def install(self) -> None:
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def slowest(self, top: int) -> List[Dict[str, Any]]:
+        modules = sorted(self.modules.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        return [{"module": name, "self_ms": round(own * 1000, 2), "cumulative_ms": round(total * 1000, 2)}
+                for name, (own, total) in modules]
+
+
+class StartupProfile:
+    """Timeline of this worker's start: steps, readiness, warm-up and first request"""
+
+    def __init__(self, import_timer: Optional[ImportTimer] = None):
+        self.process_started_at = _process_started_at()
+        self._worker = str(os.getpid())
+        self.imported_at: Optional[float] = None
+        self.import_timer = import_timer
+        self.steps: List[Dict[str, Any]] = []
+        self.ready_at: Optional[float] = None
+        self.first_request_at: Optional[float] = None
+        self.warm_up_state = "pending"
+        self.warm_up_seconds: Optional[float] = None
+        if import_timer is not None:
+            import_timer.install()
+
+    def _since_start(self, at: Optional[float]) -> Optional[float]:
+        return round(at - self.process_started_at, 4) if at is not None else None
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        """Time a startup step"""
+        started = time.time()
+        try:
+            yield
+        finally:
+            duration = time.time() - started
+            self.steps.append({"step": name, "started_s": self._since_start(started),
+                               "duration_ms": round(duration * 1000, 2)})
+            logger.debug("Startup step %s took %.1f ms", name, duration * 1000)
+
+    def mark_imported(self) -> None:
+        """The application module is imported and the app configured"""
+        self.imported_at = time.time()
+        STARTUP_DURATION.set(self.imported_at - self.process_started_at, "imported", self._worker)
+
+    def mark_ready(self) -> None:
+        """The lifespan finished: the app accepts requests"""
+        self.ready_at = time.time()
+        STARTUP_DURATION.set(self.ready_at - self.process_started_at, "ready", self._worker)
+        slowest = sorted(self.steps, key=lambda step: step["duration_ms"], reverse=True)[:3]
+        slowest_steps = ", ".join(f"{step['step']} {step['duration_ms']} ms" for step in slowest)
+        logger.info("Ready %ss after process start (imported at %ss; slowest steps: %s)",
+                    self._since_start(self.ready_at), self._since_start(self.imported_at), slowest_steps)
+
+    def mark_first_request(self) -> None:
+        if self.first_request_at is None:
+            self.first_request_at = time.time()
+            STARTUP_DURATION.set(self.first_request_at - self.process_started_at, "first_request", self._worker)
+
+    def mark_warm_up(self, state: str, seconds: Optional[float] = None) -> None:
+        self.warm_up_state = state
+        self.warm_up_seconds = round(seconds, 4) if seconds is not None else None
+        if seconds is not None:
+            STARTUP_DURATION.set(seconds, "warm_up", self._worker)
+
+    def summary(self) -> Dict[str, Any]:
+        """Seconds from process start to readiness and to the first request, and the warm-up state"""
+        return {
+            "ready_seconds": self._since_start(self.ready_at),
+            "time_to_first_request_seconds": self._since_start(self.first_request_at),
+            "warm_up": self.warm_up_state,
+            "warm_up_seconds": self.warm_up_seconds
+        }
+
+    def report(self, top: int = 30) -> Dict[str, Any]:
+        """Summary, steps in order and the slowest imports (when STARTUP_PROFILE_IMPORTS is set)"""
+        return {
+            **self.summary(),
+            "process_started_at": self.process_started_at,
+            "imported_seconds": self._since_start(self.imported_at),
+            "steps": self.steps,
+            "imports": self.import_timer.slowest(top) if self.import_timer is not None else None
+        }
+
+
+startup_profile = StartupProfile(
+    ImportTimer() if os.getenv("STARTUP_PROFILE_IMPORTS", "").lower() in ("1", "true") else None
+)
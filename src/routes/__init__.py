@@ -2,10 +2,16 @@ from .webhook import webhook_router
 from .loads import loads_router  
 from .carriers import carriers_router
 from .dashboard import router as dashboard_router
+from .metrics import router as metrics_router
+from .diagnostics import router as diagnostics_router
+from .responses import FastJSONResponse
 
 __all__ = [
     "webhook_router",
     "loads_router", 
     "carriers_router",
-    "dashboard_router"
+    "dashboard_router",
+    "metrics_router",
+    "diagnostics_router",
+    "FastJSONResponse"
 ] 
\ No newline at end of file
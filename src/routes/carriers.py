@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends
 
-from ..auth import verify_api_key
+from ..auth import ApiKey, verify_voice_agent_key
 from ..services import verify_carrier_mc_number
+from .responses import FastJSONResponse
 
 # Router for carrier verification endpoints
 # Handles MC number validation against FMCSA database
@@ -9,7 +10,7 @@ carriers_router = APIRouter(prefix="/verify-carrier", tags=["carriers"])
 
 
 @carriers_router.get("/{mc_number}")
-async def verify_carrier_get(mc_number: str, api_key: str = Depends(verify_api_key)):
+async def verify_carrier_get(mc_number: str, api_key: ApiKey = Depends(verify_voice_agent_key)):
     """
     Verify carrier MC number using FMCSA API (GET method for voice agents)
     Optimized response for AI voice agents to easily understand and speak
@@ -42,4 +43,4 @@ async def verify_carrier_get(mc_number: str, api_key: str = Depends(verify_api_k
             "next_action": "end_call"  # Terminates conversation for ineligible carriers
         }
     
-    return voice_response 
\ No newline at end of file
+    return FastJSONResponse(voice_response) 
\ No newline at end of file
@@ -1,41 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, AsyncIterator, Optional
+from datetime import datetime
+import asyncio
 import logging
 import os
-import secrets
 
-from ..auth import verify_api_key
-from ..database import get_analytics_summary
+from ..auth import ApiKey, DEFAULT_API_KEY, key_store, verify_dashboard_key, issue_stream_token, verify_stream_token
+from ..database import get_distinct_counts, query_lane_cube
+from ..services.dashboard import build_dashboard_data, dashboard_broadcaster, analytics_summary_cache
+from .responses import FastJSONResponse
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
+# Seconds between keep-alive comments on an idle dashboard stream
+DASHBOARD_STREAM_KEEPALIVE = float(os.getenv("DASHBOARD_STREAM_KEEPALIVE", "15"))
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether If-None-Match lists the (unquoted) etag; quotes and weak prefixes are ignored"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip().removeprefix("W/").strip('"') for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _cached_response(request: Request, etag: str, build_body) -> Response:
+    """304 if the client already has this version, otherwise the body with its ETag (quoted, RFC 9110)"""
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(build_body(), headers=headers)
+
 
 @router.get("/config")
 async def get_dashboard_config() -> Dict[str, Any]:
     """
     Get dashboard configuration
     
-    Returns minimal configuration needed for dashboard to function
-    Uses a temporary session token approach for security
+    Returns minimal configuration needed for dashboard to function. No API
+    key is handed out: the operator enters a dashboard-scoped key, except
+    while the public default key is active (development), which is returned
+    so the dashboard works out of the box.
     """
     try:
-        session_token = secrets.token_urlsafe(32)
-        main_api_key = os.getenv("HAPPYROBOT_API_KEY", "happyrobot-api-key-change-in-production")
+        default_key_active = key_store.default_key_active
         
         return {
-            "api_key": main_api_key,
-            "session_token": session_token,
+            "api_key": DEFAULT_API_KEY if default_key_active else None,
+            "key_required": not default_key_active,
             "environment": "production" if os.getenv("ENVIRONMENT", "development") == "production" else "development"
         }
     except Exception as e:
-        logger.error(f"Error getting dashboard config: {str(e)}")
+        logger.error("Error getting dashboard config: %s", e)
         raise HTTPException(status_code=500, detail="Could not retrieve dashboard configuration")
 
 
 @router.get("/analytics")
-async def get_dashboard_analytics(api_key: str = Depends(verify_api_key)) -> Dict[str, Any]:
+async def get_dashboard_analytics(request: Request, api_key: ApiKey = Depends(verify_dashboard_key)) -> Dict[str, Any]:
     """
     Get analytics data for dashboard visualization
     
@@ -45,73 +69,148 @@ async def get_dashboard_analytics(api_key: str = Depends(verify_api_key)) -> Dic
     - Negotiation metrics and patterns
     - Load performance data
     
-    This endpoint provides the data needed for the bonus dashboard requirement
+    This endpoint provides the data needed for the bonus dashboard requirement.
+    The summary is cached until analytics change; responses carry an ETag and
+    If-None-Match is answered with 304 Not Modified.
     """
     try:
         logger.info("Fetching dashboard analytics data")
         
-        analytics_summary = get_analytics_summary()
-        dashboard_data = {
-            "summary": analytics_summary,
-            "dashboard_metadata": {
-                "last_updated": analytics_summary.get("last_updated"),
-                "data_freshness": "real-time",
-                "dashboard_version": "1.0"
-            },
-            "visualizations": {
-                "call_outcomes": {
-                    "chart_type": "pie",
-                    "title": "Call Outcomes Distribution",
-                    "data": {
-                        "successful": analytics_summary.get("successful_calls", 0),
-                        "total": analytics_summary.get("total_calls", 0),
-                        "success_rate": analytics_summary.get("success_rate", 0)
-                    }
-                },
-                "sentiment_breakdown": {
-                    "chart_type": "bar",
-                    "title": "Carrier Sentiment Analysis",
-                    "data": analytics_summary.get("sentiment_breakdown", {})
-                },
-                "negotiation_metrics": {
-                    "chart_type": "metrics",
-                    "title": "Negotiation Performance",
-                    "data": analytics_summary.get("negotiation_metrics", {})
-                }
-            }
-        }
+        analytics_summary, etag = await analytics_summary_cache.get()
         
-        logger.info(f"Dashboard data retrieved: {analytics_summary.get('total_calls', 0)} calls analyzed")
-        return dashboard_data
+        logger.info("Dashboard data retrieved: %s calls analyzed", analytics_summary.get('total_calls', 0))
+        return _cached_response(request, f"{etag}-analytics", lambda: build_dashboard_data(analytics_summary))
         
     except Exception as e:
-        logger.error(f"Error fetching dashboard analytics: {str(e)}")
+        logger.error("Error fetching dashboard analytics: %s", e)
         raise HTTPException(status_code=500, detail="Failed to retrieve analytics data")
 
 
 @router.get("/status")
-async def get_dashboard_status(api_key: str = Depends(verify_api_key)) -> Dict[str, Any]:
+async def get_dashboard_status(request: Request, api_key: ApiKey = Depends(verify_dashboard_key)) -> Dict[str, Any]:
     """
     Get dashboard system status and health metrics
     
     Provides information about data collection status and system health
+    (cached and ETag-validated like /dashboard/analytics)
     """
     try:
-        analytics_summary = get_analytics_summary()
+        analytics_summary, etag = await analytics_summary_cache.get()
         
-        status_data = {
-            "status": "operational",
-            "analytics_collection": "active",
-            "data_points": {
-                "total_calls": analytics_summary.get("total_calls", 0),
-                "total_negotiations": analytics_summary.get("negotiation_metrics", {}).get("total_negotiations", 0)
-            },
-            "last_activity": analytics_summary.get("last_updated", "No data yet"),
-            "system_health": "healthy"
-        }
+        def build_status() -> Dict[str, Any]:
+            return {
+                "status": "operational",
+                "analytics_collection": "active",
+                "data_points": {
+                    "total_calls": analytics_summary.get("total_calls", 0),
+                    "total_negotiations": analytics_summary.get("negotiation_metrics", {}).get("total_negotiations", 0)
+                },
+                "last_activity": analytics_summary.get("last_updated", "No data yet"),
+                "system_health": "healthy"
+            }
         
-        return status_data
+        return _cached_response(request, f"{etag}-status", build_status)
         
     except Exception as e:
-        logger.error(f"Error getting dashboard status: {str(e)}")
-        raise HTTPException(status_code=500, detail="Dashboard status unavailable") 
\ No newline at end of file
+        logger.error("Error getting dashboard status: %s", e)
+        raise HTTPException(status_code=500, detail="Dashboard status unavailable")
+
+
+@router.get("/unique")
+async def get_dashboard_unique_counts(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    period: str = "day",
+    api_key: ApiKey = Depends(verify_dashboard_key)
+) -> Dict[str, Any]:
+    """
+    Estimated distinct carriers, loads and callers over a range of periods
+    
+    since/until are inclusive buckets: YYYY-MM-DD for period=day, YYYY-MM-DDTHH
+    for period=hour (UTC); both default to the current one. Counts come from
+    merged HyperLogLog buckets (about 1.6% error), not from call_events.
+    """
+    if period not in ("day", "hour"):
+        raise HTTPException(status_code=400, detail="period must be 'day' or 'hour'")
+    
+    current = datetime.utcnow().isoformat()[:10 if period == "day" else 13]
+    since = since or current
+    until = until or current
+    counts = await asyncio.to_thread(get_distinct_counts, since, until, period)
+    return FastJSONResponse({"period": period, "since": since, "until": until, "unique_counts": counts})
+
+
+@router.get("/lanes")
+async def get_dashboard_lanes(
+    origin_state: Optional[str] = None,
+    destination_state: Optional[str] = None,
+    equipment_type: Optional[str] = None,
+    outcome: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    group_by: str = "origin_state,destination_state,equipment_type",
+    sort: str = "calls",
+    limit: int = 10,
+    api_key: ApiKey = Depends(verify_dashboard_key)
+) -> Dict[str, Any]:
+    """
+    Lane drill-down from the pre-aggregated lane cube
+    
+    Filter on any dimension and a day range (YYYY-MM-DD, inclusive), group by a
+    comma-separated list of dimensions (empty for totals only) and get the top
+    groups by a measure, e.g. sort=conversion_rate or sort=premium_paid to see
+    which lanes convert and which pay the most over posted rates.
+    """
+    filters = {
+        "origin_state": origin_state.upper() if origin_state else None,
+        "destination_state": destination_state.upper() if destination_state else None,
+        "equipment_type": equipment_type.strip().lower() if equipment_type else None,
+        "outcome": outcome
+    }
+    dimensions = [dimension.strip() for dimension in group_by.split(",") if dimension.strip()]
+    try:
+        result = await asyncio.to_thread(
+            query_lane_cube, filters, since, until, dimensions, sort, max(1, min(limit, 500))
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse({"group_by": dimensions, "sort": sort, **result})
+
+
+@router.get("/stream-token")
+async def get_dashboard_stream_token(api_key: ApiKey = Depends(verify_dashboard_key)) -> Dict[str, Any]:
+    """
+    Issue a short-lived token for the dashboard stream
+    
+    EventSource cannot send an Authorization header, so the stream is
+    authenticated with this token in the query string instead of the API key
+    """
+    return {"token": issue_stream_token()}
+
+
+@router.get("/stream")
+async def stream_dashboard_analytics(request: Request, token: str = Depends(verify_stream_token)):
+    """
+    Server-Sent Events stream of dashboard analytics
+    
+    Sends a "snapshot" event with the full dashboard data on connect, then
+    "delta" events with only the changed fields whenever analytics are written
+    (coalesced per broadcaster tick). Keep-alive comments are sent while idle.
+    """
+    queue = await dashboard_broadcaster.subscribe()
+    
+    async def events() -> AsyncIterator[bytes]:
+        try:
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=DASHBOARD_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+        finally:
+            dashboard_broadcaster.unsubscribe(queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,154 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from typing import Dict, Any, Optional
+import asyncio
+
+from ..auth import ApiKey, verify_dashboard_key
+from ..monitoring import profiler, memory_monitor, startup_profile
+
+router = APIRouter(prefix="/diagnostics", tags=["monitoring"])
+
+
+@router.post("/profiler/start")
+async def start_profiler(
+    sample_rate: float = Query(1.0, ge=0.0, le=1.0),
+    route: Optional[str] = None,
+    duration: float = Query(60.0, gt=0),
+    api_key: ApiKey = Depends(verify_dashboard_key)
+) -> Dict[str, Any]:
+    """
+    Open a profiling window on this worker
+
+    Requests sending the profiling header (PROFILER_HEADER, default X-Profile: 1)
+    are always profiled; of the others, a sample_rate fraction of those whose
+    path starts with route (all routes if omitted) is. The window closes after
+    duration seconds (capped by PROFILER_MAX_DURATION) or on /stop.
+    """
+    try:
+        return profiler.start(sample_rate, route, duration)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/profiler/stop")
+async def stop_profiler(api_key: ApiKey = Depends(verify_dashboard_key)) -> Dict[str, Any]:
+    """Close the profiling window and write its collapsed stacks"""
+    window = await asyncio.to_thread(profiler.stop)
+    if window is None:
+        raise HTTPException(status_code=409, detail="No profiling window is active")
+    return window
+
+
+@router.get("/profiler/status")
+async def get_profiler_status(api_key: ApiKey = Depends(verify_dashboard_key)) -> Dict[str, Any]:
+    """Active profiling window, if any, with its sample counts so far"""
+    return profiler.status()
+
+
+@router.get("/profiler/profiles")
+async def list_profiles(api_key: ApiKey = Depends(verify_dashboard_key)) -> Dict[str, Any]:
+    """Profiles written by finished windows, newest first"""
+    return {"profiles": await asyncio.to_thread(profiler.list_profiles)}
+
+
+@router.get("/profiler/profiles/{name}")
+async def download_profile(name: str, api_key: ApiKey = Depends(verify_dashboard_key)) -> FileResponse:
+    """Collapsed stacks of a window, one "frame;frame;frame count" line per stack (flamegraph.pl input)"""
+    path = profiler.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile {name} not found")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=name)
+
+
+@router.get("/memory")
+async def get_memory_report(api_key: ApiKey = Depends(verify_dashboard_key)) -> Dict[str, Any]:
+    """
+    Memory accounting of this worker
+
+    RSS, live object count, entries and estimated size of the registered
+    in-process structures (inventory, session stores, caches, queues), their
+    growth since the oldest background sample, and the tracemalloc status.
+    """
+    return {**memory_monitor.report(), "trends": memory_monitor.trends()}
+
+
+@router.get("/memory/history")
+async def get_memory_history(api_key: ApiKey = Depends(verify_dashboard_key)) -> Dict[str, Any]:
+    """Samples recorded every MEMORY_SAMPLE_INTERVAL seconds, oldest first"""
+    return {"interval_seconds": memory_monitor.interval_seconds, "samples": list(memory_monitor.history)}
+
+
+@router.post("/memory/tracemalloc/start")
+async def start_tracemalloc(frames: int = Query(1, ge=1, le=64),
+                            api_key: ApiKey = Depends(verify_dashboard_key)) -> Dict[str, Any]:
+    """Start tracing allocations (slows allocation-heavy code while on), keeping frames per traceback"""
+    memory_monitor.start_tracing(frames)
+    return memory_monitor.tracemalloc_status()
+
+
+@router.post("/memory/tracemalloc/stop")
+async def stop_tracemalloc(api_key: ApiKey = Depends(verify_dashboard_key)) -> Dict[str, Any]:
+    """Stop tracing allocations and drop the kept snapshots"""
+    memory_monitor.stop_tracing()
+    return memory_monitor.tracemalloc_status()
+
+
+@router.get("/memory/top")
+async def get_top_allocators(
+    limit: int = Query(20, ge=1, le=500),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    api_key: ApiKey = Depends(verify_dashboard_key)
+) -> Dict[str, Any]:
+    """Largest live allocations since tracing started, grouped by line, file or traceback"""
+    try:
+        allocators = await asyncio.to_thread(memory_monitor.top_allocators, limit, group_by)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"group_by": group_by, "allocators": allocators}
+
+
+@router.post("/memory/snapshots")
+async def take_memory_snapshot(api_key: ApiKey = Depends(verify_dashboard_key)) -> Dict[str, Any]:
+    """Keep a tracemalloc snapshot to diff against later"""
+    try:
+        return await asyncio.to_thread(memory_monitor.take_snapshot)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/memory/diff")
+async def get_memory_diff(
+    since: str,
+    until: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=500),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    api_key: ApiKey = Depends(verify_dashboard_key)
+) -> Dict[str, Any]:
+    """
+    Allocation growth between two snapshots
+
+    since and until are snapshot ids from /memory/snapshots; until defaults to
+    a snapshot taken now. Locations are sorted by size growth, largest first.
+    """
+    try:
+        allocators = await asyncio.to_thread(memory_monitor.diff, since, until, limit, group_by)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"since": since, "until": until or "now", "group_by": group_by, "allocators": allocators}
+
+
+@router.get("/startup")
+async def get_startup_profile(
+    top: int = Query(30, ge=1, le=500),
+    api_key: ApiKey = Depends(verify_dashboard_key)
+) -> Dict[str, Any]:
+    """
+    Startup timeline of this worker
+
+    Seconds from process start to import, readiness and first request, each
+    lifespan and warm-up step, and the top slowest module imports when started
+    with STARTUP_PROFILE_IMPORTS=1.
+    """
+    return startup_profile.report(top)
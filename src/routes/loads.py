@@ -1,11 +1,11 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import Optional
 import logging
 
 from ..models import LoadData
-from ..auth import verify_api_key
-from ..services import search_loads_by_criteria
-from ..database import loads_db
+from ..auth import ApiKey, verify_voice_agent_key
+from ..services import search_loads_by_criteria, get_load_by_id
+from .responses import FastJSONResponse, VOICE_LOADS_RESPONSE_ADAPTER
 
 logger = logging.getLogger(__name__)
 
@@ -18,21 +18,23 @@ async def get_loads_for_voice_agent(
     destination: Optional[str] = None,
     equipment_type: Optional[str] = None,
     limit: Optional[int] = 3,
-    api_key: str = Depends(verify_api_key)
+    sort_by: Optional[str] = Query(None, pattern="^(pickup_datetime|loadboard_rate|rate_per_mile)$"),
+    api_key: ApiKey = Depends(verify_voice_agent_key)
 ):
     """
     Get loads optimized for AI voice agents
-    Returns easy-to-speak load summaries
+    Returns easy-to-speak load summaries, in inventory order or by sort_by
+    (soonest pickup, highest rate or highest rate per mile first)
     """
-    loads = search_loads_by_criteria(origin, destination, equipment_type)
+    loads = search_loads_by_criteria(origin, destination, equipment_type, sort_by)
     
     if not loads:
-        return {
+        return FastJSONResponse({
             "available": False,
             "count": 0,
             "voice_message": f"Sorry, I don't have any loads available right now{' from ' + origin if origin else ''}{' to ' + destination if destination else ''}{' for ' + equipment_type if equipment_type else ''}.",
             "loads": []
-        }
+        }, adapter=VOICE_LOADS_RESPONSE_ADAPTER)
     
     # Limit results for voice agent (don't overwhelm the caller)
     limited_loads = loads[:limit] if limit else loads
@@ -58,20 +60,20 @@ async def get_loads_for_voice_agent(
     else:
         voice_message = f"I have {len(loads)} loads total. Here are the top {limit}: " + "; ".join([load['voice_summary'] for load in voice_loads])
     
-    return {
+    return FastJSONResponse({
         "available": True,
         "count": len(loads),
         "showing": len(voice_loads),
         "voice_message": voice_message,
         "loads": voice_loads,
         "next_action": "carrier_response"
-    }
+    }, adapter=VOICE_LOADS_RESPONSE_ADAPTER)
 
 
 @loads_router.get("/{load_id}/for-voice-agent")
-async def get_load_details_for_voice_agent(load_id: str, api_key: str = Depends(verify_api_key)):
+async def get_load_details_for_voice_agent(load_id: str, api_key: ApiKey = Depends(verify_voice_agent_key)):
     """Get specific load details optimized for voice agents"""
-    load = next((load for load in loads_db if load.load_id == load_id), None)
+    load = get_load_by_id(load_id)
     if not load:
         return {
             "found": False,
@@ -92,7 +94,7 @@ async def get_load_details_for_voice_agent(load_id: str, api_key: str = Depends(
     if load.notes:
         details += f"Special notes: {load.notes}"
     
-    return {
+    return FastJSONResponse({
         "found": True,
         "load_id": load.load_id,
         "rate": load.loadboard_rate,
@@ -100,5 +102,5 @@ async def get_load_details_for_voice_agent(load_id: str, api_key: str = Depends(
         "equipment_type": load.equipment_type,
         "voice_message": details,
         "next_action": "carrier_decision",
-        "full_details": load.dict()
-    } 
\ No newline at end of file
+        "full_details": load  # Serialized directly from the model
+    }) 
\ No newline at end of file
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+import asyncio
+
+from ..auth import ApiKey, verify_dashboard_key
+from ..monitoring import metrics_snapshots
+
+router = APIRouter(tags=["monitoring"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(api_key: ApiKey = Depends(verify_dashboard_key)) -> PlainTextResponse:
+    """
+    Prometheus metrics of all workers
+    
+    Request latency and status codes per route, in-flight requests, FMCSA
+    lookup latency, SQLite statement latency and webhook events per type.
+    """
+    body = await asyncio.to_thread(metrics_snapshots.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
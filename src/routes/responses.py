@@ -0,0 +1,75 @@
+"""
+Fast JSON responses for hot routes.
+
+Returning a plain dict from a route makes FastAPI walk it with
+jsonable_encoder and then serialize it again with the stdlib json module.
+FastJSONResponse serializes in a single pass in pydantic-core (Rust), which
+handles pydantic models, datetimes and nested containers natively. Routes that
+return it directly skip jsonable_encoder; response shapes use TypeAdapters
+built once at import time.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from typing_extensions import TypedDict
+
+from fastapi.responses import JSONResponse
+from pydantic import ConfigDict, TypeAdapter
+
+
+class WebhookResponse(TypedDict, total=False):
+    __pydantic_config__ = ConfigDict(extra="allow")  # type: ignore[misc]
+
+    event_id: str
+    received_at: str
+    event_type: str
+    status: str
+    message: str
+    status_url: str
+    analytics: Dict[str, Any]
+
+
+class WebhookBatchResponse(TypedDict):
+    __pydantic_config__ = ConfigDict(extra="allow")  # type: ignore[misc]
+
+    summary: Dict[str, int]
+    results: List[Dict[str, Any]]
+
+
+class VoiceLoadSummary(TypedDict):
+    load_id: str
+    route: str
+    rate: float
+    equipment: str
+    miles: Optional[float]
+    voice_summary: str
+
+
+class VoiceLoadsResponse(TypedDict, total=False):
+    __pydantic_config__ = ConfigDict(extra="allow")  # type: ignore[misc]
+
+    available: bool
+    count: int
+    showing: int
+    voice_message: str
+    loads: List[VoiceLoadSummary]
+    next_action: str
+
+
+# Precompiled serializers for the response shapes of hot routes
+_ANY_ADAPTER = TypeAdapter(Any)
+WEBHOOK_RESPONSE_ADAPTER = TypeAdapter(WebhookResponse)
+WEBHOOK_BATCH_RESPONSE_ADAPTER = TypeAdapter(WebhookBatchResponse)
+VOICE_LOADS_RESPONSE_ADAPTER = TypeAdapter(VoiceLoadsResponse)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response serialized by pydantic-core, optionally with a precompiled shape adapter"""
+
+    def __init__(self, content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None,
+                 adapter: Optional[TypeAdapter] = None, **kwargs):
+        self._adapter = adapter or _ANY_ADAPTER
+        super().__init__(content, status_code=status_code, headers=headers, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return self._adapter.dump_json(content)
@@ -1,12 +1,26 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Request, status
+from pydantic import ValidationError
 from uuid import uuid4
 from datetime import datetime
+import json
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple, List, Union, AsyncIterator
 
-from ..models import WebhookPayload
-from ..auth import verify_api_key
-from ..handlers import process_webhook_event
+from ..models import WebhookPayload, WebhookEvent, webhook_event_adapter
+from ..auth import ApiKey, verify_webhook_key
+from ..handlers import (
+    process_webhook_event,
+    log_webhook_event,
+    webhook_worker_pool,
+    idempotency_index,
+    build_idempotency_key,
+    process_webhook_batch,
+    build_processed_response,
+    BatchTooLarge
+)
+from ..database import get_webhook_job
+from ..monitoring import bind_correlation_id
+from .responses import FastJSONResponse, WEBHOOK_RESPONSE_ADAPTER, WEBHOOK_BATCH_RESPONSE_ADAPTER
 
 logger = logging.getLogger(__name__)
 
@@ -17,30 +31,128 @@ webhook_router = APIRouter(prefix="/webhook", tags=["webhooks"])
 
 @webhook_router.post("/carrier-engagement")
 async def handle_carrier_engagement(
-    payload: WebhookPayload,
-    api_key: str = Depends(verify_api_key)
+    payload: WebhookEvent,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    api_key: ApiKey = Depends(verify_webhook_key)
 ):
     """
     Handle carrier engagement webhook events from HappyRobot platform.
     
     Processes call events and extracts analytics including offer data, 
-    outcome classification, and sentiment analysis.
+    outcome classification, and sentiment analysis. Non-interactive events
+    (call_ended by default) are acknowledged with 202 and processed in the background.
+    
+    Platform retries are deduplicated by idempotency key (Idempotency-Key header,
+    or call_id + event_type + timestamp) and get the original response back.
     """
     # Generate unique event ID for tracking and correlation
     event_id = str(uuid4())
     
-    logger.info(f"Received webhook event: {payload.event_type}")
+    # Everything logged while handling the event carries its id
+    with bind_correlation_id(event_id):
+        logger.info("Received webhook event: %s", payload.event_type)
+        
+        async def process_event() -> Tuple[int, Dict[str, Any]]:
+            received_at = datetime.utcnow().isoformat()
+            log_webhook_event(event_id, payload, received_at)
+            
+            if webhook_worker_pool.is_async_event(payload.event_type):
+                if not await webhook_worker_pool.submit(event_id, payload):
+                    raise HTTPException(
+                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        detail="Webhook queue is full, retry later",
+                        headers={"Retry-After": "5"}
+                    )
+                
+                return status.HTTP_202_ACCEPTED, {
+                    "event_id": event_id,
+                    "received_at": received_at,
+                    "event_type": payload.event_type,
+                    "status": "accepted",
+                    "message": "Event queued for processing",
+                    "status_url": f"/webhook/events/{event_id}"
+                }
+            
+            analytics_result = await process_webhook_event(payload, event_id=event_id, received_at=received_at)
+            
+            return status.HTTP_200_OK, build_processed_response(event_id, payload, analytics_result)
+        
+        key = build_idempotency_key(payload, idempotency_key)
+        status_code, body, replayed = await idempotency_index.run(key, event_id, process_event)
+        
+        headers = {"Idempotent-Replay": "true"} if replayed else None
+        return FastJSONResponse(body, status_code=status_code, headers=headers, adapter=WEBHOOK_RESPONSE_ADAPTER)
+
+@webhook_router.post("/carrier-engagement/batch")
+async def handle_carrier_engagement_batch(request: Request, api_key: ApiKey = Depends(verify_webhook_key)):
+    """
+    Handle a batch of carrier engagement webhook events.
     
-    analytics_result = await process_webhook_event(payload)
+    Accepts a JSON array of events, or NDJSON (Content-Type: application/x-ndjson)
+    which is parsed as it streams in. Events are processed in order per call_id,
+    independent calls run concurrently, and all writes are committed in one
+    transaction. Returns a result for each event in input order.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        events = _iter_ndjson_events(request)
+    else:
+        try:
+            body = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Batch body must be a JSON array or NDJSON")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="Batch body must be a JSON array or NDJSON")
+        events = _iter_json_events(body)
     
-    return {
-        "event_id": event_id,
-        "received_at": datetime.utcnow().isoformat(),
-        "event_type": payload.event_type,
-        "status": "processed",
-        "message": "Call analytics extracted: offer data, outcome classification, and sentiment analysis",
-        "analytics": analytics_result  # Complete analytics breakdown
-    }
+    try:
+        return FastJSONResponse(await process_webhook_batch(events), adapter=WEBHOOK_BATCH_RESPONSE_ADAPTER)
+    except BatchTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+
+
+def _validate_event(raw: Any) -> Union[WebhookPayload, str]:
+    """Validate one batch event, returning the error message if it is invalid"""
+    try:
+        return webhook_event_adapter.validate_python(raw)
+    except ValidationError as e:
+        return str(e)
+
+
+async def _iter_json_events(body: List[Any]) -> AsyncIterator[Tuple[int, Union[WebhookPayload, str]]]:
+    for index, raw in enumerate(body):
+        yield index, _validate_event(raw)
+
+
+async def _iter_ndjson_events(request: Request) -> AsyncIterator[Tuple[int, Union[WebhookPayload, str]]]:
+    index = 0
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield index, _parse_ndjson_line(line)
+                index += 1
+    if buffer.strip():
+        yield index, _parse_ndjson_line(buffer)
+
+
+def _parse_ndjson_line(line: bytes) -> Union[WebhookPayload, str]:
+    # Parse and validate in one pass in pydantic-core
+    try:
+        return webhook_event_adapter.validate_json(line)
+    except ValidationError as e:
+        return str(e)
+
+
+@webhook_router.get("/events/{event_id}")
+async def get_webhook_event_status(event_id: str, api_key: ApiKey = Depends(verify_webhook_key)):
+    """Look up processing status and result of a webhook event accepted for background processing"""
+    job = get_webhook_job(event_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Webhook event {event_id} not found")
+    return FastJSONResponse(job)
 
 @webhook_router.get("/health")
 async def webhook_health():
@@ -1,11 +1,32 @@
-from .fmcsa import verify_carrier_mc_number
-from .load_service import search_loads_by_criteria
+from .fmcsa import verify_carrier_mc_number, get_fmcsa_client, close_fmcsa_client
+from .load_service import search_loads_by_criteria, get_load_by_id
 from .analytics import extract_call_analytics
 from .startup import initialize_sample_data
+from .pricing import lane_rate_index, LaneRateIndex
+from .negotiation_sessions import negotiation_sessions, NegotiationSessionStore
+from .sentiment import sentiment_trackers, SentimentTracker, SentimentTrackerStore
+from .dashboard import dashboard_broadcaster, DashboardBroadcaster, analytics_summary_cache, AnalyticsSummaryCache
+from .warmup import warm_up, WarmUp
 
 __all__ = [
     "verify_carrier_mc_number", 
+    "get_fmcsa_client",
+    "close_fmcsa_client",
     "search_loads_by_criteria",
+    "get_load_by_id",
     "extract_call_analytics",
-    "initialize_sample_data"
+    "initialize_sample_data",
+    "lane_rate_index",
+    "LaneRateIndex",
+    "negotiation_sessions",
+    "NegotiationSessionStore",
+    "sentiment_trackers",
+    "SentimentTracker",
+    "SentimentTrackerStore",
+    "dashboard_broadcaster",
+    "DashboardBroadcaster",
+    "analytics_summary_cache",
+    "AnalyticsSummaryCache",
+    "warm_up",
+    "WarmUp"
 ] 
\ No newline at end of file
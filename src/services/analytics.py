@@ -2,8 +2,91 @@ from typing import Dict, Any, List, Optional
 from datetime import datetime
 import logging
 
+import numpy as np
+
+from .sentiment import SentimentTracker
+
 logger = logging.getLogger(__name__)
 
+# Version of the classification rules; stored with each analysis and bumped when a rule changes
+ANALYSIS_VERSION = "1.0"
+
+# Scalar call data fields read by the outcome and sentiment rules (stored for rescoring)
+CALL_FEATURE_FIELDS = (
+    "outcome",
+    "duration",
+    "call_duration_seconds",
+    "carrier_interested",
+    "agreement_reached",
+    "negotiation_occurred",
+    "multiple_loads_discussed",
+    "questions_asked",
+    "carrier_sentiment",
+    "carrier_requested_callback",
+    "negotiation_rounds"
+)
+
+# Classification rules. classify_call_outcome and classify_carrier_sentiment below and the
+# vectorized batch rescoring in reclassify.py are both driven by these tables, so a rule
+# changed here applies to both.
+
+# Outcome values in priority order: (outcome values, primary_outcome, confidence, outcome_details)
+OUTCOME_RULES = (
+    (("load_assigned", "deal_closed"), "success", 0.95, {"deal_closed": True, "transfer_completed": True}),
+    (("agreement_reached",), "success", 0.90, {"deal_closed": True, "awaiting_transfer": True}),
+    (("agreement_transfer_failed",), "partial_success", 0.85,
+     {"deal_closed": True, "transfer_failed": True, "follow_up_required": True, "failure_type": "operational"}),
+    (("transferred_to_sales", "sales_transfer"), "success", 0.95,
+     {"deal_closed": True, "transfer_completed": True, "transfer_reason": "qualified_lead"}),
+    (("carrier_not_eligible", "verification_failed"), "unqualified", 0.85,
+     {"rejection_reason": "carrier_verification_failed"}),
+    (("carrier_not_interested", "no_interest"), "no_interest", 0.80, {"rejection_reason": "carrier_declined_loads"}),
+)
+
+# Otherwise, calls shorter than this (duration, else call_duration_seconds) are abandoned
+ABANDONED_CALL_SECONDS = 30
+ABANDONED_OUTCOME = ("abandoned", 0.80, {"abandonment_reason": "short_call"})
+# Otherwise, interested carriers without an agreement are leads
+QUALIFIED_LEAD_OUTCOME = ("qualified_lead", 0.75, {"follow_up_needed": True})
+
+# Otherwise analyze_conversation_patterns: (field, above, likely_outcome, confidence), first match wins
+CONVERSATION_RULES = (
+    ("questions_asked", 3, "qualified_lead", 0.7),
+    ("call_duration_seconds", 180, "interested", 0.6),
+)
+CONVERSATION_FALLBACK = ("failed", 0.6)
+
+# Flags of the call data and the secondary outcome each one adds
+SECONDARY_OUTCOMES = (
+    ("negotiation_occurred", "negotiation_attempted"),
+    ("multiple_loads_discussed", "multiple_opportunities"),
+)
+
+# Sentiment scores; on a tie the first listed wins
+SENTIMENTS = ("positive", "neutral", "negative", "interested", "frustrated")
+
+# Explicit carrier_sentiment values and the scores they add
+EXPLICIT_SENTIMENT_RULES = (
+    (("positive", "interested", "enthusiastic"), (("positive", 0.8), ("interested", 0.7))),
+    (("negative", "frustrated", "angry"), (("negative", 0.8), ("frustrated", 0.7))),
+    (("neutral", "indifferent"), (("neutral", 0.6),)),
+)
+
+# Call data signals in scoring order: (field, condition, sentiment, weight). condition is None
+# for a flag (its truthiness), else a test of the numeric value (missing counts as 0); weight
+# is a score or a function of the value. Tests and weights take a number here and a NumPy
+# column in reclassify.py, so they only use operators and NumPy functions.
+SENTIMENT_SIGNALS = (
+    ("questions_asked", lambda value: value > 3, "interested", 0.6),
+    ("negotiation_occurred", None, "interested", 0.5),
+    ("call_duration_seconds", lambda value: value < 60, "negative", 0.4),
+    ("carrier_requested_callback", None, "positive", 0.6),
+    ("call_duration_seconds", lambda value: value > 300, "interested",
+     lambda value: np.minimum(0.5, (value - 300) / 600)),
+    ("negotiation_rounds", lambda value: value > 0, "interested", lambda value: np.minimum(0.4, value * 0.1)),
+    ("negotiation_rounds", lambda value: value > 5, "frustrated", 0.3),
+)
+
 
 def extract_offer_data(call_data: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -78,121 +161,59 @@ def classify_call_outcome(call_data: Dict[str, Any]) -> Dict[str, Any]:
     }
     
     outcome = call_data.get("outcome", "").lower()
-    
-    if outcome in ["load_assigned", "deal_closed"]:
-        outcome_data["primary_outcome"] = "success"
-        outcome_data["outcome_confidence"] = 0.95
-        outcome_data["outcome_details"]["deal_closed"] = True
-        outcome_data["outcome_details"]["transfer_completed"] = True
-        
-    elif outcome in ["agreement_reached"]:
-        outcome_data["primary_outcome"] = "success"
-        outcome_data["outcome_confidence"] = 0.90
-        outcome_data["outcome_details"]["deal_closed"] = True
-        outcome_data["outcome_details"]["awaiting_transfer"] = True
-        
-    elif outcome in ["agreement_transfer_failed"]:
-        outcome_data["primary_outcome"] = "partial_success"
-        outcome_data["outcome_confidence"] = 0.85
-        outcome_data["outcome_details"]["deal_closed"] = True
-        outcome_data["outcome_details"]["transfer_failed"] = True
-        outcome_data["outcome_details"]["follow_up_required"] = True
-        outcome_data["outcome_details"]["failure_type"] = "operational"
-        
-    elif outcome in ["transferred_to_sales", "sales_transfer"]:
-        outcome_data["primary_outcome"] = "success"
-        outcome_data["outcome_confidence"] = 0.95
-        outcome_data["outcome_details"]["deal_closed"] = True
-        outcome_data["outcome_details"]["transfer_completed"] = True
-        outcome_data["outcome_details"]["transfer_reason"] = "qualified_lead"
-        
-    elif outcome in ["carrier_not_eligible", "verification_failed"]:
-        outcome_data["primary_outcome"] = "unqualified"
-        outcome_data["outcome_confidence"] = 0.85
-        outcome_data["outcome_details"]["rejection_reason"] = "carrier_verification_failed"
-        
-    elif outcome in ["carrier_not_interested", "no_interest"]:
-        outcome_data["primary_outcome"] = "no_interest"
-        outcome_data["outcome_confidence"] = 0.80
-        outcome_data["outcome_details"]["rejection_reason"] = "carrier_declined_loads"
-        
-    elif call_data.get("duration", call_data.get("call_duration_seconds", 0)) < 30:
-        outcome_data["primary_outcome"] = "abandoned"
-        outcome_data["outcome_confidence"] = 0.80
-        outcome_data["outcome_details"]["abandonment_reason"] = "short_call"
-        
-    elif call_data.get("carrier_interested") and not call_data.get("agreement_reached"):
-        outcome_data["primary_outcome"] = "qualified_lead"
-        outcome_data["outcome_confidence"] = 0.75
-        outcome_data["outcome_details"]["follow_up_needed"] = True
-        
+    rule = next((rule[1:] for rule in OUTCOME_RULES if outcome in rule[0]), None)
+    if rule is None:
+        if call_data.get("duration", call_data.get("call_duration_seconds", 0)) < ABANDONED_CALL_SECONDS:
+            rule = ABANDONED_OUTCOME
+        elif call_data.get("carrier_interested") and not call_data.get("agreement_reached"):
+            rule = QUALIFIED_LEAD_OUTCOME
+    
+    if rule is not None:
+        primary_outcome, confidence, details = rule
+        outcome_data["primary_outcome"] = primary_outcome
+        outcome_data["outcome_confidence"] = confidence
+        outcome_data["outcome_details"] = dict(details)
     else:
         conversation_analysis = analyze_conversation_patterns(call_data)
         outcome_data["primary_outcome"] = conversation_analysis["likely_outcome"]
         outcome_data["outcome_confidence"] = conversation_analysis["confidence"]
         outcome_data["outcome_details"] = conversation_analysis["details"]
     
-    if call_data.get("negotiation_occurred"):
-        outcome_data["secondary_outcomes"].append("negotiation_attempted")
-    
-    if call_data.get("multiple_loads_discussed"):
-        outcome_data["secondary_outcomes"].append("multiple_opportunities")
+    for field, secondary_outcome in SECONDARY_OUTCOMES:
+        if call_data.get(field):
+            outcome_data["secondary_outcomes"].append(secondary_outcome)
     
     return outcome_data
 
 
-def classify_carrier_sentiment(call_data: Dict[str, Any]) -> Dict[str, Any]:
+def classify_carrier_sentiment(call_data: Dict[str, Any], tracker: Optional[SentimentTracker] = None) -> Dict[str, Any]:
     """
     Analyze carrier sentiment for sales team insights and follow-up prioritization.
+    
+    tracker carries the sentiment progression of events received earlier in the call.
     """
     sentiment_data = {
         "classified_at": datetime.utcnow().isoformat(),
         "overall_sentiment": "neutral",
         "sentiment_confidence": 0.0,
-        "sentiment_progression": [],
+        "sentiment_progression": {},
         "sentiment_details": {}
     }
     
-    sentiment_scores = {
-        "positive": 0,
-        "neutral": 0,
-        "negative": 0,
-        "interested": 0,
-        "frustrated": 0
-    }
+    sentiment_scores = dict.fromkeys(SENTIMENTS, 0)
     
     if call_data.get("carrier_sentiment"):
         explicit_sentiment = call_data["carrier_sentiment"].lower()
-        if explicit_sentiment in ["positive", "interested", "enthusiastic"]:
-            sentiment_scores["positive"] += 0.8
-            sentiment_scores["interested"] += 0.7
-        elif explicit_sentiment in ["negative", "frustrated", "angry"]:
-            sentiment_scores["negative"] += 0.8
-            sentiment_scores["frustrated"] += 0.7
-        elif explicit_sentiment in ["neutral", "indifferent"]:
-            sentiment_scores["neutral"] += 0.6
-    
-    if call_data.get("questions_asked", 0) > 3:
-        sentiment_scores["interested"] += 0.6
-    
-    if call_data.get("negotiation_occurred"):
-        sentiment_scores["interested"] += 0.5
-    
-    if call_data.get("call_duration_seconds", 0) < 60:
-        sentiment_scores["negative"] += 0.4
+        for values, scores in EXPLICIT_SENTIMENT_RULES:
+            if explicit_sentiment in values:
+                for sentiment, score in scores:
+                    sentiment_scores[sentiment] += score
+                break
     
-    if call_data.get("carrier_requested_callback"):
-        sentiment_scores["positive"] += 0.6
-    
-    if call_data.get("call_duration_seconds", 0) > 300:
-        engagement_score = min(0.5, (call_data["call_duration_seconds"] - 300) / 600)
-        sentiment_scores["interested"] += engagement_score
-    
-    negotiation_rounds = call_data.get("negotiation_rounds", 0)
-    if negotiation_rounds > 0:
-        sentiment_scores["interested"] += min(0.4, negotiation_rounds * 0.1)
-        if negotiation_rounds > 5:
-            sentiment_scores["frustrated"] += 0.3
+    for field, condition, sentiment, weight in SENTIMENT_SIGNALS:
+        value = call_data.get(field, 0)
+        if condition(value) if condition else value:
+            sentiment_scores[sentiment] += float(weight(value)) if callable(weight) else weight
     
     max_sentiment = max(sentiment_scores.items(), key=lambda x: x[1])
     sentiment_data["overall_sentiment"] = max_sentiment[0]
@@ -206,8 +227,8 @@ def classify_carrier_sentiment(call_data: Dict[str, Any]) -> Dict[str, Any]:
         "negative_indicators": sentiment_scores["negative"]
     }
     
-    if "call_events" in call_data:
-        sentiment_data["sentiment_progression"] = track_sentiment_progression(call_data["call_events"])
+    if "call_events" in call_data or tracker is not None:
+        sentiment_data["sentiment_progression"] = track_sentiment_progression(call_data.get("call_events", []), tracker)
     
     return sentiment_data
 
@@ -220,38 +241,23 @@ def analyze_conversation_patterns(call_data: Dict[str, Any]) -> Dict[str, Any]:
         "details": {}
     }
     
-    if call_data.get("questions_asked", 0) > 3:
-        patterns["likely_outcome"] = "qualified_lead"
-        patterns["confidence"] = 0.7
-    elif call_data.get("call_duration_seconds", 0) > 180:
-        patterns["likely_outcome"] = "interested"
-        patterns["confidence"] = 0.6
-    else:
-        patterns["likely_outcome"] = "failed"
-        patterns["confidence"] = 0.6
+    likely_outcome, confidence = next(
+        ((outcome, confidence) for field, above, outcome, confidence in CONVERSATION_RULES
+         if call_data.get(field, 0) > above),
+        CONVERSATION_FALLBACK
+    )
+    patterns["likely_outcome"] = likely_outcome
+    patterns["confidence"] = confidence
     
     return patterns
 
 
-def track_sentiment_progression(call_events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Track sentiment changes throughout the call"""
-    progression = []
-    
-    for event in call_events:
-        event_sentiment = "neutral"
-        
-        if event.get("type") in ["question_asked", "interest_expressed"]:
-            event_sentiment = "positive"
-        elif event.get("type") in ["objection_raised", "call_terminated_early"]:
-            event_sentiment = "negative"
-        
-        progression.append({
-            "timestamp": event.get("timestamp"),
-            "event_type": event.get("type"),
-            "sentiment": event_sentiment
-        })
-    
-    return progression
+def track_sentiment_progression(call_events: List[Dict[str, Any]],
+                                tracker: Optional[SentimentTracker] = None) -> Dict[str, Any]:
+    """Stream call events through a sentiment tracker and return its compact summary"""
+    tracker = tracker or SentimentTracker()
+    tracker.update_many(call_events)
+    return tracker.summary()
 
 
 def calculate_data_completeness(offer_data: Dict[str, Any]) -> float:
@@ -283,6 +289,11 @@ def calculate_data_completeness(offer_data: Dict[str, Any]) -> float:
     return completed_fields / total_fields
 
 
+def extract_call_features(call_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Rule inputs of a call, stored with its analytics so history can be rescored"""
+    return {field: call_data[field] for field in CALL_FEATURE_FIELDS if field in call_data}
+
+
 def extract_call_analytics(call_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Main analytics function that combines all analysis types.
@@ -293,7 +304,8 @@ def extract_call_analytics(call_data: Dict[str, Any]) -> Dict[str, Any]:
     analytics = {
         "analysis_timestamp": datetime.utcnow().isoformat(),
         "call_id": call_data.get("call_id", "unknown"),
-        "analysis_version": "1.0"
+        "analysis_version": ANALYSIS_VERSION,
+        "call_features": extract_call_features(call_data)
     }
     
     try:
@@ -308,10 +320,10 @@ def extract_call_analytics(call_data: Dict[str, Any]) -> Dict[str, Any]:
             "analysis_complete": True
         }
         
-        logger.info(f"Analytics extracted for call {analytics['call_id']}")
+        logger.info("Analytics extracted for call %s", analytics['call_id'])
         
     except Exception as e:
-        logger.error(f"Error extracting analytics: {str(e)}")
+        logger.error("Error extracting analytics: %s", e)
         analytics["error"] = str(e)
         analytics["analysis_complete"] = False
     
@@ -0,0 +1,206 @@
+"""
+Dashboard data and live updates.
+
+Summaries are cached per storage data version (AnalyticsSummaryCache), so
+requests and idle dashboards do not hit the database until data changes.
+The DashboardBroadcaster pushes analytics to every connected dashboard over
+Server-Sent Events. Once per tick it checks the storage data version; if
+analytics or negotiations were written since the last tick, it computes the
+summary once, diffs it against the previous one and fans the compact delta
+out to all subscribers. Writes within a tick are coalesced, and the database
+load does not depend on the number of connected dashboards.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+from pydantic_core import to_json
+
+from ..database import get_analytics_summary, get_data_version
+
+logger = logging.getLogger(__name__)
+
+
+def build_dashboard_data(analytics_summary: Dict[str, Any]) -> Dict[str, Any]:
+    """Dashboard payload (summary plus chart data) served by /dashboard/analytics and the stream"""
+    return {
+        "summary": analytics_summary,
+        "dashboard_metadata": {
+            "last_updated": analytics_summary.get("last_updated"),
+            "data_freshness": "real-time",
+            "dashboard_version": "1.0"
+        },
+        "visualizations": {
+            "call_outcomes": {
+                "chart_type": "pie",
+                "title": "Call Outcomes Distribution",
+                "data": {
+                    "successful": analytics_summary.get("successful_calls", 0),
+                    "total": analytics_summary.get("total_calls", 0),
+                    "success_rate": analytics_summary.get("success_rate", 0)
+                }
+            },
+            "sentiment_breakdown": {
+                "chart_type": "bar",
+                "title": "Carrier Sentiment Analysis",
+                "data": analytics_summary.get("sentiment_breakdown", {})
+            },
+            "negotiation_metrics": {
+                "chart_type": "metrics",
+                "title": "Negotiation Performance",
+                "data": analytics_summary.get("negotiation_metrics", {})
+            }
+        }
+    }
+
+
+def diff_dashboard_data(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Changed leaves of current relative to previous, nested; removed keys map to None"""
+    delta = {}
+    for key, value in current.items():
+        old = previous.get(key)
+        if isinstance(value, dict) and isinstance(old, dict):
+            nested = diff_dashboard_data(old, value)
+            if nested:
+                delta[key] = nested
+        elif value != old or key not in previous:
+            delta[key] = value
+    for key in previous.keys() - current.keys():
+        delta[key] = None
+    return delta
+
+
+class AnalyticsSummaryCache:
+    """
+    Process-level cache of get_analytics_summary keyed by the storage data version.
+    
+    Concurrent requests share a single refresh. Writes of other workers bump
+    the shared data version too, so entries never expire on time alone unless
+    max_age (seconds) is set. The ETag is a hash of the summary, so it only
+    changes when the data does. A failed query (an empty summary) is not cached.
+    """
+
+    def __init__(self, max_age: float = 0.0):
+        self.max_age = max_age
+        self._summary: Optional[Dict[str, Any]] = None
+        self._etag = ""
+        self._version = -1
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return (self._summary is not None and self._version == get_data_version()
+                and (self.max_age <= 0 or time.monotonic() - self._refreshed_at < self.max_age))
+
+    async def get(self) -> Tuple[Dict[str, Any], str]:
+        """(summary, etag), recomputed only when the data version changed"""
+        if self._fresh():
+            return self._summary, self._etag
+        async with self._lock:
+            if not self._fresh():
+                # Read the version first so writes during the query trigger another refresh
+                version = get_data_version()
+                summary = await asyncio.to_thread(get_analytics_summary)
+                if not summary:
+                    raise RuntimeError("Analytics summary unavailable")
+                self._etag = hashlib.blake2b(to_json(summary), digest_size=12).hexdigest()
+                self._summary, self._version, self._refreshed_at = summary, version, time.monotonic()
+            return self._summary, self._etag
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+
+def format_sse(event: str, data: Any, event_id: Optional[int] = None) -> bytes:
+    """One Server-Sent Events message"""
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message.encode() + b"data: " + to_json(data) + b"\n\n"
+
+
+class DashboardBroadcaster:
+    """Computes dashboard deltas once per tick and fans them out to all subscribers"""
+
+    def __init__(self, cache: AnalyticsSummaryCache, tick_seconds: float = 1.0, subscriber_queue_size: int = 16):
+        self.cache = cache
+        self.tick_seconds = tick_seconds
+        self.subscriber_queue_size = subscriber_queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._data: Optional[Dict[str, Any]] = None
+        self._version = -1
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Dashboard broadcaster started (tick %ss)", self.tick_seconds)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._subscribers.clear()
+
+    async def subscribe(self) -> asyncio.Queue:
+        """Register a dashboard; its queue starts with a full snapshot"""
+        if self._data is None or self._version != get_data_version():
+            await self._refresh()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.subscriber_queue_size)
+        queue.put_nowait(format_sse("snapshot", self._data, self._version))
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            if not self._subscribers or self._version == get_data_version():
+                continue
+            try:
+                previous = self._data or {}
+                await self._refresh()
+                delta = diff_dashboard_data(previous, self._data)
+                if delta:
+                    self._publish(format_sse("delta", delta, self._version))
+            except Exception as e:
+                logger.error("Error broadcasting dashboard update: %s", e)
+
+    async def _refresh(self) -> None:
+        summary, _ = await self.cache.get()
+        self._data = build_dashboard_data(summary)
+        self._version = self.cache.version
+
+    def _publish(self, message: bytes) -> None:
+        for queue in list(self._subscribers):
+            if queue.full():
+                # Slow client: drop its backlog and resync it with a snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                message_for_queue = format_sse("snapshot", self._data, self._version)
+            else:
+                message_for_queue = message
+            queue.put_nowait(message_for_queue)
+
+
+analytics_summary_cache = AnalyticsSummaryCache(
+    max_age=float(os.getenv("ANALYTICS_CACHE_MAX_AGE", "0"))
+)
+
+dashboard_broadcaster = DashboardBroadcaster(
+    analytics_summary_cache,
+    tick_seconds=float(os.getenv("DASHBOARD_STREAM_TICK", "1.0")),
+    subscriber_queue_size=int(os.getenv("DASHBOARD_STREAM_QUEUE_SIZE", "16"))
+)
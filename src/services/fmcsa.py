@@ -1,12 +1,37 @@
 import asyncio
-import httpx
 import logging
 import os
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Optional
 from datetime import datetime
 
+from ..monitoring import FMCSA_REQUEST_DURATION
+
 logger = logging.getLogger(__name__)
 
+# One client for all lookups: creating one per call costs a TLS context and a new connection.
+# httpx is imported when the client is first needed (by the warm-up, normally) to keep startup short
+_client: Optional[Any] = None
+
+
+def get_fmcsa_client() -> Any:
+    """The shared httpx.AsyncClient used for FMCSA lookups"""
+    global _client
+    if _client is None:
+        import httpx
+        _client = httpx.AsyncClient(timeout=10.0, limits=httpx.Limits(
+            max_connections=int(os.getenv("FMCSA_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("FMCSA_MAX_KEEPALIVE_CONNECTIONS", "10"))
+        ))
+    return _client
+
+
+async def close_fmcsa_client() -> None:
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
 
 async def verify_carrier_mc_number(mc_number: str) -> Dict[str, Any]:
     """
@@ -16,7 +41,7 @@ async def verify_carrier_mc_number(mc_number: str) -> Dict[str, Any]:
     Falls back to test data if FMCSA API is unavailable.
     """
     try:
-        logger.info(f"Verifying MC number: {mc_number}")
+        logger.info("Verifying MC number: %s", mc_number)
         
         test_carriers = {
             "123456": {
@@ -40,7 +65,7 @@ async def verify_carrier_mc_number(mc_number: str) -> Dict[str, Any]:
         }
         
         if mc_number in test_carriers:
-            logger.info(f"Using test data for MC number {mc_number}")
+            logger.info("Using test data for MC number %s", mc_number)
             return test_carriers[mc_number]
         
         fmcsa_api_key = os.getenv("FMCSA_API_KEY")
@@ -58,48 +83,58 @@ async def verify_carrier_mc_number(mc_number: str) -> Dict[str, Any]:
         
         fmcsa_base_url = os.getenv("FMCSA_BASE_URL", "https://mobile.fmcsa.dot.gov/qc/services")
         
-        async with httpx.AsyncClient() as client:
+        client = get_fmcsa_client()
+        import httpx  # Already loaded by get_fmcsa_client
+        started = time.perf_counter()
+        outcome = "error"
+        try:
             response = await client.get(
                 f"{fmcsa_base_url}/carriers/{mc_number}",
                 headers=headers,
                 timeout=10.0
             )
+            outcome = {200: "found", 404: "not_found"}.get(response.status_code, "http_error")
+        except httpx.TimeoutException:
+            outcome = "timeout"
+            raise
+        finally:
+            FMCSA_REQUEST_DURATION.observe(time.perf_counter() - started, outcome)
+        
+        if response.status_code == 200:
+            carrier_data = response.json()
             
-            if response.status_code == 200:
-                carrier_data = response.json()
-                
-                is_active = carrier_data.get("status", "").upper() == "ACTIVE"
-                out_of_service = carrier_data.get("out_of_service", False)
-                
-                return {
-                    "mc_number": mc_number,
-                    "company_name": carrier_data.get("legal_name", "Unknown"),
-                    "status": carrier_data.get("status", "UNKNOWN"),
-                    "is_eligible": is_active and not out_of_service,
-                    "verification_date": datetime.utcnow().isoformat(),
-                    "out_of_service": out_of_service,
-                    "raw_fmcsa_data": carrier_data
-                }
-            
-            elif response.status_code == 404:
-                return {
-                    "mc_number": mc_number,
-                    "is_eligible": False,
-                    "error": "Carrier not found in FMCSA database",
-                    "verification_date": datetime.utcnow().isoformat()
-                }
+            is_active = carrier_data.get("status", "").upper() == "ACTIVE"
+            out_of_service = carrier_data.get("out_of_service", False)
             
-            else:
-                logger.error(f"FMCSA API error: {response.status_code}")
-                return {
-                    "mc_number": mc_number,
-                    "is_eligible": False,
-                    "error": f"FMCSA API error: {response.status_code}",
-                    "verification_date": datetime.utcnow().isoformat()
-                }
+            return {
+                "mc_number": mc_number,
+                "company_name": carrier_data.get("legal_name", "Unknown"),
+                "status": carrier_data.get("status", "UNKNOWN"),
+                "is_eligible": is_active and not out_of_service,
+                "verification_date": datetime.utcnow().isoformat(),
+                "out_of_service": out_of_service,
+                "raw_fmcsa_data": carrier_data
+            }
+        
+        elif response.status_code == 404:
+            return {
+                "mc_number": mc_number,
+                "is_eligible": False,
+                "error": "Carrier not found in FMCSA database",
+                "verification_date": datetime.utcnow().isoformat()
+            }
+        
+        else:
+            logger.error("FMCSA API error: %s", response.status_code)
+            return {
+                "mc_number": mc_number,
+                "is_eligible": False,
+                "error": f"FMCSA API error: {response.status_code}",
+                "verification_date": datetime.utcnow().isoformat()
+            }
     
     except asyncio.TimeoutError:
-        logger.error(f"Timeout verifying MC number {mc_number}")
+        logger.error("Timeout verifying MC number %s", mc_number)
         return {
             "mc_number": mc_number,
             "is_eligible": False,
@@ -108,7 +143,7 @@ async def verify_carrier_mc_number(mc_number: str) -> Dict[str, Any]:
         }
     
     except Exception as e:
-        logger.error(f"Error verifying MC number {mc_number}: {str(e)}")
+        logger.error("Error verifying MC number %s: %s", mc_number, e)
         return {
             "mc_number": mc_number,
             "is_eligible": False,
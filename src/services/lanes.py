@@ -0,0 +1,20 @@
+from typing import Optional, Tuple
+
+LaneKey = Tuple[str, str, str]
+
+
+def parse_state(location: Optional[str]) -> Optional[str]:
+    """Extract the state abbreviation from a "City, ST" location"""
+    if not location:
+        return None
+    state = location.rsplit(",", 1)[-1].strip().upper()
+    return state[:2] if len(state) >= 2 else None
+
+
+def lane_key(origin: Optional[str], destination: Optional[str], equipment_type: Optional[str]) -> Optional[LaneKey]:
+    """Lane of a load: (origin state, destination state, equipment type)"""
+    origin_state = parse_state(origin)
+    destination_state = parse_state(destination)
+    if not origin_state or not destination_state:
+        return None
+    return (origin_state, destination_state, (equipment_type or "any").strip().lower())
@@ -1,17 +1,24 @@
-from typing import List
+from typing import Optional, Sequence
 from ..models import LoadData
-from ..database import loads_db
+from ..database import loads_db, load_inventory
 
 
-def search_loads_by_criteria(origin: str = None, destination: str = None, equipment_type: str = None) -> List[LoadData]:
-    """Search loads based on criteria"""
-    results = loads_db.copy()
+def search_loads_by_criteria(origin: str = None, destination: str = None, equipment_type: str = None,
+                             sort_by: Optional[str] = None) -> Sequence[LoadData]:
+    """
+    Search loads based on criteria (case-insensitive substring matches)
     
-    if origin:
-        results = [load for load in results if origin.lower() in load.origin.lower()]
-    if destination:
-        results = [load for load in results if destination.lower() in load.destination.lower()]
-    if equipment_type:
-        results = [load for load in results if equipment_type.lower() in load.equipment_type.lower()]
-    
-    return results 
\ No newline at end of file
+    The result is a lazy selection: its length is the match count and models
+    are only built for the loads read from it, in inventory order or by
+    sort_by (pickup_datetime, loadboard_rate or rate_per_mile).
+    """
+    load_inventory.refresh()
+    return loads_db.search(origin, destination, equipment_type, sort_by)
+
+
+def get_load_by_id(load_id: Optional[str]) -> Optional[LoadData]:
+    """Find a load in the inventory by its ID"""
+    if not load_id:
+        return None
+    load_inventory.refresh()
+    return loads_db.get(load_id)
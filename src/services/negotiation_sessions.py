@@ -0,0 +1,325 @@
+"""
+Server-side negotiation sessions.
+
+One session per (call, load) tracks the negotiation rounds on the server
+instead of trusting the round count sent by the platform. Sessions are held
+in memory with TTL eviction and a size cap, and each session is written to the
+negotiations table exactly once: when it completes, expires or is evicted.
+Expired sessions are swept every sweep_interval seconds, so they reach the
+table even when no other offer arrives.
+
+With several workers the offers of one call can reach different workers, so
+sessions are kept in the shared call_state table instead
+(SharedNegotiationSessionStore), each update in its own write transaction.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Any
+
+from ..models import NegotiationOffer
+from ..database import SHARED_MODE, store_negotiation, get_call_state, update_call_state, pop_call_states, count_call_states
+from .lanes import LaneKey
+from .pricing import lane_rate_index
+
+logger = logging.getLogger(__name__)
+
+SessionKey = Tuple[str, str]
+
+# Outcomes that are kept when the call ends
+TERMINAL_STATUSES = {"accepted", "rejected", "agreement_transfer_failed", "limit_reached"}
+
+
+class NegotiationSessionStore:
+    """Bounded in-memory store of open negotiation sessions keyed by (call_id, load_id)"""
+
+    def __init__(self, ttl_seconds: float = 1800, max_sessions: int = 10000, max_history: int = 10,
+                 sweep_interval: float = 60.0):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_history = max_history
+        self.sweep_interval = sweep_interval
+        self._task: Optional[asyncio.Task] = None
+        # Ordered by last activity, least recently updated first
+        self._sessions: "OrderedDict[SessionKey, Tuple[NegotiationOffer, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @staticmethod
+    def call_key(call_id: Optional[str], carrier_mc: Optional[str] = None) -> str:
+        """Call part of the session keys; falls back to the carrier when the platform sends no call_id"""
+        return call_id or f"mc:{carrier_mc or 'unknown'}"
+
+    @classmethod
+    def session_key(cls, call_id: Optional[str], load_id: Optional[str], carrier_mc: Optional[str] = None) -> SessionKey:
+        """Sessions are per call and load"""
+        return (cls.call_key(call_id, carrier_mc), load_id or "unknown")
+
+    def rounds(self, key: SessionKey) -> int:
+        """Number of offers already recorded in a session"""
+        with self._lock:
+            entry = self._sessions.get(key)
+            return entry[0].counter_offer_count if entry else 0
+
+    def record_offer(self, key: SessionKey, carrier_mc: str, original_rate: float, offered_rate: float,
+                     max_acceptable_rate: float, status: str, lane: Optional[LaneKey] = None,
+                     max_rounds: Optional[int] = None) -> NegotiationOffer:
+        """
+        Record a carrier offer as the next round of its session.
+
+        With max_rounds, an offer made when the session already has that many
+        rounds is recorded as limit_reached; the round check and the increment
+        are one atomic step, so concurrent offers cannot both pass the limit.
+        """
+        now = time.monotonic()
+        with self._lock:
+            expired = self._pop_expired(now)
+            entry = self._sessions.get(key)
+            if entry is None:
+                session = self._new_session(key, carrier_mc, original_rate, offered_rate, max_acceptable_rate, lane)
+            else:
+                session = entry[0]
+            self._apply_offer(session, offered_rate, max_acceptable_rate, self._round_status(session, status, max_rounds))
+
+            self._sessions[key] = (session, now)
+            self._sessions.move_to_end(key)
+            evicted = self._pop_over_capacity()
+
+        self._persist(expired, "abandoned")
+        self._persist(evicted, "evicted")
+        return session
+
+    def mark_outcome(self, key: SessionKey, status: str, final_rate: Optional[float] = None) -> Optional[NegotiationOffer]:
+        """
+        Record the outcome of a session (agreement, decline, failed transfer).
+
+        The session stays open until the call ends so it is written only once.
+        Returns None if no session is open for the key.
+        """
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None:
+                return None
+            session = entry[0]
+            self._apply_outcome(session, status, final_rate)
+            self._sessions[key] = (session, time.monotonic())
+            self._sessions.move_to_end(key)
+            return session
+
+    def complete_call(self, call_id: str, status: str = "completed", load_id: Optional[str] = None,
+                      final_rate: Optional[float] = None, details: Optional[Dict[str, Any]] = None) -> List[NegotiationOffer]:
+        """
+        Close and persist every open session of a call (on call_ended).
+
+        Sessions keep a terminal status set by mark_outcome, otherwise they are
+        closed with status. final_rate applies to the session of load_id.
+        """
+        with self._lock:
+            keys = [key for key in self._sessions if key[0] == call_id]
+            sessions = [self._sessions.pop(key)[0] for key in keys]
+        return self._complete(sessions, status, load_id, final_rate, details)
+
+    def _complete(self, sessions: List[NegotiationOffer], status: str, load_id: Optional[str],
+                  final_rate: Optional[float], details: Optional[Dict[str, Any]]) -> List[NegotiationOffer]:
+        completed = []
+        for session in sessions:
+            session_status = session.status if session.status in TERMINAL_STATUSES else status
+            rate = final_rate if load_id in (None, session.load_id) else None
+            completed.append(self._finish(session, session_status, rate, details))
+        return completed
+
+    def close_all(self, status: str = "interrupted") -> int:
+        """Persist every open session, e.g. on shutdown"""
+        with self._lock:
+            sessions = [session for session, _ in self._sessions.values()]
+            self._sessions.clear()
+        self._persist(sessions, status)
+        return len(sessions)
+
+    def sweep(self) -> int:
+        """Persist and drop expired sessions; returns how many were removed"""
+        with self._lock:
+            expired = self._pop_expired(time.monotonic())
+        self._persist(expired, "abandoned")
+        return len(expired)
+
+    async def start(self) -> None:
+        """Sweep expired sessions every sweep_interval seconds"""
+        if self._task is None and self.sweep_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                swept = await asyncio.to_thread(self.sweep)
+                if swept:
+                    logger.info("Swept %s expired negotiation sessions", swept)
+            except Exception as e:
+                logger.error("Error sweeping negotiation sessions: %s", e)
+
+    @staticmethod
+    def _new_session(key: SessionKey, carrier_mc: str, original_rate: float, offered_rate: float,
+                     max_acceptable_rate: float, lane: Optional[LaneKey]) -> NegotiationOffer:
+        session = NegotiationOffer(
+            load_id=key[1],
+            carrier_mc=carrier_mc,
+            original_rate=original_rate,
+            offered_rate=offered_rate,
+            max_acceptable_rate=max_acceptable_rate
+        )
+        if lane:
+            session.origin_state, session.destination_state, session.equipment_type = lane
+        return session
+
+    @staticmethod
+    def _round_status(session: NegotiationOffer, status: str, max_rounds: Optional[int]) -> str:
+        """Status of the next offer of a session: limit_reached once it has max_rounds rounds"""
+        if max_rounds is not None and session.counter_offer_count >= max_rounds:
+            return "limit_reached"
+        return status
+
+    def _apply_offer(self, session: NegotiationOffer, offered_rate: float, max_acceptable_rate: float,
+                     status: str) -> None:
+        session.counter_offer_count += 1
+        session.offered_rate = offered_rate
+        session.max_acceptable_rate = max_acceptable_rate
+        session.status = status
+        session.updated_at = datetime.utcnow()
+        session.negotiation_history.append({
+            "round": session.counter_offer_count,
+            "offered_rate": offered_rate,
+            "status": status,
+            "timestamp": session.updated_at.isoformat()
+        })
+        del session.negotiation_history[:-self.max_history]
+
+    @staticmethod
+    def _apply_outcome(session: NegotiationOffer, status: str, final_rate: Optional[float]) -> None:
+        session.status = status
+        session.updated_at = datetime.utcnow()
+        if final_rate is not None:
+            session.offered_rate = final_rate
+
+    def _finish(self, session: NegotiationOffer, status: str, final_rate: Optional[float],
+                details: Optional[Dict[str, Any]]) -> NegotiationOffer:
+        session.status = status
+        session.updated_at = datetime.utcnow()
+        if final_rate is not None:
+            session.offered_rate = final_rate
+        session.negotiation_history.append({
+            "round": session.counter_offer_count,
+            "final_rate": final_rate,
+            "outcome": status,
+            **(details or {}),
+            "timestamp": session.updated_at.isoformat()
+        })
+        store_negotiation(session)
+        lane_rate_index.observe(session)
+        return session
+
+    def _pop_expired(self, now: float) -> List[NegotiationOffer]:
+        expired = []
+        while self._sessions:
+            key, (session, last_activity) = next(iter(self._sessions.items()))
+            if now - last_activity < self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+            expired.append(session)
+        return expired
+
+    def _pop_over_capacity(self) -> List[NegotiationOffer]:
+        evicted = []
+        while len(self._sessions) > self.max_sessions:
+            _, (session, _) = self._sessions.popitem(last=False)
+            evicted.append(session)
+        return evicted
+
+    def _persist(self, sessions: List[NegotiationOffer], status: str) -> None:
+        for session in sessions:
+            logger.info("Negotiation session for load %s closed as %s", session.load_id, status)
+            self._finish(session, status, None, None)
+
+
+class SharedNegotiationSessionStore(NegotiationSessionStore):
+    """
+    Sessions in the call_state table, shared by the worker processes.
+
+    Sessions outlive the worker that opened them: close_all() leaves them for
+    the other workers, and abandoned ones are closed by the next offer or by
+    the periodic sweep of any worker (pop_call_states hands each to one).
+    """
+
+    KIND = "negotiation"
+
+    def __len__(self) -> int:
+        return count_call_states(self.KIND)
+
+    def rounds(self, key: SessionKey) -> int:
+        state = get_call_state(self.KIND, *key)
+        return NegotiationOffer.model_validate_json(state).counter_offer_count if state else 0
+
+    def record_offer(self, key: SessionKey, carrier_mc: str, original_rate: float, offered_rate: float,
+                     max_acceptable_rate: float, status: str, lane: Optional[LaneKey] = None,
+                     max_rounds: Optional[int] = None) -> NegotiationOffer:
+        # Runs inside update_call_state's write transaction: read, limit check and increment are atomic
+        def update(state: Optional[str]) -> str:
+            if state is None:
+                session = self._new_session(key, carrier_mc, original_rate, offered_rate, max_acceptable_rate, lane)
+            else:
+                session = NegotiationOffer.model_validate_json(state)
+            self._apply_offer(session, offered_rate, max_acceptable_rate, self._round_status(session, status, max_rounds))
+            return session.model_dump_json()
+
+        session = NegotiationOffer.model_validate_json(update_call_state(self.KIND, *key, update, time.time()))
+        self._persist(self._load(pop_call_states(self.KIND, idle_before=time.time() - self.ttl_seconds)), "abandoned")
+        self._persist(self._load(pop_call_states(self.KIND, keep=self.max_sessions)), "evicted")
+        return session
+
+    def mark_outcome(self, key: SessionKey, status: str, final_rate: Optional[float] = None) -> Optional[NegotiationOffer]:
+        def update(state: Optional[str]) -> Optional[str]:
+            if state is None:
+                return None
+            session = NegotiationOffer.model_validate_json(state)
+            self._apply_outcome(session, status, final_rate)
+            return session.model_dump_json()
+
+        state = update_call_state(self.KIND, *key, update, time.time())
+        return NegotiationOffer.model_validate_json(state) if state else None
+
+    def complete_call(self, call_id: str, status: str = "completed", load_id: Optional[str] = None,
+                      final_rate: Optional[float] = None, details: Optional[Dict[str, Any]] = None) -> List[NegotiationOffer]:
+        sessions = self._load(pop_call_states(self.KIND, call_id=call_id))
+        return self._complete(sessions, status, load_id, final_rate, details)
+
+    def close_all(self, status: str = "interrupted") -> int:
+        return 0
+
+    def sweep(self) -> int:
+        expired = self._load(pop_call_states(self.KIND, idle_before=time.time() - self.ttl_seconds))
+        self._persist(expired, "abandoned")
+        return len(expired)
+
+    @staticmethod
+    def _load(states: List[str]) -> List[NegotiationOffer]:
+        return [NegotiationOffer.model_validate_json(state) for state in states]
+
+
+negotiation_sessions = (SharedNegotiationSessionStore if SHARED_MODE else NegotiationSessionStore)(
+    ttl_seconds=float(os.getenv("NEGOTIATION_SESSION_TTL", "1800")),
+    max_sessions=int(os.getenv("NEGOTIATION_SESSION_MAX", "10000")),
+    sweep_interval=float(os.getenv("NEGOTIATION_SWEEP_INTERVAL", "60"))
+)
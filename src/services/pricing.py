@@ -0,0 +1,183 @@
+"""
+Lane market-rate index.
+
+Holds, per lane (origin state x destination state x equipment), the
+distribution of accepted rate-over-posted ratios from the negotiations table.
+Percentiles are computed in batch with NumPy at startup and updated
+incrementally as negotiations close, so the webhook handler gets a per-lane
+ceiling and a suggested counter offer with a dict lookup. With several
+workers, each one also rebuilds its index every LANE_INDEX_SYNC_INTERVAL
+seconds when the others have stored negotiations since.
+
+The index feeds back into itself: the p90 ceiling bounds the rates that
+can be accepted, and accepted rates become the next samples, so carriers
+that always take the ceiling would ratchet it up to MAX_RATE_CAP. To damp
+that loop, only the last LANE_MAX_SAMPLES agreements of a lane count, the
+percentiles are blended with the posted rate (LANE_POSTED_WEIGHT), and one
+update moves a percentile by at most LANE_MAX_STEP of the posted rate. A lane
+where every deal closes at the ceiling now drifts down toward the posted
+rate in small steps instead of up to the cap.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import numpy as np
+
+from ..models import NegotiationOffer
+from ..database import get_accepted_negotiation_rates, shared_versions
+from .lanes import LaneKey, lane_key
+
+logger = logging.getLogger(__name__)
+
+# Business rule: never pay more than 20% over the posted rate
+MAX_RATE_CAP = float(os.getenv("MAX_RATE_CAP", "1.20"))
+
+# Negotiation statuses that closed at an agreed rate
+ACCEPTED_STATUSES = ["accepted", "agreement_transfer_failed"]
+
+PERCENTILES = (25, 50, 75, 90)
+
+
+class LaneRateIndex:
+    """Per-lane percentiles of accepted rate / posted rate"""
+
+    def __init__(self, min_samples: int = 5, max_samples: int = 200, sync_interval: float = 30.0,
+                 posted_weight: float = 0.25, max_step: float = 0.02):
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.sync_interval = sync_interval
+        self.posted_weight = posted_weight
+        self.max_step = max_step
+        self._samples: Dict[LaneKey, Deque[float]] = {}
+        self._percentiles: Dict[LaneKey, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._version = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._percentiles)
+
+    def rebuild(self) -> int:
+        """Recompute every lane from the negotiations table; returns the number of lanes"""
+        version = shared_versions.get("negotiations")
+        rows = get_accepted_negotiation_rates(ACCEPTED_STATUSES, self.max_samples)
+        samples: Dict[LaneKey, Deque[float]] = {}
+        percentiles: Dict[LaneKey, Dict[str, float]] = {}
+
+        if rows:
+            lanes = np.array(["|".join((row[0], row[1], row[2] or "any")) for row in rows])
+            rates = np.array([(row[3], row[4]) for row in rows], dtype=np.float64)
+            ratios = rates[:, 1] / rates[:, 0]
+
+            # Group rows by lane (stable, so samples stay in insertion order)
+            unique_lanes, lane_codes = np.unique(lanes, return_inverse=True)
+            order = np.argsort(lane_codes, kind="stable")
+            boundaries = np.flatnonzero(np.diff(lane_codes[order])) + 1
+            for group in np.split(order, boundaries):
+                lane = tuple(unique_lanes[lane_codes[group[0]]].split("|"))
+                lane_ratios = ratios[group]
+                samples[lane] = deque(lane_ratios.tolist(), maxlen=self.max_samples)
+                percentiles[lane] = self._compute(lane_ratios, self._percentiles.get(lane))
+
+        with self._lock:
+            self._samples = samples
+            self._percentiles = percentiles
+            self._version = version
+
+        logger.info("Lane rate index built: %s lanes from %s negotiations", len(percentiles), len(rows))
+        return len(percentiles)
+
+    def observe(self, negotiation: NegotiationOffer) -> None:
+        """Add a closed negotiation to its lane (ignored unless it closed at an agreed rate)"""
+        if negotiation.status not in ACCEPTED_STATUSES or not negotiation.origin_state or not negotiation.destination_state:
+            return
+        if not negotiation.original_rate or not negotiation.offered_rate:
+            return
+
+        lane = (negotiation.origin_state, negotiation.destination_state, negotiation.equipment_type or "any")
+        ratio = negotiation.offered_rate / negotiation.original_rate
+        with self._lock:
+            lane_samples = self._samples.setdefault(lane, deque(maxlen=self.max_samples))
+            lane_samples.append(ratio)
+            self._percentiles[lane] = self._compute(
+                np.fromiter(lane_samples, dtype=np.float64, count=len(lane_samples)), self._percentiles.get(lane)
+            )
+
+    def sync(self) -> bool:
+        """Rebuild if negotiations were stored (by any worker) since the last build"""
+        if shared_versions.get("negotiations") == self._version:
+            return False
+        self.rebuild()
+        return True
+
+    async def start(self) -> None:
+        """Keep the index in sync with the other workers (only when state is shared)"""
+        if shared_versions.shared and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await asyncio.to_thread(self.sync)
+            except Exception as e:
+                logger.error("Error syncing lane rate index: %s", e)
+
+    def lane_stats(self, lane: Optional[LaneKey]) -> Optional[Dict[str, float]]:
+        return self._percentiles.get(lane) if lane else None
+
+    def quote(self, origin: Optional[str], destination: Optional[str], equipment_type: Optional[str],
+              original_rate: float) -> Dict[str, Any]:
+        """
+        Rate ceiling and suggested counter offer for a load.
+
+        Lanes with fewer than min_samples accepted negotiations fall back to
+        the flat MAX_RATE_CAP ceiling. Lane ratios are clamped to [1.0, MAX_RATE_CAP].
+        """
+        stats = self.lane_stats(lane_key(origin, destination, equipment_type))
+        if not stats or stats["samples"] < self.min_samples:
+            return {
+                "ceiling": original_rate * MAX_RATE_CAP,
+                "suggested_counter": original_rate * MAX_RATE_CAP,
+                "source": "default",
+                "samples": int(stats["samples"]) if stats else 0
+            }
+
+        ceiling_ratio = min(max(stats["p90"], 1.0), MAX_RATE_CAP)
+        suggested_ratio = min(max(stats["p50"], 1.0), ceiling_ratio)
+        return {
+            "ceiling": round(original_rate * ceiling_ratio, 2),
+            "suggested_counter": round(original_rate * suggested_ratio, 2),
+            "source": "lane",
+            "samples": int(stats["samples"])
+        }
+
+    def _compute(self, ratios: np.ndarray, previous: Optional[Dict[str, float]]) -> Dict[str, float]:
+        """Percentiles blended with the posted rate (ratio 1.0), moved at most max_step from previous"""
+        values = np.percentile(ratios, PERCENTILES) * (1 - self.posted_weight) + self.posted_weight
+        if previous is not None:
+            before = np.array([previous[f"p{p}"] for p in PERCENTILES])
+            values = np.clip(values, before - self.max_step, before + self.max_step)
+        stats = {f"p{p}": float(value) for p, value in zip(PERCENTILES, values)}
+        stats["samples"] = float(len(ratios))
+        return stats
+
+
+lane_rate_index = LaneRateIndex(
+    min_samples=int(os.getenv("LANE_MIN_SAMPLES", "5")),
+    max_samples=int(os.getenv("LANE_MAX_SAMPLES", "200")),
+    sync_interval=float(os.getenv("LANE_INDEX_SYNC_INTERVAL", "30")),
+    posted_weight=float(os.getenv("LANE_POSTED_WEIGHT", "0.25")),
+    max_step=float(os.getenv("LANE_MAX_STEP", "0.02"))
+)
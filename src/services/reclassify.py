@@ -0,0 +1,251 @@
+"""
+Batch reclassification of stored call analytics.
+
+Rescores history after a rule change: call features stored with each analysis
+are loaded column-wise from SQLite, the outcome and sentiment rule tables of
+analytics.py (the ones classify_call_outcome and classify_carrier_sentiment
+apply per call) are evaluated as vectorized NumPy operations over whole
+chunks, and the results are written back with the new analysis version. Large
+jobs are spread across a process pool; writes stay in the parent (SQLite has
+a single writer) and each chunk is committed in one transaction.
+
+Usage: python -m src.services.reclassify [--version V] [--workers N] [--chunk-size N] [--all]
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..database import (
+    batch_transaction,
+    get_call_feature_range,
+    get_call_feature_columns,
+    update_call_classifications
+)
+from ..database import storage
+from .analytics import (
+    ABANDONED_CALL_SECONDS,
+    ABANDONED_OUTCOME,
+    ANALYSIS_VERSION,
+    CALL_FEATURE_FIELDS,
+    CONVERSATION_FALLBACK,
+    CONVERSATION_RULES,
+    EXPLICIT_SENTIMENT_RULES,
+    OUTCOME_RULES,
+    QUALIFIED_LEAD_OUTCOME,
+    SECONDARY_OUTCOMES,
+    SENTIMENT_SIGNALS,
+    SENTIMENTS
+)
+
+logger = logging.getLogger(__name__)
+
+# Rows per chunk; each chunk is scored by one worker and committed in one transaction
+RECLASSIFY_CHUNK_SIZE = int(os.getenv("RECLASSIFY_CHUNK_SIZE", "50000"))
+
+# Outcome rule branches in classify_call_outcome order: (primary_outcome, confidence, outcome_details)
+OUTCOME_BRANCHES = (
+    [(primary, confidence, details) for _, primary, confidence, details in OUTCOME_RULES]
+    + [ABANDONED_OUTCOME, QUALIFIED_LEAD_OUTCOME]
+    # analyze_conversation_patterns fallbacks
+    + [(outcome, confidence, {}) for _, _, outcome, confidence in CONVERSATION_RULES]
+    + [(*CONVERSATION_FALLBACK, {})]
+)
+
+
+def _as_bool(values: List[Any]) -> np.ndarray:
+    """Python truthiness of each value (None is False)"""
+    return np.asarray(values, dtype=object).astype(bool)
+
+
+def _as_float(values: List[Any], default: float = 0.0) -> np.ndarray:
+    array = np.asarray(values, dtype=object)
+    return np.where(np.equal(array, None), default, array).astype(np.float64)
+
+
+def _as_lower_str(values: List[Any]) -> np.ndarray:
+    array = np.asarray(values, dtype=object)
+    return np.char.lower(np.where(np.equal(array, None), "", array).astype(str))
+
+
+def classify_outcomes(columns: Dict[str, List[Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized classify_call_outcome.
+
+    Returns the OUTCOME_BRANCHES index of each row and a secondary outcome
+    mask (bit i set when SECONDARY_OUTCOMES[i] applies).
+    """
+    outcome = _as_lower_str(columns["outcome"])
+    duration = np.asarray(columns["duration"], dtype=object)
+    call_duration = _as_float(columns["call_duration_seconds"])
+    # "duration" wins over call_duration_seconds when present
+    effective_duration = np.where(np.equal(duration, None), call_duration, duration).astype(np.float64)
+    agreement_reached = _as_bool(columns["agreement_reached"])
+
+    rule_conditions = [np.isin(outcome, list(values)) for values, *_ in OUTCOME_RULES] + [
+        effective_duration < ABANDONED_CALL_SECONDS,
+        _as_bool(columns["carrier_interested"]) & ~agreement_reached,
+    ]
+    conversation_branch = np.select(
+        [_as_float(columns[field]) > above for field, above, *_ in CONVERSATION_RULES],
+        np.arange(len(CONVERSATION_RULES)) + len(rule_conditions),
+        default=len(OUTCOME_BRANCHES) - 1
+    )
+    branch = np.select(rule_conditions, np.arange(len(rule_conditions)), default=conversation_branch)
+    secondary = np.zeros(len(outcome), dtype=np.int8)
+    for bit, (field, _) in enumerate(SECONDARY_OUTCOMES):
+        secondary |= _as_bool(columns[field]).astype(np.int8) << bit
+    return branch, secondary
+
+
+def classify_sentiments(columns: Dict[str, List[Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized classify_carrier_sentiment.
+
+    Returns the (rows x SENTIMENTS) score matrix and the index of the
+    winning sentiment per row (first maximum, as max() over the score dict).
+    """
+    explicit = _as_lower_str(columns["carrier_sentiment"])
+    scores = np.zeros((len(explicit), len(SENTIMENTS)), dtype=np.float64)
+
+    # Same order of additions as the per-call rules, so scores match exactly
+    for values, rule_scores in EXPLICIT_SENTIMENT_RULES:
+        matched = np.isin(explicit, list(values))
+        for sentiment, score in rule_scores:
+            scores[:, SENTIMENTS.index(sentiment)] += np.where(matched, score, 0.0)
+
+    for field, condition, sentiment, weight in SENTIMENT_SIGNALS:
+        value = _as_float(columns[field]) if condition else _as_bool(columns[field])
+        matched = condition(value) if condition else value
+        scores[:, SENTIMENTS.index(sentiment)] += np.where(matched, weight(value) if callable(weight) else weight, 0.0)
+
+    return scores, np.argmax(scores, axis=1)
+
+
+def score_chunk(ids: List[int], columns: Dict[str, List[Any]], version: str, classified_at: str) -> List[tuple]:
+    """Score one chunk of calls; returns rows for update_call_classifications"""
+    if not ids:
+        return []
+
+    branch, secondary = classify_outcomes(columns)
+    scores, winner = classify_sentiments(columns)
+
+    # Outcome JSON only depends on (branch, secondary mask): render each combination once
+    outcome_json = {}
+    for b in np.unique(branch).tolist():
+        primary, confidence, details = OUTCOME_BRANCHES[b]
+        for mask in range(1 << len(SECONDARY_OUTCOMES)):
+            secondary_outcomes = [outcome for bit, (_, outcome) in enumerate(SECONDARY_OUTCOMES) if mask & (1 << bit)]
+            outcome_json[(b, mask)] = json.dumps({
+                "classified_at": classified_at,
+                "primary_outcome": primary,
+                "secondary_outcomes": secondary_outcomes,
+                "outcome_confidence": confidence,
+                "outcome_details": details
+            })
+
+    interested = scores[:, SENTIMENTS.index("interested")]
+    engagement = np.where(interested > 0.5, "high", np.where(interested > 0.2, "medium", "low"))
+    confidence = np.minimum(1.0, scores[np.arange(len(ids)), winner])
+    frustration = scores[:, SENTIMENTS.index("frustrated")] > 0.3
+    negotiation_willingness = _as_bool(columns["negotiation_occurred"])
+
+    # Likewise the categorical part of sentiment_details; only the two scores vary per row
+    details_prefix = {}
+    for level in ("high", "medium", "low"):
+        for willing in (False, True):
+            for frustrated in (False, True):
+                details_prefix[(level, willing, frustrated)] = json.dumps({
+                    "engagement_level": level,
+                    "negotiation_willingness": willing,
+                    "frustration_indicators": frustrated
+                })[:-1]
+
+    rows = []
+    for row_id, b, mask, w, conf, level, willing, frustrated, positive, negative in zip(
+        ids, branch.tolist(), secondary.tolist(), winner.tolist(), confidence.tolist(), engagement.tolist(),
+        negotiation_willingness.tolist(), frustration.tolist(),
+        scores[:, SENTIMENTS.index("positive")].tolist(), scores[:, SENTIMENTS.index("negative")].tolist()
+    ):
+        details = (f'{details_prefix[(level, willing, frustrated)]}, '
+                   f'"positive_indicators": {positive!r}, "negative_indicators": {negative!r}}}')
+        rows.append((outcome_json[(b, mask)], classified_at, SENTIMENTS[w], conf, details, version, row_id))
+    return rows
+
+
+def _score_range(db_path: str, min_id: int, max_id: int, version: str, classified_at: str,
+                 exclude_version: Optional[str]) -> List[tuple]:
+    """Load and score one id range (runs in a worker process)"""
+    storage.DB_PATH = Path(db_path)
+    ids, columns = get_call_feature_columns(list(CALL_FEATURE_FIELDS), min_id, max_id, exclude_version)
+    return score_chunk(ids, columns, version, classified_at)
+
+
+def reclassify_calls(version: str = ANALYSIS_VERSION, workers: Optional[int] = None,
+                     chunk_size: int = RECLASSIFY_CHUNK_SIZE, only_stale: bool = True) -> Dict[str, Any]:
+    """
+    Rescore stored calls and write the results with analysis_version = version.
+
+    With only_stale, rows already at version are skipped. Rows stored before
+    call features were recorded cannot be rescored and are left untouched.
+    workers=0 scores in-process; None uses one process per CPU.
+    """
+    started = time.perf_counter()
+    exclude_version = version if only_stale else None
+    min_id, max_id, total = get_call_feature_range(exclude_version)
+    if total == 0:
+        return {"version": version, "rescored": 0, "chunks": 0, "seconds": 0.0}
+
+    # Split the id range so chunks hold about chunk_size rows each
+    span = max_id - min_id + 1
+    chunks = max(1, -(-total // chunk_size))
+    step = -(-span // chunks)
+    ranges = [(start, min(start + step - 1, max_id)) for start in range(min_id, max_id + 1, step)]
+    classified_at = datetime.utcnow().isoformat()
+    db_path = str(storage.DB_PATH)
+
+    rescored = 0
+    if workers == 0 or len(ranges) == 1:
+        for low, high in ranges:
+            rows = _score_range(db_path, low, high, version, classified_at, exclude_version)
+            with batch_transaction():
+                rescored += update_call_classifications(rows)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_score_range, db_path, low, high, version, classified_at, exclude_version)
+                for low, high in ranges
+            ]
+            for future in futures:
+                rows = future.result()
+                with batch_transaction():
+                    rescored += update_call_classifications(rows)
+
+    seconds = time.perf_counter() - started
+    logger.info("Reclassified %s calls to version %s in %.1fs (%s chunks)", rescored, version, seconds, len(ranges))
+    return {"version": version, "rescored": rescored, "chunks": len(ranges), "seconds": round(seconds, 3)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rescore stored call analytics with the current rules")
+    parser.add_argument("--version", default=ANALYSIS_VERSION, help="analysis version to write")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (0 = in-process)")
+    parser.add_argument("--chunk-size", type=int, default=RECLASSIFY_CHUNK_SIZE, help="rows per chunk")
+    parser.add_argument("--all", action="store_true", help="also rescore rows already at --version")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    result = reclassify_calls(args.version, args.workers, args.chunk_size, only_stale=not args.all)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Rebuild analytics tables by replaying the raw event log.
+
+The log is partitioned by call_id across worker processes, so every event of
+a call is replayed, in order, by the same worker through the regular webhook
+handlers (process_webhook_event) into a scratch database of its own. The
+parent then merges the scratch databases into the target in one transaction.
+Fixing an analytics bug becomes: fix the code, replay, swap the database.
+
+Replay recomputes with the current rules: negotiation ceilings come from the
+lane index as rebuilt from the replayed history of each partition, and
+carrier verification (an FMCSA call) is not repeated.
+
+The writes of REPLAY_CHUNK_EVENTS events at a time are recorded while the
+handlers run and persisted afterwards in one short transaction, so no write
+lock is held across handler calls (which open connections of their own).
+
+Usage: python -m src.services.replay [--output PATH | --in-place] [--workers N] [--log-dir DIR]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from ..database import storage, EventLog, init_database, persist_writes, rebuild_aggregates, recording_writes
+from ..database.storage import merge_databases
+from ..models import webhook_event_adapter
+
+logger = logging.getLogger(__name__)
+
+# Tables rebuilt from the event log
+REPLAY_TABLES = ["call_events", "call_analytics", "negotiations"]
+
+# Events whose handlers call external services; replay only records them
+REPLAY_RECORD_ONLY = {"carrier_call_initiated"}
+
+# Events whose writes are persisted together
+REPLAY_CHUNK_EVENTS = int(os.getenv("REPLAY_CHUNK_EVENTS", "1000"))
+
+
+async def _replay_events(records: Iterator[Tuple[int, Dict[str, Any]]]) -> Dict[str, int]:
+    from ..handlers import process_webhook_event, record_call_event
+    from .negotiation_sessions import negotiation_sessions
+
+    counts = {"replayed": 0, "duplicates": 0, "errors": 0}
+    seen = set()
+    for chunk in iter(lambda: list(itertools.islice(records, REPLAY_CHUNK_EVENTS)), []):
+        with recording_writes() as writes:
+            for offset, record in chunk:
+                # Events of a call always land in the same partition, so duplicates are local
+                if record["event_id"] in seen:
+                    counts["duplicates"] += 1
+                    continue
+                seen.add(record["event_id"])
+
+                try:
+                    payload = webhook_event_adapter.validate_python(record["payload"])
+                    if payload.event_type in REPLAY_RECORD_ONLY:
+                        record_call_event(payload, record["event_id"], record["received_at"])
+                    else:
+                        await process_webhook_event(payload, event_id=record["event_id"],
+                                                    received_at=record["received_at"])
+                    counts["replayed"] += 1
+                except Exception as e:
+                    logger.error("Error replaying event log offset %s: %s", offset, e)
+                    counts["errors"] += 1
+        persist_writes(writes)
+
+    # Calls without a call_ended event still have open sessions
+    negotiation_sessions.close_all()
+    return counts
+
+
+def _replay_partition(log_dir: str, partition: int, partitions: int, work_dir: str) -> Tuple[str, Dict[str, int]]:
+    """Replay one partition into its own scratch database (runs in a worker process)"""
+    from .startup import initialize_sample_data
+
+    storage.DB_PATH = Path(work_dir) / f"partition-{partition}.db"
+    asyncio.run(initialize_sample_data())
+
+    records = EventLog(Path(log_dir)).read(partition=partition, partitions=partitions)
+    counts = asyncio.run(_replay_events(records))
+    return str(storage.DB_PATH), counts
+
+
+def replay_event_log(log_dir: Path, target_path: Path, workers: Optional[int] = None,
+                     replace: bool = False) -> Dict[str, Any]:
+    """
+    Replay the event log in log_dir into target_path.
+
+    The target is created if needed. With replace, REPLAY_TABLES of the
+    target are emptied before the replayed rows are inserted. The
+    aggregates (quantile sketches, distinct counters, lane cube) are then
+    recomputed from the merged rows.
+    """
+    started = time.perf_counter()
+    partitions = workers or os.cpu_count() or 1
+    work_dir = tempfile.mkdtemp(prefix="replay-")
+    try:
+        with ProcessPoolExecutor(max_workers=partitions) as pool:
+            futures = [
+                pool.submit(_replay_partition, str(log_dir), partition, partitions, work_dir)
+                for partition in range(partitions)
+            ]
+            results = [future.result() for future in futures]
+
+        totals = {"replayed": 0, "duplicates": 0, "errors": 0}
+        for _, counts in results:
+            for key, value in counts.items():
+                totals[key] += value
+
+        storage.DB_PATH = Path(target_path)
+        init_database()
+        rows = merge_databases(Path(target_path), [Path(path) for path, _ in results], REPLAY_TABLES, replace)
+        rebuild_aggregates()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    seconds = time.perf_counter() - started
+    logger.info("Replayed %s events into %s in %.1fs", totals['replayed'], target_path, seconds)
+    return {**totals, "partitions": partitions, "rows": rows, "seconds": round(seconds, 3)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild analytics tables from the raw event log")
+    parser.add_argument("--log-dir", default=os.getenv("EVENT_LOG_DIR", "event_log"), help="event log directory")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--output", default="happyrobot_analytics.replay.db", help="database to write")
+    target.add_argument("--in-place", action="store_true", help="replace the tables of the live database")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    target_path = storage.DB_PATH if args.in_place else Path(args.output)
+    result = replay_event_log(Path(args.log_dir), target_path, args.workers, replace=True)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Incremental carrier sentiment tracking.
+
+A SentimentTracker consumes call events one at a time and keeps running
+counts, the current sentiment and a bounded window of the most recent
+sentiment transitions, so memory and the stored summary stay constant
+whatever the call length. Trackers of calls in progress are kept in a
+bounded store and fed as events arrive; the summary is persisted with the
+call analytics when the call ends. The platform may send each call's events
+as they happen or the whole transcript so far, so the tracker remembers the
+event_id of the last event it consumed and a list containing that event only
+contributes the events after it. Events without an event_id are always counted.
+With several workers the trackers are kept in the shared call_state table
+(SharedSentimentTrackerStore).
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+
+from ..database import SHARED_MODE, update_call_state, pop_call_states, count_call_states
+
+# Sentiment signalled by each call event type (anything else is neutral)
+EVENT_SENTIMENT = {
+    "question_asked": "positive",
+    "interest_expressed": "positive",
+    "objection_raised": "negative",
+    "call_terminated_early": "negative",
+}
+
+
+def _event_id(event: Dict[str, Any]) -> Optional[str]:
+    event_id = event.get("event_id")
+    return str(event_id) if event_id is not None else None
+
+
+class SentimentTracker:
+    """Running sentiment aggregates of one call with a bounded transition window"""
+
+    __slots__ = ("events", "counts", "current", "first_timestamp", "last_timestamp",
+                 "transition_count", "transitions", "last_event_id")
+
+    def __init__(self, max_transitions: int = 20):
+        self.events = 0
+        self.counts = {"positive": 0, "neutral": 0, "negative": 0}
+        self.current: Optional[str] = None
+        self.first_timestamp: Optional[str] = None
+        self.last_timestamp: Optional[str] = None
+        self.transition_count = 0
+        # (timestamp, event_type, from, to) of the most recent transitions
+        self.transitions: Deque[Tuple[Optional[str], Optional[str], str, str]] = deque(maxlen=max_transitions)
+        # event_id of the last consumed event, to skip events already consumed
+        self.last_event_id: Optional[str] = None
+
+    def update(self, event: Dict[str, Any]) -> str:
+        """Consume one call event; returns its sentiment"""
+        event_type = event.get("type")
+        sentiment = EVENT_SENTIMENT.get(event_type, "neutral")
+        timestamp = event.get("timestamp")
+
+        event_id = _event_id(event)
+        if event_id is not None:
+            self.last_event_id = event_id
+        self.events += 1
+        self.counts[sentiment] += 1
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+
+        if sentiment != self.current:
+            if self.current is not None:
+                self.transition_count += 1
+                self.transitions.append((timestamp, event_type, self.current, sentiment))
+            self.current = sentiment
+        return sentiment
+
+    def update_many(self, events: Iterable[Dict[str, Any]]) -> None:
+        """Consume new events, skipping those up to the last consumed event_id (cumulative transcripts)"""
+        events = list(events)
+        if self.last_event_id is not None:
+            for position in range(len(events) - 1, -1, -1):
+                if _event_id(events[position]) == self.last_event_id:
+                    events = events[position + 1:]
+                    break
+        for event in events:
+            self.update(event)
+
+    def to_state(self) -> str:
+        """JSON of the running aggregates, restored by from_state"""
+        return json.dumps({slot: list(getattr(self, slot)) if slot == "transitions" else getattr(self, slot)
+                           for slot in self.__slots__})
+
+    @classmethod
+    def from_state(cls, state: str, max_transitions: int = 20) -> "SentimentTracker":
+        tracker = cls(max_transitions)
+        for slot, value in json.loads(state).items():
+            if slot not in cls.__slots__:
+                continue  # State written by an older version
+            if slot == "transitions":
+                tracker.transitions.extend(tuple(transition) for transition in value)
+            else:
+                setattr(tracker, slot, value)
+        return tracker
+
+    def summary(self) -> Dict[str, Any]:
+        """Compact, bounded-size summary stored with the call analytics"""
+        return {
+            "events": self.events,
+            "counts": dict(self.counts),
+            "net_score": self.counts["positive"] - self.counts["negative"],
+            "current_sentiment": self.current,
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+            "transition_count": self.transition_count,
+            "recent_transitions": [
+                {"timestamp": timestamp, "event_type": event_type, "from": previous, "to": sentiment}
+                for timestamp, event_type, previous, sentiment in self.transitions
+            ],
+            "transitions_truncated": self.transition_count > len(self.transitions)
+        }
+
+
+class SentimentTrackerStore:
+    """Bounded store of the trackers of calls in progress, keyed by call_id"""
+
+    def __init__(self, ttl_seconds: float = 1800, max_calls: int = 10000, max_transitions: int = 20):
+        self.ttl_seconds = ttl_seconds
+        self.max_calls = max_calls
+        self.max_transitions = max_transitions
+        # Ordered by last activity, least recently updated first
+        self._trackers: "OrderedDict[str, Tuple[SentimentTracker, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._trackers)
+
+    def feed(self, call_id: str, events: Iterable[Dict[str, Any]]) -> SentimentTracker:
+        """Consume events of a call in progress"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._trackers.pop(call_id, None)
+            tracker = entry[0] if entry else SentimentTracker(self.max_transitions)
+            tracker.update_many(events)
+            self._trackers[call_id] = (tracker, now)
+            self._evict(now)
+            return tracker
+
+    def pop(self, call_id: Optional[str]) -> SentimentTracker:
+        """Remove and return the tracker of an ending call (a new one if none is open)"""
+        with self._lock:
+            entry = self._trackers.pop(call_id, None) if call_id else None
+        return entry[0] if entry else SentimentTracker(self.max_transitions)
+
+    def _evict(self, now: float) -> None:
+        while self._trackers:
+            _, (_, last_activity) = next(iter(self._trackers.items()))
+            if len(self._trackers) <= self.max_calls and now - last_activity < self.ttl_seconds:
+                break
+            self._trackers.popitem(last=False)
+
+
+class SharedSentimentTrackerStore(SentimentTrackerStore):
+    """Trackers in the call_state table, shared by the worker processes"""
+
+    KIND = "sentiment"
+
+    def __len__(self) -> int:
+        return count_call_states(self.KIND)
+
+    def feed(self, call_id: str, events: Iterable[Dict[str, Any]]) -> SentimentTracker:
+        events = list(events)
+
+        def update(state: Optional[str]) -> str:
+            tracker = SentimentTracker.from_state(state, self.max_transitions) if state else SentimentTracker(self.max_transitions)
+            tracker.update_many(events)
+            return tracker.to_state()
+
+        now = time.time()
+        state = update_call_state(self.KIND, call_id, "", update, now)
+        pop_call_states(self.KIND, idle_before=now - self.ttl_seconds, keep=self.max_calls)
+        return SentimentTracker.from_state(state, self.max_transitions)
+
+    def pop(self, call_id: Optional[str]) -> SentimentTracker:
+        states = pop_call_states(self.KIND, call_id=call_id) if call_id else []
+        return SentimentTracker.from_state(states[0], self.max_transitions) if states else SentimentTracker(self.max_transitions)
+
+
+sentiment_trackers = (SharedSentimentTrackerStore if SHARED_MODE else SentimentTrackerStore)(
+    ttl_seconds=float(os.getenv("SENTIMENT_TRACKER_TTL", "1800")),
+    max_calls=int(os.getenv("SENTIMENT_TRACKER_MAX_CALLS", "10000")),
+    max_transitions=int(os.getenv("SENTIMENT_MAX_TRANSITIONS", "20"))
+)
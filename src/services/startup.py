@@ -2,7 +2,7 @@ import logging
 from datetime import datetime, timedelta
 from typing import List
 from ..models import LoadData
-from ..database import init_database
+from ..database import init_database, load_inventory, shared_versions
 
 logger = logging.getLogger(__name__)
 
@@ -51,11 +51,16 @@ async def initialize_sample_data():
         )
     ]
     
-    from ..database import loads_db
-    loads_db.clear()
-    loads_db.extend(sample_loads)
+    # With several workers the first one publishes the inventory and the others load it
+    if shared_versions.is_initializer:
+        load_inventory.replace(sample_loads)
+    else:
+        await load_inventory.wait_until_ready()
     
-    logger.info(f"Initialized with {len(sample_loads)} sample loads and 2 sample carriers")
+    from .pricing import lane_rate_index
+    lane_rate_index.rebuild()
+    
+    logger.info("Initialized with %s sample loads and 2 sample carriers", len(sample_loads))
     
     return {
         "loads_initialized": len(sample_loads),
@@ -0,0 +1,81 @@
+"""
+Warm-up after startup, so the first requests of a new instance don't pay for
+cold caches: the load search path, the dashboard analytics summary, the
+shared FMCSA client (and the httpx import) and the OpenAPI schema, which
+FastAPI otherwise builds on the first /docs request.
+
+WARM_UP=background (default) runs it as a task once the app accepts
+requests, with the blocking work in threads; blocking runs it before the app
+reports ready; off skips it. Every step is timed in the startup profile.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from ..monitoring import startup_profile
+from .dashboard import analytics_summary_cache
+from .fmcsa import get_fmcsa_client
+from .load_service import search_loads_by_criteria, get_load_by_id
+
+logger = logging.getLogger(__name__)
+
+WARM_UP_MODES = ("background", "blocking", "off")
+
+
+def _warm_load_search() -> None:
+    loads = search_loads_by_criteria()
+    if loads:
+        search_loads_by_criteria(origin=loads[0].origin, equipment_type=loads[0].equipment_type)
+        get_load_by_id(loads[0].load_id)
+
+
+class WarmUp:
+    """Runs the warm-up steps once per worker, in the background or before readiness"""
+
+    def __init__(self, mode: str = "background"):
+        if mode not in WARM_UP_MODES:
+            logger.warning("Unknown WARM_UP mode %r, using background", mode)
+            mode = "background"
+        self.mode = mode
+        self._task: Optional[asyncio.Task] = None
+
+    def _steps(self, app: Any) -> List[Tuple[str, Callable[[], Awaitable[Any]]]]:
+        return [
+            ("load_search", lambda: asyncio.to_thread(_warm_load_search)),
+            ("analytics_summary", analytics_summary_cache.get),
+            ("fmcsa_client", lambda: asyncio.to_thread(get_fmcsa_client)),
+            ("openapi", lambda: asyncio.to_thread(app.openapi))
+        ]
+
+    async def run(self, app: Any) -> None:
+        startup_profile.mark_warm_up("running")
+        started = time.perf_counter()
+        for name, step in self._steps(app):
+            with startup_profile.step(f"warm_up.{name}"):
+                try:
+                    await step()
+                except Exception as e:
+                    logger.warning("Warm-up step %s failed: %s", name, e)
+        seconds = time.perf_counter() - started
+        startup_profile.mark_warm_up("done", seconds)
+        logger.info("Warm-up done in %.1f ms", seconds * 1000)
+
+    async def start(self, app: Any) -> None:
+        if self.mode == "off":
+            startup_profile.mark_warm_up("off")
+        elif self.mode == "blocking":
+            await self.run(app)
+        elif self._task is None:
+            self._task = asyncio.create_task(self.run(app))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+warm_up = WarmUp(os.getenv("WARM_UP", "background").lower())